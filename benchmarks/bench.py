@@ -0,0 +1,255 @@
+#!/usr/bin/env python
+"""Timing benchmarks for the core kernels and the CLI pipeline.
+
+Run the suite and write the timings as JSON::
+
+    python benchmarks/bench.py run --out benchmarks/results.json
+
+Compare a run against a stored baseline; exits with status 1 when any
+benchmark is more than ``--threshold`` slower::
+
+    python benchmarks/bench.py compare benchmarks/baseline.json benchmarks/results.json
+
+Every benchmark runs on a synthetic geometric random walk with a fixed seed,
+for each size in ``--sizes`` (default 1k, 10k and 100k rows) and each window
+length in ``--windows``. The reported time is the best of ``--repeat`` runs.
+``import_portfolio_cli`` times a cold ``import portfolio.cli`` in a fresh
+interpreter once per run, independent of the sizes.
+Per-window Python loops (``simulate_portfolio``, the NumPy dividend kernel)
+are skipped above ``--loop-limit`` rows.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import Namespace
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC)
+
+from portfolio import core  # noqa: E402
+from portfolio.cli import main as cli_main  # noqa: E402
+from portfolio.drawdown import rolling_max_drawdown  # noqa: E402
+from portfolio.jit import get_kernels  # noqa: E402
+from portfolio.moments import rolling_risk_metrics  # noqa: E402
+from portfolio.montecarlo import simulate_bootstrap  # noqa: E402
+from portfolio.parallel import simulate_grid  # noqa: E402
+from portfolio.rebalance import rolling_rebalanced_returns  # noqa: E402
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_WINDOWS = (12, 252)
+LEVERAGES = (1.0, 1.5, 2.0, 3.0)
+
+
+def synthetic_prices(n_rows, seed=0):
+    """Geometric random walk with monthly-like drift and volatility."""
+    rng = np.random.default_rng(seed)
+    return 100.0 * np.cumprod(1.0 + rng.normal(0.005, 0.04, n_rows))
+
+
+def synthetic_frame(n_rows, seed=0):
+    prices = synthetic_prices(n_rows, seed)
+    return pd.DataFrame(
+        {
+            "date": np.arange(n_rows).astype(str),
+            "price": prices,
+            "div": np.full(n_rows, 0.2),
+        }
+    )
+
+
+def _cli_case(frame, window, tmp):
+    csv = os.path.join(tmp, "prices.csv")
+    frame.to_csv(csv, index=False)
+    args = Namespace(
+        csv=csv,
+        window=window,
+        leverage=list(LEVERAGES),
+        datecol="date",
+        pricecol="price",
+        dividendcol=None,
+        underlying=True,
+        out=tmp,
+        freq="month",
+    )
+    return lambda: cli_main(args)
+
+
+def import_cli():
+    """Import ``portfolio.cli`` in a fresh interpreter, as a CLI run does."""
+    env = dict(os.environ, PYTHONPATH=SRC)
+    subprocess.run([sys.executable, "-c", "import portfolio.cli"], env=env, check=True)
+
+
+def cases(n_rows, window, tmp, loop_limit):
+    """``{name: callable}`` of every benchmark at one size and window length."""
+    frame = synthetic_frame(n_rows)
+    prices = frame["price"].to_numpy()
+    returns = np.diff(prices) / prices[:-1]
+    log_prices = np.log(prices)
+    out = {
+        "simulate_window": lambda: core.simulate_window(prices[: window + 1], 2.0),
+        "rolling_leveraged_returns": lambda: core.rolling_leveraged_returns(
+            prices, 2.0, window
+        ),
+        "batched_leveraged_returns": lambda: core.batched_leveraged_returns(
+            prices, LEVERAGES, window
+        ),
+        "rolling_risk_metrics": lambda: rolling_risk_metrics(
+            returns, window, 12, LEVERAGES
+        ),
+        "rolling_max_drawdown": lambda: rolling_max_drawdown(log_prices, window),
+        "simulate_grid": lambda: simulate_grid(prices, LEVERAGES, window),
+        "simulate_grid_assets": lambda: simulate_grid(
+            np.stack([prices, prices[::-1], np.sqrt(prices)]), LEVERAGES, window
+        ),
+        "simulate_grid_float32": lambda: simulate_grid(
+            prices, LEVERAGES, window, dtype=np.float32
+        ),
+        "rolling_rebalanced_returns": lambda: rolling_rebalanced_returns(
+            prices, LEVERAGES, (1, 3, 12), window, dividends=frame["div"].to_numpy()
+        ),
+        "total_return_grid": lambda: simulate_grid(
+            core.total_return_prices(prices, frame["div"].to_numpy()), LEVERAGES, window
+        ),
+        "calc_window_returns": lambda: core.calc_window_returns(
+            frame, window, "date", ["price", "div"]
+        ),
+        "simulate_bootstrap": lambda: simulate_bootstrap(
+            prices, LEVERAGES, window, 1_000, seed=0
+        ),
+        "cli_main": _cli_case(frame, window, tmp),
+    }
+    if n_rows <= loop_limit:
+        portfolio = frame.rename(columns={"price": "sp_real_price"})
+        out["simulate_portfolio"] = lambda: core.simulate_portfolio(portfolio, 2.0)
+        out["dividend_window_growth"] = lambda: get_kernels().dividend_window_growth(
+            prices, frame["div"].to_numpy(), window
+        )
+    return out
+
+
+def best_time(fn, repeat):
+    """Smallest wall time of ``repeat`` calls, after one warm-up call."""
+    fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run(sizes, windows, repeat, loop_limit, only=None):
+    """Time every case; return the JSON-serialisable report."""
+    results = {}
+    if not only or "import_portfolio_cli" in only:
+        seconds = best_time(import_cli, repeat)
+        results["import_portfolio_cli"] = {
+            "benchmark": "import_portfolio_cli",
+            "seconds": seconds,
+            "repeat": repeat,
+        }
+        print(f"{'import_portfolio_cli':<60} {seconds:.6f}s", flush=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in sizes:
+            for window in windows:
+                if window >= n_rows:
+                    continue
+                for name, fn in cases(n_rows, window, tmp, loop_limit).items():
+                    if only and name not in only:
+                        continue
+                    key = f"{name}[rows={n_rows},window={window}]"
+                    results[key] = {
+                        "benchmark": name,
+                        "rows": n_rows,
+                        "window": window,
+                        "seconds": best_time(fn, repeat),
+                        "repeat": repeat,
+                    }
+                    print(f"{key:<60} {results[key]['seconds']:.6f}s", flush=True)
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=0.2, min_seconds=1e-4):
+    """Benchmarks in both reports with their time ratios.
+
+    Returns ``(rows, regressions)``: ``rows`` is a list of ``(key,
+    baseline_seconds, current_seconds, ratio)`` and ``regressions`` the keys
+    whose ratio exceeds ``1 + threshold``. Timings below ``min_seconds`` in
+    both reports are too noisy to flag.
+    """
+    rows, regressions = [], []
+    for key, base in baseline["results"].items():
+        if key not in current["results"]:
+            continue
+        before = base["seconds"]
+        after = current["results"][key]["seconds"]
+        ratio = after / before if before > 0 else float("inf")
+        rows.append((key, before, after, ratio))
+        if ratio > 1 + threshold and max(before, after) >= min_seconds:
+            regressions.append(key)
+    return rows, regressions
+
+
+def _load(path):
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def cli(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = p.add_subparsers(dest="command", required=True)
+
+    r = sub.add_parser("run", help="run the benchmarks and write JSON timings")
+    r.add_argument("--out", default="benchmarks/results.json")
+    r.add_argument("--sizes", nargs="+", type=int, default=list(DEFAULT_SIZES))
+    r.add_argument("--windows", nargs="+", type=int, default=list(DEFAULT_WINDOWS))
+    r.add_argument("--repeat", type=int, default=3)
+    r.add_argument("--loop-limit", type=int, default=10_000)
+    r.add_argument("--only", nargs="+", default=None, help="benchmark names to run")
+
+    c = sub.add_parser("compare", help="flag slowdowns against a baseline")
+    c.add_argument("baseline")
+    c.add_argument("current")
+    c.add_argument("--threshold", type=float, default=0.2, help="allowed relative slowdown")
+
+    args = p.parse_args(argv)
+    if args.command == "run":
+        report = run(args.sizes, args.windows, args.repeat, args.loop_limit, args.only)
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as fh:
+            json.dump(report, fh, indent=2)
+        return 0
+
+    rows, regressions = compare(_load(args.baseline), _load(args.current), args.threshold)
+    for key, before, after, ratio in rows:
+        flag = "  SLOWER" if key in regressions else ""
+        print(f"{key:<60} {before:.6f}s -> {after:.6f}s  x{ratio:.2f}{flag}")
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than the baseline by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -2,17 +2,37 @@
 import argparse
 
 from portfolio.cli import main
+from portfolio.core import RESULT_DTYPES
+from portfolio.formats import FORMATS
+from portfolio.montecarlo import BOOTSTRAP_METHODS
 
 if __name__ == "__main__":
     p = argparse.ArgumentParser()
-    p.add_argument("csv", help="Path to price CSV")
-    p.add_argument("--window", type=int, default=252, help='# periods in total investment window') 
+    p.add_argument("csv", help="Path to price CSV, Parquet or Feather file")
+    p.add_argument("--window", nargs="+", default=["252"], help='# periods in total investment window; several sizes or start:stop[:step] ranges run in one pass')
     p.add_argument("--leverage", nargs="+", type=float, default=[1.0, 2.0])
     p.add_argument("--datecol", default="date")
-    p.add_argument("--pricecol", default="sp_real_price")
+    p.add_argument("--pricecol", nargs="+", default=["sp_real_price"], help="price column(s); several columns run as one batch with per-column outputs")
     p.add_argument("--dividendcol", default=None)
+    p.add_argument("--dividend-leverage", nargs="+", type=float, default=[1.0], help="leverage levels of the dividend-reinvested portfolios")
     p.add_argument("--underlying", action="store_true")
     p.add_argument("--freq", choices=["day", "month", "year"], default="month")
     p.add_argument("--out", default="data/outputs/")
     p.add_argument("--plot", action="store_true")
+    p.add_argument("--headless", action="store_true", help="with --plot, only save the figures; never open a window")
+    p.add_argument("--jobs", type=int, default=1, help="worker processes for the leverage grid")
+    p.add_argument("--mem-budget-mb", type=float, default=256, help="memory budget per leverage chunk")
+    p.add_argument("--dtype", choices=RESULT_DTYPES, default="float64", help="storage dtype of per-window results; float32 halves their memory")
+    p.add_argument("--format", choices=FORMATS, default="csv", help="output table format")
+    p.add_argument("--input-format", choices=FORMATS, default=None, help="input table format; inferred from the file extension by default")
+    p.add_argument("--sidecar", action="store_true", help="cache the parsed CSV columns as memory-mappable .npy files next to it")
+    p.add_argument("--cache-dir", default=None, help="directory of cached leverage-grid results, one file per window size; repeated runs skip simulation")
+    p.add_argument("--cache-max-mb", type=float, default=512, help="size cap of the result cache; least recently used entries are evicted")
+    p.add_argument("--stream-chunk", type=int, default=None, help="compute and append result tables this many windows at a time")
+    p.add_argument("--profile", action="store_true", help="write per-stage wall/CPU time, peak memory and counters as JSON next to the outputs")
+    p.add_argument("--state", default=None, help="directory holding run state; appended CSV rows only simulate the new windows")
+    p.add_argument("--bootstrap", type=int, default=None, help="also summarise this many block-bootstrapped synthetic windows per window size")
+    p.add_argument("--block-size", type=int, default=12, help="(mean) block length of the bootstrap, in periods")
+    p.add_argument("--bootstrap-method", choices=BOOTSTRAP_METHODS, default="stationary", help="stationary (random block lengths) or fixed-length moving blocks")
+    p.add_argument("--seed", type=int, default=None, help="seed of the bootstrap random generator")
     main(p.parse_args())
@@ -1,24 +1,38 @@
 # src/portfolio/__init__.py
 """
 portfolio analysis package.
-"""
 
-from .core import (
-    simulate_portfolio,
-    identify_windows,
-    calc_window_returns,
-    simulate_window,
-    detect_bust,
-    simulate_leveraged_series,
-    window_return,
-    annualise,
-)
+Public names are resolved lazily (PEP 562): ``import portfolio`` loads no
+submodule, and ``portfolio.simulate_portfolio`` imports :mod:`portfolio.core`
+on first access. This keeps the start-up of CLI runs and batch jobs down to
+the modules they actually use.
+"""
 
-from .report import (
-    boxplot_returns,
-)
+from importlib import import_module
 
-from .utils import to_native, name_run_output
+_LAZY = {
+    "core": (
+        "simulate_portfolio",
+        "identify_windows",
+        "calc_window_returns",
+        "simulate_window",
+        "simulate_log_window",
+        "detect_bust",
+        "leveraged_log_prefix",
+        "rolling_leveraged_returns",
+        "batched_leveraged_returns",
+        "log_total_return_index",
+        "total_return_prices",
+        "simulate_leveraged_series",
+        "window_return",
+        "annualise",
+    ),
+    "drawdown": ("rolling_max_drawdown", "leveraged_drawdowns"),
+    "moments": ("rolling_moments", "rolling_risk_metrics"),
+    "report": ("boxplot_returns", "box_statistics"),
+    "utils": ("to_native", "name_run_output"),
+}
+_SOURCES = {name: module for module, names in _LAZY.items() for name in names}
 
 __all__ = [
     "simulate_portfolio",
@@ -28,3 +42,15 @@ __all__ = [
 ]
 
 __version__ = "0.1.0"
+
+
+def __getattr__(name):
+    if name in _SOURCES:
+        value = getattr(import_module(f".{_SOURCES[name]}", __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_SOURCES))
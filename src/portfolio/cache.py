@@ -0,0 +1,178 @@
+"""Content-addressed on-disk cache of simulated grid results.
+
+Each entry holds the :data:`~portfolio.parallel.GRID_METRICS` arrays of a
+whole leverage grid at one window size, one row per leverage, as an
+``.npz`` file named by the SHA-256 of everything the result depends on: the
+bytes of the simulated series, the leverages, the window size, the periods
+per year, the result dtype and the package version. With ``--dividendcol``
+the series is the total-return prices, so the dividend portfolios get
+their own entries. A run therefore reads or writes one
+file per window size, and rerunning the CLI on the same data only simulates
+the window sizes not seen before.
+
+Hits refresh the entry's modification time. Once a run has written its
+entries, the least recently used entries are deleted until the cache fits
+its size cap. Several runs may share a cache directory: an entry deleted by
+another run's eviction is a miss, never an error.
+"""
+
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+from . import __version__
+from .core import DEFAULT_MAX_BYTES
+from .parallel import GRID_METRICS, simulate_grid
+
+DEFAULT_CACHE_BYTES = 512 * 2**20
+
+
+class ResultCache:
+    """A directory of ``.npz`` result entries with LRU eviction.
+
+    Parameters
+    ----------
+    path : str
+        Cache directory, created on first write.
+    max_bytes : int, optional
+        Size cap for the sum of all entry files.
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_CACHE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(*parts):
+        """Hex digest identifying an entry; ``bytes`` parts are hashed raw."""
+        digest = hashlib.sha256()
+        for part in parts:
+            data = part if isinstance(part, bytes) else repr(part).encode()
+            digest.update(len(data).to_bytes(8, "little"))
+            digest.update(data)
+        return digest.hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.path, f"{key}.npz")
+
+    def get(self, key):
+        """Arrays stored under ``key``, or ``None`` on a miss."""
+        fname = self._file(key)
+        try:
+            with np.load(fname) as entry:
+                arrays = {name: entry[name] for name in entry.files}
+            os.utime(fname)
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+        return arrays
+
+    def put(self, key, arrays):
+        """Store ``arrays`` under ``key``.
+
+        Nothing is evicted here; call :meth:`evict` once after a batch of
+        writes.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        # write then rename so readers never see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fh:
+            np.savez(fh, **arrays)
+        os.replace(tmp, self._file(key))
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits ``max_bytes``."""
+        try:
+            names = os.listdir(self.path)
+        except FileNotFoundError:
+            return
+        entries = []
+        for name in names:
+            if name.endswith(".npz"):
+                try:
+                    stat = os.stat(os.path.join(self.path, name))
+                except FileNotFoundError:
+                    # evicted by another run sharing the directory
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.path, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def cached_simulate_grid(
+    cache,
+    prices,
+    leverages,
+    window_sizes,
+    periods_per_year=12,
+    jobs=1,
+    max_bytes=DEFAULT_MAX_BYTES,
+    dtype=float,
+):
+    """:func:`~portfolio.parallel.simulate_grid` backed by a :class:`ResultCache`.
+
+    Only the window sizes without an entry for this leverage grid are
+    simulated, all in one ``simulate_grid`` call, and nothing is simulated
+    when every entry is cached. The cache is evicted down to its size cap
+    once, after all entries are written.
+
+    Returns
+    -------
+    dict[int, dict[str, np.ndarray]]
+        Results keyed by window size, as ``simulate_grid`` returns for a
+        sequence of window sizes.
+    """
+    prices = np.ascontiguousarray(prices, dtype=float)
+    leverages = np.asarray(leverages, dtype=float).ravel()
+    window_sizes = list(window_sizes)
+    price_key = cache.key(prices.tobytes())
+    version = __version__
+    lev_key = cache.key(leverages.tobytes())
+
+    def grid_key(w):
+        return cache.key(
+            "leveraged",
+            price_key,
+            lev_key,
+            w,
+            periods_per_year,
+            version,
+            np.dtype(dtype).name,
+        )
+
+    grids = {}
+    missing = []
+    for w in window_sizes:
+        entry = cache.get(grid_key(w))
+        if entry is None or set(entry) != set(GRID_METRICS):
+            missing.append(w)
+        else:
+            grids[w] = entry
+
+    if missing:
+        simulated = simulate_grid(
+            prices,
+            leverages,
+            missing,
+            periods_per_year,
+            jobs=jobs,
+            max_bytes=max_bytes,
+            dtype=dtype,
+        )
+        for w in missing:
+            cache.put(grid_key(w), simulated[w])
+            grids[w] = simulated[w]
+
+    cache.evict()
+    return grids
+
+
+__all__ = ["DEFAULT_CACHE_BYTES", "ResultCache", "cached_simulate_grid"]
@@ -1,17 +1,48 @@
+from argparse import Namespace
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import os
+
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
 
+from .cache import DEFAULT_CACHE_BYTES, ResultCache, cached_simulate_grid
+from .accumulators import DEFAULT_SKETCH_K
 from .core import (
     identify_windows,
-    simulate_window,
-    simulate_window_dividend,
-    detect_bust,
-    underlying_return,
+    total_return_prices,
+    DEFAULT_MAX_BYTES,
+)
+from .drawdown import rolling_max_drawdown
+from .formats import TableWriter, read_table, write_table
+from .incremental import (
+    accumulate,
+    extend_prefixes,
+    fingerprint,
+    is_continuation,
+    keep_tail,
+    load_state,
+    new_accumulators,
+    prefix_state,
+    run_params,
+    save_state,
+    sweep_prefixes,
+)
+from .moments import moment_prefixes, rolling_risk_metrics
+from .montecarlo import bootstrap_accumulators
+from .parallel import leveraged_block, simulate_grid
+from .profiling import NULL_PROFILER, StageProfiler, profiling_requested
+from .report import (
+    accumulated_statistics,
+    box_statistics,
+    boxplot_returns,
+    summary_statistics,
 )
-from .report import boxplot_returns, summary_statistics
 from .utils import name_run_output
 
+# threads drawing and saving figures while the CLI writes its tables
+PLOT_THREADS = 3
+
 FREQ_TO_PERIODS = {
     "day": 252,
     "month": 12,
@@ -30,209 +61,866 @@ def _format_label(value, freq):
     return value
 
 
-def main(args):
-    data = pd.read_csv(args.csv)
+def parse_window_sizes(window):
+    """Normalise ``--window`` into a list of window sizes.
 
-    periods_per_year = FREQ_TO_PERIODS.get(args.freq, 12)
+    Accepts an int, a string such as ``"60"`` or an inclusive range
+    ``"start:stop[:step]"`` (``"12:60:12"`` is 12, 24, 36, 48, 60; a
+    negative step counts down to the stop), or a sequence of those.
 
-    windows = identify_windows(data, window_size=args.window)
+    Raises
+    ------
+    ValueError
+        If a value is not an integer or range, a size is smaller than one
+        period, a range has a step of zero or no sizes are given.
 
-    dividend_column = getattr(args, "dividendcol", None)
-    include_underlying = getattr(args, "underlying", False)
+    Examples
+    --------
+    >>> parse_window_sizes(12)
+    [12]
+    >>> parse_window_sizes(["12:36:12", "120"])
+    [12, 24, 36, 120]
+    """
+    if isinstance(window, (list, tuple)):
+        sizes = []
+        for item in window:
+            sizes.extend(s for s in parse_window_sizes(item) if s not in sizes)
+        if not sizes:
+            raise ValueError("no window sizes given")
+        return sizes
+    text = str(window)
+    try:
+        parts = [int(p) for p in text.split(":")]
+    except ValueError:
+        raise ValueError(
+            f"invalid --window value {text!r}; expected an integer or start:stop[:step]"
+        ) from None
+    if len(parts) > 3:
+        raise ValueError(f"invalid --window value {text!r}; expected start:stop[:step]")
+    if len(parts) > 1:
+        step = parts[2] if len(parts) > 2 else 1
+        if step == 0:
+            raise ValueError(f"window range {text!r} has a step of zero")
+        # the stop is inclusive in either direction
+        sizes = list(range(parts[0], parts[1] + (1 if step > 0 else -1), step))
+        if not sizes:
+            raise ValueError(f"window range {text!r} is empty")
+    else:
+        sizes = parts
+    small = [s for s in sizes if s < 1]
+    if small:
+        raise ValueError(f"window sizes must be at least 1, got {small[0]} from {text!r}")
+    return sizes
+
+
+def _window_tables(
+    data, args, window_size, grid, series, summarise=True, profiler=NULL_PROFILER
+):
+    """Assemble the result tables of one window size from the simulated ``grid``.
+
+    Returns ``(returns_df, annualised_returns_df, drawdowns_df, summary_df,
+    stats_df, trackers)``, where ``trackers`` holds the per-window metric
+    arrays and the bust count of each leveraged column. With
+    ``summarise=False`` the summary tables are ``None``.
+    """
+    periods_per_year = FREQ_TO_PERIODS.get(args.freq, 12)
+    windows = identify_windows(data, window_size=window_size)
 
     start_col = f"start_{args.datecol}"
     end_col = f"end_{args.datecol}"
-    cols = [start_col, end_col] + [f"portfolio_{lev}x" for lev in args.leverage]
-    if include_underlying:
-        cols.append("underlying")
-    if dividend_column is not None:
-        cols.append("1x_dividend")
-    returns_df = pd.DataFrame(columns=cols)
-    annualised_returns_df = pd.DataFrame(columns=cols)
-
-    bust_counter = {lev: 0 for lev in args.leverage}
-    sharpe_tracker = {f"portfolio_{lev}x": [] for lev in args.leverage}
-    if include_underlying:
-        sharpe_tracker["underlying"] = []
-    if dividend_column is not None:
-        sharpe_tracker["1x_dividend"] = []
+    value_cols = [f"portfolio_{lev}x" for lev in args.leverage]
+    if "log_prices" in series:
+        value_cols.append("underlying")
+    if "dividend" in grid:
+        value_cols += _dividend_cols(args)
+
+    # result arrays indexed by window position, filled in place below; values
+    # are computed in float64 and rounded once to the --dtype on assignment
+    dtype = _result_dtype(args)
+    n_windows = len(windows)
+    starts = np.array([w[0] for w in windows], dtype=np.int64)
+    ends = np.array([w[1] for w in windows], dtype=np.int64)
+    window_returns = {col: np.empty(n_windows, dtype=dtype) for col in value_cols}
+    window_anns = {col: np.empty(n_windows, dtype=dtype) for col in value_cols}
+    sharpe_tracker = {col: np.zeros(n_windows, dtype=dtype) for col in value_cols}
+    volatility_tracker = {col: np.zeros(n_windows, dtype=dtype) for col in value_cols}
+    sortino_tracker = {col: np.zeros(n_windows, dtype=dtype) for col in value_cols}
+    drawdown_tracker = {col: np.zeros(n_windows, dtype=dtype) for col in value_cols}
+    duration_tracker = {col: np.zeros(n_windows, dtype=np.int64) for col in value_cols}
+    # busted windows of every leveraged column, price and dividend alike
+    bust_counter = {}
+
+    columns = [(grid, row, f"portfolio_{lev}x") for row, lev in enumerate(args.leverage)]
+    if "dividend" in grid:
+        columns += [(grid["dividend"], row, col) for row, col in enumerate(_dividend_cols(args))]
+    for grid_part, row, col in columns:
+        bust_counter[col] = int(grid_part["bust"][row].sum())
+        window_returns[col][:] = grid_part["total_return"][row]
+        window_anns[col][:] = grid_part["cagr"][row]
+        sharpe_tracker[col][:] = grid_part["sharpe"][row]
+        volatility_tracker[col][:] = grid_part["volatility"][row]
+        sortino_tracker[col][:] = grid_part["sortino"][row]
+        drawdown_tracker[col][:] = grid_part["max_drawdown"][row]
+        duration_tracker[col][:] = grid_part["drawdown_duration"][row]
+
+    if "log_prices" in series:
+        prices_arr = series["prices"]
+        growth = prices_arr[ends] / prices_arr[starts]
+        window_returns["underlying"][:] = growth - 1.0
+        window_anns["underlying"][:] = growth ** (periods_per_year / window_size) - 1.0
+        (
+            sharpe_tracker["underlying"][:],
+            volatility_tracker["underlying"][:],
+            sortino_tracker["underlying"][:],
+        ) = rolling_risk_metrics(
+            None, window_size, periods_per_year, prefixes=series["price_moments"]
+        )
+        (
+            drawdown_tracker["underlying"][:],
+            duration_tracker["underlying"][:],
+        ) = rolling_max_drawdown(series["log_prices"], window_size)
+
+    dates = data[args.datecol].to_numpy()
+    start_labels = dates.take(starts)
+    end_labels = dates.take(ends)
+    returns_df = pd.DataFrame(
+        {start_col: start_labels, end_col: end_labels, **window_returns}
+    )
+    annualised_returns_df = pd.DataFrame(
+        {start_col: start_labels, end_col: end_labels, **window_anns}
+    )
+    drawdown_cols = {start_col: start_labels, end_col: end_labels}
+    for col in value_cols:
+        drawdown_cols[f"{col}_max_drawdown"] = drawdown_tracker[col]
+        drawdown_cols[f"{col}_drawdown_duration"] = duration_tracker[col]
+    drawdowns_df = pd.DataFrame(drawdown_cols)
+
+    trackers = {
+        "total_return": window_returns,
+        "cagr": window_anns,
+        "sharpe": sharpe_tracker,
+        "volatility": volatility_tracker,
+        "sortino": sortino_tracker,
+        "max_drawdown": drawdown_tracker,
+        "drawdown_duration": duration_tracker,
+        "bust": bust_counter,
+    }
+    profiler.count("windows_evaluated", n_windows * len(value_cols))
+    profiler.count("busts_detected", sum(bust_counter.values()))
+    if not summarise:
+        return returns_df, annualised_returns_df, drawdowns_df, None, None, trackers
+
+    with profiler.stage("summary_statistics"):
+        summary_df = _bust_summary(
+            _bust_columns(args), list(bust_counter.values()), len(windows)
+        )
+        stats_df = summary_statistics(
+            returns_df=returns_df,
+            annualised_df=annualised_returns_df,
+            bust_df=summary_df,
+            sharpe_dict=sharpe_tracker,
+            volatility_dict=volatility_tracker,
+            sortino_dict=sortino_tracker,
+            drawdown_dict=drawdown_tracker,
+            duration_dict=duration_tracker,
+        )
+    return returns_df, annualised_returns_df, drawdowns_df, summary_df, stats_df, trackers
 
-    for lev in args.leverage:
-        for start_idx, end_idx in windows:
-            prices = data.iloc[
-                start_idx : end_idx + 1,
-                data.columns.get_loc(args.pricecol),
-            ]
 
-            V_path = simulate_window(prices, leverage=lev)
-            period_returns = np.diff(V_path) / V_path[:-1]
-
-            if detect_bust(V_path):
-                bust_counter[lev] += 1
-                window_ret = 0.0
-                window_ann = 0.0
-                sharpe_tracker[f"portfolio_{lev}x"].append(0.0)
-            else:
-                window_ret = V_path[-1] / V_path[0] - 1.0
-                years = (len(prices) - 1) / periods_per_year
-                window_ann = (V_path[-1] / V_path[0]) ** (1 / years) - 1.0
-                std = period_returns.std(ddof=1)
-                if std == 0 or np.isnan(std):
-                    sr = 0.0
-                else:
-                    sr = period_returns.mean() / std * np.sqrt(periods_per_year)
-                sharpe_tracker[f"portfolio_{lev}x"].append(sr)
-
-            start_label = _format_label(data.iloc[start_idx][args.datecol], args.freq)
-            end_label = _format_label(data.iloc[end_idx][args.datecol], args.freq)
-
-            for df, value in (
-                (returns_df, window_ret),
-                (annualised_returns_df, window_ann),
-            ):
-                mask = (df[start_col] == start_label) & (df[end_col] == end_label)
-                if not mask.any():
-                    df.loc[len(df), [start_col, end_col]] = [start_label, end_label]
-                    mask = (df[start_col] == start_label) & (df[end_col] == end_label)
-
-                df.loc[mask, f"portfolio_{lev}x"] = value
-
-    if include_underlying:
-        for start_idx, end_idx in windows:
-            window_prices = data.iloc[
-                start_idx : end_idx + 1,
-                data.columns.get_loc(args.pricecol),
-            ]
+def _result_dtype(args):
+    """Storage dtype of the per-window results, from ``--dtype``."""
+    return np.dtype(getattr(args, "dtype", None) or "float64")
 
-            window_ret = window_prices.iat[-1] / window_prices.iat[0] - 1.0
-            years = (len(window_prices) - 1) / periods_per_year
-            window_ann = (window_prices.iat[-1] / window_prices.iat[0]) ** (1 / years) - 1.0
 
-            period_returns = window_prices.pct_change().iloc[1:]
-            std = period_returns.std(ddof=1)
-            if std == 0 or np.isnan(std):
-                sr = 0.0
-            else:
-                sr = period_returns.mean() / std * np.sqrt(periods_per_year)
-            sharpe_tracker["underlying"].append(sr)
+def _value_cols(args):
+    cols = [f"portfolio_{lev}x" for lev in args.leverage]
+    if getattr(args, "underlying", False):
+        cols.append("underlying")
+    if getattr(args, "dividendcol", None) is not None:
+        cols += _dividend_cols(args)
+    return cols
 
-            start_label = _format_label(data.iloc[start_idx][args.datecol], args.freq)
-            end_label = _format_label(data.iloc[end_idx][args.datecol], args.freq)
 
-            for df, value in (
-                (returns_df, window_ret),
-                (annualised_returns_df, window_ann),
-            ):
-                mask = (df[start_col] == start_label) & (df[end_col] == end_label)
-                if not mask.any():
-                    df.loc[len(df), [start_col, end_col]] = [start_label, end_label]
-                    mask = (df[start_col] == start_label) & (df[end_col] == end_label)
+def _dividend_leverages(args):
+    """Leverages of the dividend-reinvested portfolios (``--dividend-leverage``)."""
+    return [float(lev) for lev in getattr(args, "dividend_leverage", None) or [1.0]]
 
-                df.loc[mask, "underlying"] = value
 
-    if dividend_column is not None:
-        for start_idx, end_idx in windows:
-            prices = data.iloc[
-                start_idx : end_idx + 1,
-                data.columns.get_loc(args.pricecol),
-            ]
-            divs = data.iloc[
-                start_idx : end_idx + 1,
-                data.columns.get_loc(dividend_column),
-            ]
-            V_path = simulate_window_dividend(prices, divs)
-            window_ret = V_path[-1] / V_path[0] - 1.0
-            years = (len(prices) - 1) / periods_per_year
-            window_ann = (V_path[-1] / V_path[0]) ** (1 / years) - 1.0
-
-            period_returns = np.diff(V_path) / V_path[:-1]
-            std = period_returns.std(ddof=1)
-            if std == 0 or np.isnan(std):
-                sr = 0.0
-            else:
-                sr = period_returns.mean() / std * np.sqrt(periods_per_year)
-            sharpe_tracker["1x_dividend"].append(sr)
-
-            start_label = _format_label(data.iloc[start_idx][args.datecol], args.freq)
-            end_label = _format_label(data.iloc[end_idx][args.datecol], args.freq)
-
-            for df, value in (
-                (returns_df, window_ret),
-                (annualised_returns_df, window_ann),
-            ):
-                mask = (df[start_col] == start_label) & (df[end_col] == end_label)
-                if not mask.any():
-                    df.loc[len(df), [start_col, end_col]] = [start_label, end_label]
-                    mask = (df[start_col] == start_label) & (df[end_col] == end_label)
+def _dividend_cols(args):
+    """``<lev>x_dividend`` column of each dividend leverage, e.g. ``1x_dividend``."""
+    return [f"{lev:g}x_dividend" for lev in _dividend_leverages(args)]
 
-                df.loc[mask, "1x_dividend"] = value
 
-    value_cols = [f"portfolio_{lev}x" for lev in args.leverage]
-    if include_underlying:
-        value_cols.append("underlying")
-    if dividend_column is not None:
-        value_cols.append("1x_dividend")
-    returns_df[value_cols] = returns_df[value_cols].astype(float)
-    annualised_returns_df[value_cols] = annualised_returns_df[value_cols].astype(float)
+def _bust_columns(args, dividends=True):
+    """``(column, leverage)`` of every portfolio that can go bust: the price
+    portfolios, then (with ``dividends``) the dividend portfolios."""
+    cols = [(f"portfolio_{lev}x", lev) for lev in args.leverage]
+    if dividends and getattr(args, "dividendcol", None) is not None:
+        cols += list(zip(_dividend_cols(args), _dividend_leverages(args)))
+    return cols
+
 
-    total_windows = len(windows)
-    summary_df = pd.DataFrame(
+def _bust_summary(bust_cols, busts, n_windows):
+    """Bust ratio of each ``(column, leverage)`` of :func:`_bust_columns`."""
+    return pd.DataFrame(
         {
-            "leverage": list(bust_counter.keys()),
-            "bust_ratio": [bust_counter[lev] / total_windows for lev in bust_counter],
+            "portfolio": [col for col, _ in bust_cols],
+            "leverage": [lev for _, lev in bust_cols],
+            "bust_ratio": [count / n_windows for count in busts],
         }
     )
 
-    stats_df = summary_statistics(
-        returns_df=returns_df,
-        annualised_df=annualised_returns_df,
-        bust_df=summary_df,
-        sharpe_dict=sharpe_tracker,
-    )
 
-    returns_df.to_csv(
-        name_run_output("returns", args.out, args.leverage, "csv"), index=False
-    )
-    annualised_returns_df.to_csv(
-        name_run_output("ann_returns", args.out, args.leverage, "csv"), index=False
-    )
-    summary_df.to_csv(
-        name_run_output("bust_summary", args.out, args.leverage, "csv"), index=False
-    )
-    stats_df.to_csv(
-        name_run_output("summary_statistics", args.out, args.leverage, "csv"), index=False
-    )
+def _new_state(params, data, args, window_sizes, per_window, prices):
+    """Run state of a full run, see :mod:`portfolio.incremental`."""
+    centres, prefixes = prefix_state(prices, args.leverage)
+    base, tails = keep_tail(prefixes, len(data), window_sizes)
+    state = {
+        "params": params,
+        "n_rows": len(data),
+        "fingerprint": fingerprint(data, _input_columns(args), len(data)),
+        "base": base,
+        "centres": centres,
+        "prefixes": tails,
+        "windows": {},
+        "tables": {},
+    }
+    for w in window_sizes:
+        trackers = per_window[w][5]
+        accumulators = new_accumulators(_value_cols(args))
+        accumulate(accumulators, trackers)
+        state["windows"][w] = {
+            "n_windows": len(per_window[w][0]),
+            "busts": [trackers["bust"][col] for col, _ in _bust_columns(args)],
+            "accumulators": accumulators,
+        }
+        state["tables"][w] = per_window[w][:3]
+    return state
 
-    if getattr(args, "plot", False):
-        plot_cols = [f"portfolio_{lev}x" for lev in args.leverage]
-        if include_underlying:
-            plot_cols.append("underlying")
-        if dividend_column is not None:
-            plot_cols.append("1x_dividend")
+
+def _append_windows(
+    data, args, window_sizes, state, prices, tr_prices, profiler=NULL_PROFILER
+):
+    """Extend the results saved in ``state`` by the windows ending in new rows.
+
+    Only windows that end after the previously processed rows are simulated,
+    from the saved prefix tails; the summaries are updated through the saved
+    accumulators. The dividend portfolios are evaluated on the rows of the
+    new windows of the total-return prices ``tr_prices``. ``state`` is
+    advanced in place.
+    """
+    periods_per_year = FREQ_TO_PERIODS.get(args.freq, 12)
+    old_rows, n_rows = state["n_rows"], len(data)
+    with profiler.stage("simulate"):
+        prefixes = extend_prefixes(state, prices, args.leverage)
+    base = state["base"]
+
+    per_window = {}
+    for w in window_sizes:
+        info = state["windows"][w]
+        old_tables = state["tables"][w]
+        # first window that ends in a new row, in global and prefix-tail rows
+        first = max(old_rows - w, 0)
+        n_new = max(n_rows - w, 0) - max(old_rows - w, 0)
+        if n_new > 0:
+            with profiler.stage("simulate"):
+                local = {name: arr[..., first - base :] for name, arr in prefixes.items()}
+                local_prices = prices[first:]
+                price_moments = (state["centres"]["price"], *local["price_moments"])
+                grid = leveraged_block(
+                    local_prices,
+                    args.leverage,
+                    w,
+                    periods_per_year,
+                    prefixes={
+                        "log": (local["log"], local["bust"]),
+                        "moments": price_moments,
+                    },
+                    dtype=_result_dtype(args),
+                )
+                series = {"prices": local_prices}
+                if getattr(args, "underlying", False):
+                    series["log_prices"] = np.log(local_prices)
+                    series["price_moments"] = price_moments
+                if tr_prices is not None:
+                    grid["dividend"] = leveraged_block(
+                        tr_prices[first:],
+                        _dividend_leverages(args),
+                        w,
+                        periods_per_year,
+                        dtype=_result_dtype(args),
+                    )
+            with profiler.stage("assemble"):
+                new = _window_tables(
+                    data.iloc[first:].reset_index(drop=True),
+                    args,
+                    w,
+                    grid,
+                    series,
+                    summarise=False,
+                    profiler=profiler,
+                )
+            state["tables"][w] = tuple(
+                pd.concat([old, part], ignore_index=True)
+                for old, part in zip(old_tables, new[:3])
+            )
+            accumulate(info["accumulators"], new[5])
+            info["n_windows"] += n_new
+            info["busts"] = [
+                count + new[5]["bust"][col]
+                for count, (col, _) in zip(info["busts"], _bust_columns(args))
+            ]
+
+        returns_df, annualised_returns_df, drawdowns_df = state["tables"][w]
+        with profiler.stage("summary_statistics"):
+            summary_df = _bust_summary(
+                _bust_columns(args), info["busts"], info["n_windows"]
+            )
+            stats_df = accumulated_statistics(returns_df, summary_df, info["accumulators"])
+        per_window[w] = (
+            returns_df,
+            annualised_returns_df,
+            drawdowns_df,
+            summary_df,
+            stats_df,
+        )
+
+    state["base"], state["prefixes"] = keep_tail(prefixes, n_rows, window_sizes)
+    state["n_rows"] = n_rows
+    state["fingerprint"] = fingerprint(data, _input_columns(args), n_rows)
+    return per_window
+
+
+def _price_columns(args):
+    """The ``--pricecol`` columns as a list; a plain string is one column."""
+    cols = args.pricecol
+    return [cols] if isinstance(cols, str) else list(cols)
+
+
+def _asset_args(args, col, tagged):
+    """``args`` of the run of price column ``col``.
+
+    In a multi-asset run (``tagged``) the output files are prefixed with the
+    column name and ``--state`` keeps one subdirectory per column.
+    """
+    fields = dict(vars(args), pricecol=col)
+    if tagged:
+        fields["asset"] = col
+        if getattr(args, "state", None) is not None:
+            fields["state"] = os.path.join(args.state, col)
+    return Namespace(**fields)
+
+
+def _output_path(args, name, fmt):
+    """File of output ``name``, prefixed with the asset in multi-asset runs."""
+    asset = getattr(args, "asset", None)
+    if asset is not None:
+        name = f"{asset}_{name}"
+    return name_run_output(name, args.out, args.leverage, fmt)
+
+
+def _input_columns(args):
+    """The input columns a run reads: dates, prices and optional dividends."""
+    cols = [args.datecol, *_price_columns(args)]
+    if getattr(args, "dividendcol", None) is not None:
+        cols.append(args.dividendcol)
+    return cols
+
+
+def _plot_returns(pool, args, returns_df, annualised_returns_df, plot_cols, tag=""):
+    """Render and save the three return boxplots, suffixing file names with ``tag``.
+
+    Box statistics are computed once per table and the figures are drawn
+    and saved in the thread ``pool``; the returned futures complete once
+    their file is written. Unless ``args.headless`` is set, the plain
+    returns figure is drawn through pyplot on the calling thread and shown.
+    """
+    returns_stats = box_statistics(returns_df, plot_cols)
+    ann_stats = box_statistics(annualised_returns_df, plot_cols)
+
+    def save(fig, name):
+        fig.savefig(_output_path(args, f"{name}{tag}", "png"))
+
+    def render(name, table, **kwargs):
+        save(boxplot_returns(table, plot_cols, **kwargs), name)
+
+    futures = []
+    if getattr(args, "headless", False):
+        futures.append(
+            pool.submit(render, "returns", returns_df, showfliers=False, stats=returns_stats)
+        )
+    else:
+        # imported here so runs without --plot never load matplotlib
+        import matplotlib.pyplot as plt
 
         fig = boxplot_returns(
-            returns_df=returns_df,
-            portfolio_cols=plot_cols,
-            showfliers=False,
+            returns_df, plot_cols, showfliers=False, stats=returns_stats, figure=plt.figure()
         )
         fig.show()
-        fig.savefig(name_run_output("returns", args.out, args.leverage, "png"))
+        save(fig, "returns")
         plt.close(fig)
-
-        log_fig = boxplot_returns(returns_df, plot_cols, log=True)
-        log_fig.savefig(name_run_output("returns_log", args.out, args.leverage, "png"))
-        plt.close(log_fig)
-
-        ann_fig = boxplot_returns(
-            returns_df=annualised_returns_df,
-            portfolio_cols=plot_cols,
+    futures.append(
+        pool.submit(render, "returns_log", returns_df, log=True, stats=returns_stats)
+    )
+    futures.append(
+        pool.submit(
+            render,
+            "returns_annualized",
+            annualised_returns_df,
             showfliers=False,
             label="annualized return",
+            stats=ann_stats,
+        )
+    )
+    return futures
+
+
+def _full_run(
+    data, args, window_sizes, prices_arr, tr_prices, profiler=NULL_PROFILER, grids=None
+):
+    """Simulate every window of every size; see :func:`_window_tables`.
+
+    The dividend portfolios are the leverage grid of the total-return prices
+    ``tr_prices``, so they get every metric of the price portfolios.
+    ``grids`` may hold the already simulated leverage grid of ``prices_arr``.
+    """
+    periods_per_year = FREQ_TO_PERIODS.get(args.freq, 12)
+
+    with profiler.stage("simulate"):
+        # price-derived quantities shared by every window size
+        price_returns = np.diff(prices_arr) / prices_arr[:-1]
+        series = {"prices": prices_arr}
+        if getattr(args, "underlying", False):
+            series["log_prices"] = np.log(prices_arr)
+            series["price_moments"] = moment_prefixes(price_returns)
+
+        mem_budget_mb = getattr(args, "mem_budget_mb", None)
+        max_bytes = (
+            DEFAULT_MAX_BYTES if mem_budget_mb is None else int(mem_budget_mb * 2**20)
+        )
+        grid_kwargs = dict(
+            jobs=getattr(args, "jobs", 1) or 1,
+            max_bytes=max_bytes,
+            dtype=_result_dtype(args),
+        )
+        cache_dir = getattr(args, "cache_dir", None)
+        if cache_dir is not None:
+            cache_mb = getattr(args, "cache_max_mb", None)
+            cache = ResultCache(
+                cache_dir,
+                DEFAULT_CACHE_BYTES if cache_mb is None else int(cache_mb * 2**20),
+            )
+            simulate = partial(cached_simulate_grid, cache)
+        else:
+            simulate = simulate_grid
+        if grids is None:
+            grids = simulate(
+                prices_arr, args.leverage, window_sizes, periods_per_year, **grid_kwargs
+            )
+        if tr_prices is not None:
+            dividend_grids = simulate(
+                tr_prices,
+                _dividend_leverages(args),
+                window_sizes,
+                periods_per_year,
+                **grid_kwargs,
+            )
+            for w in window_sizes:
+                grids[w]["dividend"] = dividend_grids[w]
+
+    per_window = {}
+    for w in window_sizes:
+        with profiler.stage("assemble"):
+            per_window[w] = _window_tables(
+                data, args, w, grids[w], series, profiler=profiler
+            )
+    return per_window
+
+
+def _combine(parts):
+    """Per-window-size table tuples as single tables.
+
+    With several window sizes the tables are stacked into one long table per
+    output, with a leading ``window`` column.
+    """
+    if len(parts) == 1:
+        return next(iter(parts.values()))
+    tables = []
+    for i in range(len(next(iter(parts.values())))):
+        table = pd.concat(
+            [part[i].assign(window=w) for w, part in parts.items()], ignore_index=True
+        )
+        tables.append(table[["window"] + list(table.columns[:-1])])
+    return tuple(tables)
+
+
+def _bootstrap_run(args, window_sizes, prices_arr, out_format, profiler):
+    """Summaries of ``--bootstrap`` synthetic windows of every window size.
+
+    The leverage columns of each synthetic window are evaluated like a
+    historical one and summarised by :func:`accumulated_statistics`, with the
+    interquartile range from a quantile sketch, so no path is kept in
+    memory. The bust and summary tables are written with a ``bootstrap_``
+    prefix.
+    """
+    periods_per_year = FREQ_TO_PERIODS.get(args.freq, 12)
+    n_paths = int(args.bootstrap)
+    cols = [f"portfolio_{lev}x" for lev in args.leverage]
+    mem_budget_mb = getattr(args, "mem_budget_mb", None)
+    max_bytes = DEFAULT_MAX_BYTES if mem_budget_mb is None else int(mem_budget_mb * 2**20)
+
+    parts = {}
+    for w in window_sizes:
+        # one batch of paths at a time, folded into accumulators
+        with profiler.stage("bootstrap"):
+            accumulators, busts = bootstrap_accumulators(
+                prices_arr,
+                args.leverage,
+                w,
+                n_paths,
+                periods_per_year,
+                block_size=getattr(args, "block_size", 12),
+                method=getattr(args, "bootstrap_method", "stationary"),
+                seed=getattr(args, "seed", None),
+                max_bytes=max_bytes,
+                columns=cols,
+            )
+        profiler.count("paths_simulated", n_paths * len(cols))
+        with profiler.stage("summary_statistics"):
+            bust_df = _bust_summary(
+                _bust_columns(args, dividends=False), busts.tolist(), n_paths
+            )
+            parts[w] = (bust_df, accumulated_statistics(None, bust_df, accumulators))
+
+    summary_df, stats_df = _combine(parts)
+    with profiler.stage("write"):
+        for name, table in (
+            ("bootstrap_bust_summary", summary_df),
+            ("bootstrap_summary_statistics", stats_df),
+        ):
+            write_table(
+                table,
+                _output_path(args, name, out_format),
+                out_format,
+            )
+    return summary_df, stats_df
+
+
+def _stream_run(
+    data,
+    args,
+    window_sizes,
+    prices_arr,
+    tr_prices,
+    chunk_windows,
+    profiler=NULL_PROFILER,
+):
+    """Compute the per-window tables in chunks of windows and append each chunk
+    to the output files as it is produced.
+
+    Only ``chunk_windows + window_size`` rows of prefix arrays and one chunk of
+    results are held at a time; the summaries come from accumulators, with the
+    interquartile range from the quantile sketch of each total-return
+    accumulator. Returns ``(summary_df, stats_df)``.
+    """
+    periods_per_year = FREQ_TO_PERIODS.get(args.freq, 12)
+    out_format = getattr(args, "format", "csv") or "csv"
+    mem_budget_mb = getattr(args, "mem_budget_mb", None)
+    max_bytes = DEFAULT_MAX_BYTES if mem_budget_mb is None else int(mem_budget_mb * 2**20)
+    names = ("returns", "ann_returns", "drawdowns")
+    writers = [
+        TableWriter(_output_path(args, name, out_format), out_format)
+        for name in names
+    ]
+
+    summaries = {}
+    try:
+        for w in window_sizes:
+            accumulators = new_accumulators(_value_cols(args), DEFAULT_SKETCH_K)
+            bust_cols = _bust_columns(args)
+            busts = np.zeros(len(bust_cols), dtype=np.int64)
+            for lo, hi, centres, local in sweep_prefixes(
+                prices_arr, args.leverage, w, chunk_windows
+            ):
+                rows = slice(lo, hi + w)
+                with profiler.stage("simulate"):
+                    price_moments = (centres["price"], *local["price_moments"])
+                    grid = leveraged_block(
+                        prices_arr[rows],
+                        args.leverage,
+                        w,
+                        periods_per_year,
+                        max_bytes=max_bytes,
+                        prefixes={
+                            "log": (local["log"], local["bust"]),
+                            "moments": price_moments,
+                        },
+                        dtype=_result_dtype(args),
+                    )
+                    series = {"prices": prices_arr[rows]}
+                    if getattr(args, "underlying", False):
+                        series["log_prices"] = np.log(prices_arr[rows])
+                        series["price_moments"] = price_moments
+                    if tr_prices is not None:
+                        grid["dividend"] = leveraged_block(
+                            tr_prices[rows],
+                            _dividend_leverages(args),
+                            w,
+                            periods_per_year,
+                            max_bytes=max_bytes,
+                            dtype=_result_dtype(args),
+                        )
+                with profiler.stage("assemble"):
+                    tables = _window_tables(
+                        data.iloc[rows].reset_index(drop=True),
+                        args,
+                        w,
+                        grid,
+                        series,
+                        summarise=False,
+                        profiler=profiler,
+                    )
+                    parts = tables[:3]
+                    if len(window_sizes) > 1:
+                        parts = [t.assign(window=w)[["window", *t.columns]] for t in parts]
+                with profiler.stage("write"):
+                    for writer, table in zip(writers, parts):
+                        writer.append(table)
+                accumulate(accumulators, tables[5])
+                busts += [tables[5]["bust"][col] for col, _ in bust_cols]
+
+            n_windows = max(len(prices_arr) - w, 0)
+            with profiler.stage("summary_statistics"):
+                summary_df = _bust_summary(bust_cols, busts.tolist(), n_windows)
+                summaries[w] = (
+                    summary_df,
+                    accumulated_statistics(None, summary_df, accumulators),
+                )
+    finally:
+        for writer in writers:
+            writer.close()
+
+    summary_df, stats_df = _combine(summaries)
+    with profiler.stage("write"):
+        for name, table in (
+            ("bust_summary", summary_df),
+            ("summary_statistics", stats_df),
+        ):
+            write_table(
+                table,
+                _output_path(args, name, out_format),
+                out_format,
+            )
+    return summary_df, stats_df
+
+
+def main(args):
+    """Run the CLI on ``args``; see ``main.py`` for the options.
+
+    With ``--profile`` (or ``PORTFOLIO_PROFILE=1``) the wall time, CPU time
+    and traced peak memory of every stage, plus event counters, are written
+    to a ``profile`` JSON file next to the other outputs.
+    """
+    profiler = StageProfiler(enabled=profiling_requested(getattr(args, "profile", False)))
+    try:
+        result = _run(args, profiler)
+        if profiler.enabled:
+            profiler.write(
+                name_run_output("profile", args.out, args.leverage, "json"),
+                args=vars(args),
+            )
+        return result
+    finally:
+        profiler.close()
+
+
+def _run(args, profiler):
+    with profiler.stage("load"):
+        value_dtypes = {col: "float64" for col in _input_columns(args)[1:]}
+        data = read_table(
+            args.csv,
+            _input_columns(args),
+            getattr(args, "input_format", None),
+            dtype=value_dtypes,
+            sidecar=getattr(args, "sidecar", False),
         )
-        ann_fig.savefig(
-            name_run_output("returns_annualized", args.out, args.leverage, "png")
+    profiler.count("rows_loaded", len(data))
+
+    window_sizes = parse_window_sizes(args.window)
+    price_cols = _price_columns(args)
+    if len(price_cols) > 1:
+        return _multi_asset_run(data, args, price_cols, window_sizes, profiler)
+    return _asset_run(data, _asset_args(args, price_cols[0], False), window_sizes, profiler)
+
+
+def _multi_asset_run(data, args, price_cols, window_sizes, profiler):
+    """Run every ``--pricecol`` column over the one loaded table.
+
+    The leverage grids of all columns come from one :func:`simulate_grid`
+    call on the ``(asset, row)`` price array, which uses a single process
+    pool under ``--jobs``; each column then gets the tables of a
+    single-column run from its view of the grid, written with the column
+    name as a prefix. The bust summaries and summary statistics of all columns are
+    also written as combined tables with a leading ``asset`` column.
+
+    Returns ``(returns, annualised_returns, summary_df, stats_df)`` where the
+    first two are dicts of per-asset tables and the last two the combined
+    tables.
+    """
+    if getattr(args, "dividendcol", None) is not None:
+        raise ValueError("--dividendcol needs a single --pricecol")
+    out_format = getattr(args, "format", "csv") or "csv"
+    batched = not (
+        getattr(args, "stream_chunk", None)
+        or getattr(args, "state", None) is not None
+        or getattr(args, "cache_dir", None) is not None
+    )
+
+    grids = None
+    if batched:
+        with profiler.stage("simulate"):
+            mem_budget_mb = getattr(args, "mem_budget_mb", None)
+            stacked = simulate_grid(
+                data[price_cols].to_numpy(dtype=float).T,
+                args.leverage,
+                window_sizes,
+                FREQ_TO_PERIODS.get(args.freq, 12),
+                jobs=getattr(args, "jobs", 1) or 1,
+                max_bytes=(
+                    DEFAULT_MAX_BYTES if mem_budget_mb is None else int(mem_budget_mb * 2**20)
+                ),
+                dtype=_result_dtype(args),
+            )
+
+    returns, annualised, summaries, stats = {}, {}, {}, {}
+    for a, col in enumerate(price_cols):
+        if batched:
+            grids = {
+                w: {name: arr[a] for name, arr in stacked[w].items()} for w in window_sizes
+            }
+        returns[col], annualised[col], summaries[col], stats[col] = _asset_run(
+            data, _asset_args(args, col, True), window_sizes, profiler, grids
+        )
+
+    summary_df = _stack_assets(summaries)
+    stats_df = _stack_assets(stats)
+    with profiler.stage("write"):
+        for name, table in (
+            ("bust_summary", summary_df),
+            ("summary_statistics", stats_df),
+        ):
+            write_table(
+                table,
+                name_run_output(name, args.out, args.leverage, out_format),
+                out_format,
+            )
+    return returns, annualised, summary_df, stats_df
+
+
+def _stack_assets(parts):
+    """Per-asset tables as one table with a leading ``asset`` column."""
+    table = pd.concat([part.assign(asset=col) for col, part in parts.items()], ignore_index=True)
+    return table[["asset"] + list(table.columns[:-1])]
+
+
+def _asset_run(data, args, window_sizes, profiler, grids=None):
+    """Simulate, summarise, write and plot the run of the price column
+    ``args.pricecol``; ``grids`` may hold its precomputed leverage grids."""
+    dividend_column = getattr(args, "dividendcol", None)
+
+    prices_arr = data[args.pricecol].to_numpy(dtype=float)
+    # dividend portfolios are simulated on the total-return index of the prices
+    tr_prices = None
+    if dividend_column is not None:
+        tr_prices = total_return_prices(
+            prices_arr, data[dividend_column].to_numpy(dtype=float)
         )
-        plt.close(ann_fig)
+
+    state_dir = getattr(args, "state", None)
+    out_format = getattr(args, "format", "csv") or "csv"
+    if getattr(args, "bootstrap", None):
+        _bootstrap_run(args, window_sizes, prices_arr, out_format, profiler)
+
+    stream_chunk = getattr(args, "stream_chunk", None)
+    if stream_chunk:
+        if state_dir is not None or getattr(args, "plot", False):
+            raise ValueError("--stream-chunk cannot be combined with --state or --plot")
+        summary_df, stats_df = _stream_run(
+            data,
+            args,
+            window_sizes,
+            prices_arr,
+            tr_prices,
+            stream_chunk,
+            profiler,
+        )
+        return None, None, summary_df, stats_df
+
+    # with --state, only windows ending in rows appended since the saved run
+    # are simulated
+    state = None
+    if state_dir is not None:
+        with profiler.stage("state"):
+            params = run_params(args, window_sizes)
+            state = load_state(state_dir, params)
+            if state is not None and not is_continuation(
+                state, data, _input_columns(args)
+            ):
+                state = None
+    if state is not None:
+        per_window = _append_windows(
+            data, args, window_sizes, state, prices_arr, tr_prices, profiler
+        )
+    else:
+        per_window = _full_run(
+            data, args, window_sizes, prices_arr, tr_prices, profiler, grids
+        )
+        if state_dir is not None:
+            with profiler.stage("state"):
+                state = _new_state(
+                    params, data, args, window_sizes, per_window, prices_arr
+                )
+    if state_dir is not None:
+        with profiler.stage("state"):
+            save_state(state_dir, state)
+
+    with profiler.stage("assemble"):
+        tables = _combine({w: per_window[w][:5] for w in window_sizes})
+    returns_df, annualised_returns_df, drawdowns_df, summary_df, stats_df = tables
+
+    # figures render in background threads while the tables are written
+    plot_jobs = []
+    pool = None
+    if getattr(args, "plot", False):
+        plot_cols = _value_cols(args)
+        pool = ThreadPoolExecutor(max_workers=PLOT_THREADS)
+        with profiler.stage("plot"):
+            for w in window_sizes:
+                tag = "" if len(window_sizes) == 1 else f"_w{w}"
+                plot_jobs += _plot_returns(
+                    pool, args, per_window[w][0], per_window[w][1], plot_cols, tag
+                )
+
+    try:
+        with profiler.stage("write"):
+            for name, table in (
+                ("returns", returns_df),
+                ("ann_returns", annualised_returns_df),
+                ("drawdowns", drawdowns_df),
+                ("bust_summary", summary_df),
+                ("summary_statistics", stats_df),
+            ):
+                write_table(
+                    table,
+                    _output_path(args, name, out_format),
+                    out_format,
+                )
+        with profiler.stage("plot"):
+            for job in plot_jobs:
+                job.result()
+    finally:
+        if pool is not None:
+            pool.shutdown()
     return returns_df, annualised_returns_df, summary_df, stats_df
 
 
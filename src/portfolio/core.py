@@ -1,6 +1,6 @@
 import pandas as pd
 from typing import List, Optional
-from .utils import to_native
+from .jit import get_kernels
 import numpy as np
 
 
@@ -18,21 +18,38 @@ def simulate_leveraged_series(prices: pd.Series, leverage: float) -> pd.Series:
 
 
 def simulate_window(
-    prices: pd.Series, leverage: float, init_value: float = 1000
+    prices: pd.Series, leverage: float, init_value: float = 1000, engine: str = "numpy"
 ) -> np.ndarray:
     """
     prices : settlement prices from window start *through* window end
     returns: array of portfolio equity V_i (same length as prices)
+    engine : "numpy" or "numba", see :func:`portfolio.jit.get_kernels`
+
+    The path is compounded in linear space; :func:`simulate_log_window`
+    gives its logarithm without overflow for long, highly leveraged windows.
     """
-    V = np.empty(len(prices), dtype=float)
-    V[0] = init_value
+    prices = np.asarray(prices, dtype=float)
+    return get_kernels(engine).leveraged_path(prices, float(leverage), float(init_value))
+
+
+def simulate_log_window(prices, leverage: float, init_value: float = 1000) -> np.ndarray:
+    """Log of the :func:`simulate_window` equity path, accumulated in log space.
 
-    for i in range(len(prices) - 1):
-        P_i = prices.iloc[i]
-        Q_i = leverage * V[i] / P_i  # position held during [i, i+1)
-        V[i + 1] = V[i] + (Q_i * (prices.iloc[i + 1] - P_i))
+    ``simulate_window`` multiplies the equity by ``1 + leverage * r_i`` every
+    period, which overflows (or underflows to zero) over long windows at
+    high leverage. Here the log factors are summed instead, so the path stays
+    finite; rows from the first non-positive factor on are ``-inf``, as the
+    equity is wiped out there.
 
-    return V
+    Examples
+    --------
+    >>> simulate_log_window([100, 110, 99], 2, 1).round(4).tolist()
+    [0.0, 0.1823, -0.0408]
+    >>> simulate_log_window([100, 50, 60], 3, 1)[1:].tolist()
+    [-inf, -inf]
+    """
+    log_prefix, bust_prefix = leveraged_log_prefix(prices, float(leverage))
+    return np.where(bust_prefix > 0, -np.inf, np.log(init_value) + log_prefix)
 
 
 def detect_bust(equity_path: np.ndarray) -> bool:
@@ -49,6 +66,223 @@ def detect_bust(equity_path: np.ndarray) -> bool:
     return (np.asarray(equity_path) <= 0).any()
 
 
+def leveraged_log_prefix(prices, leverage):
+    """Prefix sums of ``log(1 + leverage * r_i)`` for a daily-rebalanced position.
+
+    ``simulate_window`` grows equity by the factor ``1 + leverage * r_i`` each
+    period, so the growth over rows ``[start, end]`` is
+    ``exp(log_prefix[end] - log_prefix[start])`` provided no factor in that
+    range is non-positive. Non-positive factors contribute ``0`` to
+    ``log_prefix`` and are counted in ``bust_prefix`` instead.
+
+    Parameters
+    ----------
+    prices : array-like
+        Price series, one entry per row.
+    leverage : float or array-like
+        Leverage applied at every rebalance. A 1-D array of leverages yields
+        one row of prefix sums per leverage.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        ``(log_prefix, bust_prefix)``, with ``len(prices)`` entries along the
+        last axis.
+
+    Examples
+    --------
+    >>> log_prefix, bust_prefix = leveraged_log_prefix([100, 110, 99], 10)
+    >>> bust_prefix.tolist()
+    [0, 0, 1]
+    >>> leveraged_log_prefix([100, 110, 99], [1, 10])[1].tolist()
+    [[0, 0, 0], [0, 0, 1]]
+    """
+    log_factors, busted = _leveraged_log_factors(prices, leverage)
+    shape = log_factors.shape[:-1] + (log_factors.shape[-1] + 1,)
+    log_prefix = np.zeros(shape, dtype=float)
+    np.cumsum(log_factors, axis=-1, out=log_prefix[..., 1:])
+    bust_prefix = np.zeros(shape, dtype=np.int64)
+    np.cumsum(busted, axis=-1, out=bust_prefix[..., 1:])
+    return log_prefix, bust_prefix
+
+
+def _leveraged_log_factors(prices, leverage):
+    """Per-period ``log(1 + leverage * r_i)`` (``0`` where busted) and bust flags."""
+    prices = np.asarray(prices, dtype=float)
+    leverage = np.asarray(leverage, dtype=float)
+    price_returns = (prices[1:] - prices[:-1]) / prices[:-1]
+    factors = 1.0 + leverage[..., None] * price_returns
+    busted = factors <= 0
+    return np.log(np.where(busted, 1.0, factors)), busted
+
+
+def _window_range(n_rows, window_size, start=0, stop=None):
+    """Clip ``[start, stop)`` to the windows that exist in ``n_rows`` rows."""
+    n_windows = max(n_rows - window_size, 0)
+    stop = n_windows if stop is None else min(stop, n_windows)
+    return min(start, stop), stop
+
+
+def _window_growth(
+    log_prefix, bust_prefix, window_size, periods_per_year, start=0, stop=None, dtype=float
+):
+    """Turn prefix sums into ``(total_return, cagr, bust)`` for windows ``[start, stop)``.
+
+    The returns are computed in float64 and rounded once to ``dtype``.
+    """
+    start, stop = _window_range(log_prefix.shape[-1], window_size, start, stop)
+    starts = np.arange(start, stop)
+    ends = starts + window_size
+
+    bust = (bust_prefix[..., ends] - bust_prefix[..., starts]) > 0
+    log_growth = log_prefix[..., ends] - log_prefix[..., starts]
+    total_return = np.where(bust, 0.0, np.expm1(log_growth)).astype(dtype, copy=False)
+    cagr = np.where(bust, 0.0, np.expm1(log_growth * periods_per_year / window_size))
+    return total_return, cagr.astype(dtype, copy=False), bust
+
+
+def rolling_leveraged_returns(
+    prices, leverage: float, window_size: int, periods_per_year: int = 12
+):
+    """Total return, CAGR and bust flag of every window, in O(N).
+
+    Equivalent to calling :func:`simulate_window` and :func:`detect_bust` on
+    each window from :func:`identify_windows`, but computed from a single
+    pass of :func:`leveraged_log_prefix`. Busted windows report ``0.0`` for
+    both the total return and the CAGR, as the CLI does.
+
+    Parameters
+    ----------
+    prices : array-like
+        Price series, one entry per row.
+    leverage : float
+        Leverage applied at every rebalance.
+    window_size : int
+        Number of periods in each window.
+    periods_per_year : int, optional
+        How many periods constitute one year, used for the CAGR.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray, np.ndarray]
+        ``(total_return, cagr, bust)`` with one entry per window.
+
+    Examples
+    --------
+    >>> total, cagr, bust = rolling_leveraged_returns([100, 110, 99], 2, 1)
+    >>> total.round(2).tolist()
+    [0.2, -0.2]
+    >>> bust.tolist()
+    [False, False]
+    """
+    log_prefix, bust_prefix = leveraged_log_prefix(prices, leverage)
+    return _window_growth(log_prefix, bust_prefix, window_size, periods_per_year)
+
+
+# working-set budget for one leverage chunk of ``batched_leveraged_returns``
+DEFAULT_MAX_BYTES = 256 * 2**20
+
+# Storage dtypes of per-window results. Growth is always accumulated in
+# float64 log space and each result is rounded once when stored, so a
+# float32 result differs from the float64 one by at most FLOAT32_RTOL
+# relative (unit roundoff), unless it overflows float32 (a growth factor
+# above ~3.4e38, i.e. a log growth above ~88.7).
+RESULT_DTYPES = ("float64", "float32")
+FLOAT32_RTOL = 2.0**-24
+
+
+def leverage_chunk_size(n_rows: int, n_windows: int, max_bytes: int) -> int:
+    """How many leverages fit in one chunk of ``max_bytes`` (at least one)."""
+    # factors, logs, both prefix arrays and the per-window temporaries
+    bytes_per_leverage = 8 * (4 * n_rows + 4 * n_windows)
+    return max(1, int(max_bytes // max(bytes_per_leverage, 1)))
+
+
+def batched_leveraged_returns(
+    prices,
+    leverages,
+    window_size: int,
+    periods_per_year: int = 12,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    start: int = 0,
+    stop: Optional[int] = None,
+    prefix=None,
+    dtype=float,
+):
+    """Window metrics for a whole grid of leverages at once.
+
+    Broadcasts :func:`leveraged_log_prefix` over ``leverages`` and returns
+    ``(leverage x window)`` arrays. Leverages are processed in chunks sized
+    so that the intermediate prefix arrays of one chunk stay within
+    ``max_bytes``; at least one leverage is processed per chunk.
+
+    Parameters
+    ----------
+    prices : array-like
+        Price series, one entry per row.
+    leverages : array-like
+        1-D sequence of leverage levels.
+    window_size : int
+        Number of periods in each window.
+    periods_per_year : int, optional
+        How many periods constitute one year, used for the CAGR.
+    max_bytes : int, optional
+        Approximate memory budget for one chunk of leverages.
+    start, stop : int, optional
+        Only compute windows ``start <= w < stop``. Every window's value is
+        the same whichever range it is computed in.
+    prefix : tuple[np.ndarray, np.ndarray], optional
+        ``leveraged_log_prefix(prices, leverages)`` computed by the caller,
+        e.g. to share it across several window sizes.
+    dtype : dtype, optional
+        Storage dtype of the returns; ``float32`` halves the output memory,
+        within :data:`FLOAT32_RTOL` of the float64 results.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray, np.ndarray]
+        ``(total_return, cagr, bust)``, each of shape
+        ``(len(leverages), stop - start)``.
+
+    Examples
+    --------
+    >>> total, cagr, bust = batched_leveraged_returns([100, 110, 99], [1, 2, 20], 1)
+    >>> total.round(2).tolist()
+    [[0.1, -0.1], [0.2, -0.2], [2.0, 0.0]]
+    >>> bust.tolist()
+    [[False, False], [False, False], [False, True]]
+    """
+    prices = np.asarray(prices, dtype=float)
+    leverages = np.asarray(leverages, dtype=float).ravel()
+    start, stop = _window_range(len(prices), window_size, start, stop)
+    n_windows = stop - start
+    if prefix is not None:
+        log_prefix, bust_prefix = prefix
+        return _window_growth(
+            np.atleast_2d(log_prefix),
+            np.atleast_2d(bust_prefix),
+            window_size,
+            periods_per_year,
+            start,
+            stop,
+            dtype,
+        )
+
+    total_return = np.empty((len(leverages), n_windows), dtype=dtype)
+    cagr = np.empty((len(leverages), n_windows), dtype=dtype)
+    bust = np.empty((len(leverages), n_windows), dtype=bool)
+
+    chunk = leverage_chunk_size(len(prices), n_windows, max_bytes)
+
+    for lo in range(0, len(leverages), chunk):
+        hi = min(lo + chunk, len(leverages))
+        log_prefix, bust_prefix = leveraged_log_prefix(prices, leverages[lo:hi])
+        total_return[lo:hi], cagr[lo:hi], bust[lo:hi] = _window_growth(
+            log_prefix, bust_prefix, window_size, periods_per_year, start, stop, dtype
+        )
+    return total_return, cagr, bust
+
+
 def identify_windows(df, window_size):
     """
     given a df, returns a list of lists of all possible sliding windows start/endpoints of a given window size.
@@ -101,6 +335,12 @@ def calc_window_returns(
     """
     calculates portfolio return over all possible rolling windows of a given size
 
+    The window dates are returned as ``start_<date_column>`` and
+    ``end_<date_column>`` columns with the dtype of ``date_column``, and the
+    ratios of every portfolio column are computed at once from two offset
+    slices of their 2D value array, so nothing but the selected columns and
+    the output is materialised.
+
     ----
     example:
     >>> import pandas as pd
@@ -111,50 +351,40 @@ def calc_window_returns(
     ...    })
     >>> out = calc_window_returns(df,window_size=1, date_column = 'date', portfolio_columns=['portfolio1','portfolio2'])
     >>> out.equals(pd.DataFrame({
-    ... 'window_dates':[['day1','day2'],['day2','day3']],
+    ... 'start_date':['day1','day2'],
+    ... 'end_date':['day2','day3'],
     ... 'portfolio1_returns':[2.0,10.0],
     ... 'portfolio2_returns':[0.5,0.1]
     ...  }))
     True
     """
-    df = df.copy()
     if portfolio_columns is None:
         portfolio_columns = []
-    windows = identify_windows(df, window_size=window_size)
-    window_dates = []
-    for date_idx, window in enumerate(windows):
-        start_idx = window[0]
-        end_idx = window[1]
-        start_val = df.iloc[start_idx, df.columns.get_loc(date_column)]
-        end_val = df.iloc[end_idx, df.columns.get_loc(date_column)]
-        window_dates.append([to_native(start_val), to_native(end_val)])
-
+    n_windows = max(len(df) - window_size, 0)
+    dates = df[date_column]
     out = pd.DataFrame(
         {
-            "window_dates": window_dates,
+            f"start_{date_column}": dates.iloc[:n_windows].reset_index(drop=True),
+            f"end_{date_column}": dates.iloc[
+                window_size : window_size + n_windows
+            ].reset_index(drop=True),
         }
     )
+    if not portfolio_columns:
+        return out
+
+    # return is portfolio at end / portfolio at start, for every window and column
+    values = df[list(portfolio_columns)].to_numpy(dtype=float)
+    ratios = values[window_size : window_size + n_windows] / values[:n_windows]
+    returns = pd.DataFrame(
+        ratios, columns=[f"{portfolio}_returns" for portfolio in portfolio_columns]
+    )
+    return pd.concat([out, returns], axis=1)
+
 
-    # for each portfolio column, calculate the returns over the defined windows and add to the outdf
-    for portfolio in portfolio_columns:
-        # calculate the return for each window
-        portfolio_returns = []  # captures return over the many possible windows
-        for window in windows:
-            start_idx = window[0]
-            end_idx = window[1]
-            # return is portfolio at end / portfolio at start
-            window_return = (
-                df.iloc[end_idx, df.columns.get_loc(portfolio)]
-                / df.iloc[start_idx, df.columns.get_loc(portfolio)]
-            )
-            portfolio_returns.append(window_return)
-        # add the returns to the out
-        out[f"{portfolio}_returns"] = portfolio_returns
-    # print(out)
-    return out
-
-
-def simulate_window_dividend(prices: pd.Series, dividends: pd.Series) -> np.ndarray:
+def simulate_window_dividend(
+    prices: pd.Series, dividends: pd.Series, engine: str = "numpy"
+) -> np.ndarray:
     """Simulate an unleveraged portfolio with reinvested dividends over ``prices``.
 
     Examples
@@ -166,18 +396,52 @@ def simulate_window_dividend(prices: pd.Series, dividends: pd.Series) -> np.ndar
     array([1.  , 1.11,1.221])
     """
 
-    V = np.empty(len(prices), dtype=float)
-    V[0] = 1.0
-    for i in range(len(prices) - 1):
-        """""
-        r = (prices.iloc[i + 1] - prices.iloc[i] + dividends.iloc[i + 1]) / prices.iloc[
-            i
-        ]
-        V[i + 1] = V[i] * (1.0 + r)
-        """
-        shares = V[i] / prices.iloc[i]
-        V[i + 1] = (prices.iloc[i + 1] * shares) + (dividends.iloc[i + 1] * shares)
-    return V
+    prices = np.asarray(prices, dtype=float)
+    dividends = np.asarray(dividends, dtype=float)
+    return get_kernels(engine).dividend_path(prices, dividends)
+
+
+def log_total_return_index(prices, dividends=None):
+    """Log of the total-return index of ``prices``, starting at ``0``.
+
+    Dividends paid on row ``i + 1`` are reinvested at that row's price, so
+    ``exp(index[j] - index[i])`` is the growth of one unit held from row
+    ``i`` to row ``j``.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> np.exp(log_total_return_index([100, 110, 120], [0.0, 1.0, 1.0])).round(3).tolist()
+    [1.0, 1.11, 1.221]
+    """
+    prices = np.asarray(prices, dtype=float)
+    gross = prices[1:].copy()
+    if dividends is not None:
+        gross += np.asarray(dividends, dtype=float)[1:]
+    index = np.zeros(len(prices), dtype=float)
+    np.cumsum(np.log(gross / prices[:-1]), out=index[1:])
+    return index
+
+
+def total_return_prices(prices, dividends):
+    """Total-return index of ``prices`` with ``dividends`` reinvested, in price units.
+
+    Its period returns are ``(P[i + 1] + D[i + 1]) / P[i] - 1``, so every
+    price-based engine becomes dividend-aware when given this series instead
+    of ``prices``: :func:`batched_leveraged_returns` or
+    :func:`portfolio.parallel.simulate_grid` on it evaluate leveraged
+    total-return portfolios over every window in O(N) per leverage, and at
+    ``1x`` their growth is that of :func:`simulate_window_dividend`.
+
+    Examples
+    --------
+    >>> total_return_prices([100, 110, 120], [0.0, 1.0, 1.0]).round(1).tolist()
+    [100.0, 111.0, 122.1]
+    """
+    prices = np.asarray(prices, dtype=float)
+    if len(prices) == 0:
+        return prices.copy()
+    return prices[0] * np.exp(log_total_return_index(prices, dividends))
 
 
 def underlying_return(prices: pd.Series) -> float:
@@ -197,10 +461,13 @@ def underlying_return(prices: pd.Series) -> float:
     return prices.iloc[-1] / prices.iloc[0] - 1.0
 
 
-def simulate_portfolio(df, leverage=1, dividend=False, rebalance_period=1):
+def simulate_portfolio(df, leverage=1, dividend=False, rebalance_period=1, engine="numpy"):
     """DEPRECATED
     Simulate portfolio value given an S&P real-price column.
 
+    For periodic rebalancing (with or without dividends) over every rolling
+    window use :func:`portfolio.rebalance.rolling_rebalanced_returns`.
+
     Examples
     --------
     Basic two-row sanity check (10 % price rise → 10 % portfolio rise)
@@ -215,24 +482,14 @@ def simulate_portfolio(df, leverage=1, dividend=False, rebalance_period=1):
     """
     df = df.copy()
 
-    df[f"portfolio_{leverage}x"] = 1.0
-    portfolio_idx = df.columns.get_loc(f"portfolio_{leverage}x")
-
-    last_rebalance = 0
-    for i in range(1, len(df)):
-        if i - last_rebalance == rebalance_period:
-            if dividend:
-                raise NotImplementedError("Dividend handling not built yet")
+    # the first rebalance happens at row ``rebalance_period``
+    if dividend and len(df) > rebalance_period:
+        raise NotImplementedError("Dividend handling not built yet")
 
-            base = df.iloc[last_rebalance, df.columns.get_loc("sp_real_price")]
-            curr = df.iloc[i, df.columns.get_loc("sp_real_price")]
-
-            df.iat[i, portfolio_idx] = (
-                df.iat[last_rebalance, portfolio_idx] * (curr / base) ** leverage
-            )
-            last_rebalance = i
-        else:  # carry forward
-            df.iat[i, portfolio_idx] = df.iat[i - 1, portfolio_idx]
+    prices = df["sp_real_price"].to_numpy(dtype=float)
+    df[f"portfolio_{leverage}x"] = get_kernels(engine).rebalance_path(
+        prices, float(leverage), int(rebalance_period)
+    )
 
     return df
 
@@ -0,0 +1,188 @@
+"""Per-window maximum drawdown and drawdown duration.
+
+Both metrics are read off the cumulative log-equity curve ``E`` (for a
+leveraged position this is :func:`portfolio.core.leveraged_log_prefix`).
+Range max/min/drawdown are answered from sparse tables, and the next
+recovery of every point is found by a binary search over the same tables,
+so all windows of a series are processed in O(N log W) without simulating
+any window individually.
+"""
+
+import numpy as np
+
+from .core import leveraged_log_prefix
+
+
+def _sparse_tables(values, n_levels):
+    """Range max, min and max drawdown over ``[i, i + 2**k)`` for each level ``k``."""
+    mx = [values]
+    mn = [values]
+    dd = [np.zeros_like(values)]
+    for k in range(1, n_levels):
+        h = 1 << (k - 1)
+        mx.append(np.maximum(mx[-1][:-h], mx[-1][h:]))
+        mn.append(np.minimum(mn[-1][:-h], mn[-1][h:]))
+        dd.append(
+            np.maximum(
+                np.maximum(dd[-1][:-h], dd[-1][h:]),
+                mx[k - 1][:-h] - mn[k - 1][h:],
+            )
+        )
+    return mx, mn, dd
+
+
+def _range(table, lo, length):
+    """Combine two overlapping level lookups covering ``[lo, lo + length)``."""
+    k = length.bit_length() - 1
+    return table[k][lo], table[k][lo + length - (1 << k)]
+
+
+def rolling_max_drawdown(log_equity, window_size: int):
+    """Maximum drawdown and longest underwater spell of every window.
+
+    Window ``w`` covers ``log_equity[w : w + window_size + 1]``, matching the
+    inclusive ``[start, end]`` price windows of
+    :func:`portfolio.core.identify_windows`.
+
+    Parameters
+    ----------
+    log_equity : array-like
+        Cumulative log-equity curve, one entry per row.
+    window_size : int
+        Number of periods in each window.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        ``(max_drawdown, duration)``. ``max_drawdown`` is the largest
+        peak-to-trough loss as a fraction of the peak; ``duration`` is the
+        largest number of consecutive periods spent below the running peak.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> mdd, duration = rolling_max_drawdown(np.log([100, 120, 90, 95, 130]), 3)
+    >>> mdd.round(2).tolist()
+    [0.25, 0.25]
+    >>> duration.tolist()
+    [2, 2]
+    """
+    E = np.asarray(log_equity, dtype=float)
+    n = len(E)
+    n_windows = max(n - window_size, 0)
+    if n_windows == 0:
+        return np.empty(0, dtype=float), np.empty(0, dtype=np.int64)
+
+    span = window_size + 1  # points per window
+    n_levels = span.bit_length()
+    mx, mn, dd = _sparse_tables(E, n_levels)
+    s = np.arange(n_windows)
+    e = s + window_size
+
+    # drawdown: two overlapping power-of-two blocks plus the cross term
+    # between the parts of the window that only one block covers
+    k = n_levels - 1
+    p = 1 << k
+    log_dd = np.maximum(dd[k][s], dd[k][s + span - p])
+    rest = span - p
+    if rest:
+        left_max = np.maximum(*_range(mx, s, rest))
+        right_min = np.minimum(*_range(mn, s + p, rest))
+        log_dd = np.maximum(log_dd, left_max - right_min)
+    max_drawdown = -np.expm1(-log_dd)
+
+    # next recovery: first j > i with E[j] >= E[i], searched up to i + window
+    idx = np.arange(n)
+    limit = np.minimum(idx + span, n)
+    pos = idx + 1
+    for k in range(n_levels - 1, -1, -1):
+        step = 1 << k
+        ok = pos + step <= limit
+        probe = np.where(ok, pos, 0)
+        ok &= mx[k][np.minimum(probe, len(mx[k]) - 1)] < E
+        pos = np.where(ok, pos + step, pos)
+    recovered = pos < limit
+    next_peak = np.append(np.where(recovered, pos, n), n)
+
+    # binary lifting along the chain of running peaks starting at each window
+    up = [next_peak]
+    best = [np.append(np.where(recovered, pos - idx - 1, 0), 0)]
+    for _ in range(1, n_levels):
+        prev_up, prev_best = up[-1], best[-1]
+        up.append(prev_up[prev_up])
+        best.append(np.maximum(prev_best, prev_best[prev_up]))
+
+    cur = s.copy()
+    longest = np.zeros(n_windows, dtype=np.int64)
+    for k in range(n_levels - 1, -1, -1):
+        nxt = up[k][cur]
+        take = nxt <= e
+        longest = np.where(take, np.maximum(longest, best[k][cur]), longest)
+        cur = np.where(take, nxt, cur)
+    duration = np.maximum(longest, e - cur)
+    return max_drawdown, duration
+
+
+def leveraged_drawdowns(
+    prices, leverage, window_size: int, start: int = 0, stop=None, prefix=None
+):
+    """Per-window drawdown metrics of a daily-rebalanced leveraged position.
+
+    Busted windows (see :func:`portfolio.core.rolling_leveraged_returns`)
+    report a drawdown of ``1.0`` and a duration of ``window_size``.
+
+    Parameters
+    ----------
+    prices : array-like
+        Price series, one entry per row.
+    leverage : float or array-like
+        Leverage, or a 1-D array of leverages processed one at a time.
+    window_size : int
+        Number of periods in each window.
+    start, stop : int, optional
+        Only compute windows ``start <= w < stop``.
+    prefix : tuple[np.ndarray, np.ndarray], optional
+        ``leveraged_log_prefix(prices, leverage)`` computed by the caller.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        ``(max_drawdown, duration)``, with a leading leverage axis when
+        ``leverage`` is an array.
+
+    Examples
+    --------
+    >>> mdd, duration = leveraged_drawdowns([100, 120, 90, 95, 130], [1, 5], 3)
+    >>> mdd.round(2).tolist()
+    [[0.25, 0.25], [1.0, 1.0]]
+    """
+    n_windows = max(len(prices) - window_size, 0)
+    stop = n_windows if stop is None else min(stop, n_windows)
+    start = min(start, stop)
+
+    leverage = np.asarray(leverage, dtype=float)
+    if leverage.ndim:
+        mdd = np.empty((len(leverage), stop - start), dtype=float)
+        duration = np.empty((len(leverage), stop - start), dtype=np.int64)
+        for row, lev in enumerate(leverage):
+            row_prefix = None if prefix is None else (prefix[0][row], prefix[1][row])
+            mdd[row], duration[row] = leveraged_drawdowns(
+                prices, lev, window_size, start, stop, row_prefix
+            )
+        return mdd, duration
+
+    if prefix is None:
+        prefix = leveraged_log_prefix(prices, float(leverage))
+    log_prefix, bust_prefix = prefix
+    # the log-equity values are global, so a slice gives the same windows
+    mdd, duration = rolling_max_drawdown(
+        log_prefix[start : stop + window_size], window_size
+    )
+    starts = np.arange(start, stop)
+    bust = (bust_prefix[starts + window_size] - bust_prefix[starts]) > 0
+    mdd[bust] = 1.0
+    duration[bust] = window_size
+    return mdd, duration
+
+
+__all__ = ["rolling_max_drawdown", "leveraged_drawdowns"]
@@ -0,0 +1,168 @@
+"""Columnar input and output for the CLI.
+
+Input files are read by their extension: ``.parquet``/``.pq`` as Parquet,
+``.feather``/``.arrow``/``.ipc`` as Arrow IPC (Feather v2), anything else as
+CSV. Only the requested columns are read, and Parquet/Feather keep their
+stored dtypes, so a datetime64 date column stays datetime64 through to the
+result tables. Parquet and Feather need the optional ``pyarrow`` dependency
+(``pip install -e .[arrow]``).
+"""
+
+import os
+
+import pandas as pd
+
+from .sidecar import read_csv_cached
+
+FORMATS = ("csv", "parquet", "feather")
+
+_EXTENSIONS = {
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather",
+    ".ipc": "feather",
+}
+
+
+def detect_format(path):
+    """Table format of ``path`` from its extension.
+
+    Examples
+    --------
+    >>> detect_format("prices.parquet"), detect_format("prices.arrow")
+    ('parquet', 'feather')
+    >>> detect_format("prices.csv")
+    'csv'
+    """
+    return _EXTENSIONS.get(os.path.splitext(str(path))[1].lower(), "csv")
+
+
+def read_table(path, columns, fmt=None, dtype=None, sidecar=False):
+    """Read only ``columns`` of the table at ``path``.
+
+    Parameters
+    ----------
+    path : str
+        Input file.
+    columns : list[str]
+        Columns to load, in the order they should appear.
+    fmt : {"csv", "parquet", "feather"}, optional
+        Overrides :func:`detect_format`.
+    dtype : dict, optional
+        Explicit dtypes of CSV columns.
+    sidecar : bool, optional
+        Read CSV input through :func:`portfolio.sidecar.read_csv_cached`.
+
+    Raises
+    ------
+    KeyError
+        If a requested column is not in the file.
+    """
+    fmt = fmt or detect_format(path)
+    if fmt == "csv":
+        if sidecar:
+            return read_csv_cached(path, columns, dtype)
+        wanted = set(columns)
+        data = pd.read_csv(path, usecols=lambda name: name in wanted, dtype=dtype)
+        # a missing column raises KeyError here, as for the other formats
+        return data[columns]
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format {fmt!r}; expected one of {FORMATS}")
+
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    if fmt == "parquet":
+        available = pyarrow.parquet.read_schema(path).names
+    else:
+        with pyarrow.ipc.open_file(path) as reader:
+            available = reader.schema.names
+    missing = [col for col in columns if col not in available]
+    if missing:
+        raise KeyError(f"columns {missing} not found in {path}")
+    if fmt == "parquet":
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_feather(path, columns=columns)
+
+
+def write_table(df, path, fmt="csv"):
+    """Write ``df`` to ``path`` as ``fmt``, without the index."""
+    if fmt == "parquet":
+        df.to_parquet(path, index=False)
+    elif fmt == "feather":
+        df.reset_index(drop=True).to_feather(path)
+    elif fmt == "csv":
+        df.to_csv(path, index=False)
+    else:
+        raise ValueError(f"unknown format {fmt!r}; expected one of {FORMATS}")
+
+
+class TableWriter:
+    """Append DataFrame chunks to one output file.
+
+    CSV chunks are appended below a single header, Parquet chunks become row
+    groups and Feather chunks record batches, so only one chunk has to be in
+    memory at a time. Every chunk must have the columns and dtypes of the
+    first.
+
+    Examples
+    --------
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), "out.csv")
+    >>> with TableWriter(path) as writer:
+    ...     writer.append(pd.DataFrame({"a": [1]}))
+    ...     writer.append(pd.DataFrame({"a": [2]}))
+    >>> pd.read_csv(path)["a"].tolist()
+    [1, 2]
+    """
+
+    def __init__(self, path, fmt="csv"):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown format {fmt!r}; expected one of {FORMATS}")
+        self.path = path
+        self.fmt = fmt
+        self._writer = None
+        self._started = False
+
+    def append(self, df):
+        """Write the rows of ``df`` after those already written."""
+        if self.fmt == "csv":
+            df.to_csv(
+                self.path,
+                mode="a" if self._started else "w",
+                header=not self._started,
+                index=False,
+            )
+            self._started = True
+            return
+
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            if self.fmt == "parquet":
+                import pyarrow.parquet
+
+                self._writer = pyarrow.parquet.ParquetWriter(self.path, table.schema)
+            else:
+                import pyarrow.ipc
+
+                self._writer = pyarrow.ipc.new_file(self.path, table.schema)
+        self._writer.write_table(table)
+        self._started = True
+
+    def close(self):
+        """Finish the file; nothing is written for a writer that got no chunks."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+__all__ = ["FORMATS", "detect_format", "read_table", "write_table", "TableWriter"]
@@ -0,0 +1,290 @@
+"""Persisted run state for appending new rows to a previous CLI run.
+
+A state directory holds everything a later run needs to extend its results
+when rows are appended to the input CSV:
+
+``state.json``
+    Run parameters, the number of rows processed, a fingerprint of those
+    rows, the moment centres and, per window size, the window count, bust
+    counts and :class:`~portfolio.accumulators.RunningStats` of every metric.
+``prefixes.npz``
+    The last ``max(window) + 1`` entries of every prefix array (leveraged
+    log-growth and bust counts per leverage, price return moments). The
+    dividend portfolios need none: they are re-simulated on the rows of the
+    new windows of the total-return prices. Extending them by the new rows continues the same
+    cumulative sums, so new windows match a full run.
+``tables.pkl``
+    The per-window result tables of each window size.
+
+The moment centres are frozen at the first run, so after an append the risk
+metrics of new windows can differ from a fresh run in the last few bits.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from .accumulators import RunningStats
+from .core import _leveraged_log_factors, leveraged_log_prefix
+from .moments import _moment_terms, moment_prefixes
+
+STATE_VERSION = 2
+
+# per-window metrics folded into the summary accumulators
+ACCUMULATED_METRICS = (
+    "total_return",
+    "cagr",
+    "sharpe",
+    "volatility",
+    "sortino",
+    "max_drawdown",
+    "drawdown_duration",
+)
+
+
+def run_params(args, window_sizes):
+    """The parameters a saved state must share with the current run."""
+    return {
+        "version": STATE_VERSION,
+        "leverage": [float(lev) for lev in args.leverage],
+        "window": [int(w) for w in window_sizes],
+        "datecol": args.datecol,
+        "pricecol": args.pricecol,
+        "dividendcol": getattr(args, "dividendcol", None),
+        "dividend_leverage": [
+            float(lev) for lev in getattr(args, "dividend_leverage", None) or [1.0]
+        ],
+        "underlying": bool(getattr(args, "underlying", False)),
+        "freq": args.freq,
+        "dtype": getattr(args, "dtype", None) or "float64",
+    }
+
+
+def fingerprint(data, columns, n_rows):
+    """SHA-256 of the first ``n_rows`` rows of ``columns``."""
+    hashed = pd.util.hash_pandas_object(data[columns].iloc[:n_rows], index=False)
+    return hashlib.sha256(hashed.to_numpy().tobytes()).hexdigest()
+
+
+def is_continuation(state, data, columns):
+    """Whether ``data`` is the data of ``state`` with zero or more rows appended."""
+    n_rows = state["n_rows"]
+    return len(data) >= n_rows and fingerprint(data, columns, n_rows) == state["fingerprint"]
+
+
+def _series_returns(prices):
+    return (prices[1:] - prices[:-1]) / prices[:-1]
+
+
+def prefix_state(prices, leverages):
+    """Full-length prefix arrays of a first run, with their moment centres.
+
+    Returns ``(centres, prefixes)``. Every array in ``prefixes`` has one entry
+    per row of ``prices`` along its last axis.
+    """
+    prices = np.asarray(prices, dtype=float)
+    log_prefix, bust_prefix = leveraged_log_prefix(
+        prices, np.asarray(leverages, dtype=float).ravel()
+    )
+    centre, *moments = moment_prefixes(_series_returns(prices))
+    centres = {"price": float(centre)}
+    prefixes = {
+        "log": log_prefix,
+        "bust": bust_prefix,
+        "price_moments": np.stack(moments),
+    }
+    return centres, prefixes
+
+
+def extend_prefix(prefix, increments):
+    """Continue the cumulative sum ``prefix`` (last axis) with ``increments``.
+
+    The last entry is re-used as the seed of the new sums, so the result is
+    bit-identical to a cumulative sum over the whole series.
+
+    Examples
+    --------
+    >>> extend_prefix(np.array([0.0, 1.0, 3.0]), np.array([2.0, 5.0])).tolist()
+    [0.0, 1.0, 3.0, 5.0, 10.0]
+    """
+    increments = np.asarray(increments, dtype=prefix.dtype)
+    tail = np.cumsum(np.concatenate((prefix[..., -1:], increments), axis=-1), axis=-1)
+    return np.concatenate((prefix[..., :-1], tail), axis=-1)
+
+
+def extend_prefixes(state, prices, leverages):
+    """Extend the saved prefix tails of ``state`` to the end of ``prices``.
+
+    Returns a dict of arrays covering rows ``state["base"]`` to
+    ``len(prices) - 1``.
+    """
+    rows = slice(state["n_rows"] - 1, None)
+    prices = np.asarray(prices, dtype=float)
+    prefixes = dict(state["prefixes"])
+    log_factors, busted = _leveraged_log_factors(
+        prices[rows], np.asarray(leverages, dtype=float).ravel()
+    )
+    prefixes["log"] = extend_prefix(prefixes["log"], log_factors)
+    prefixes["bust"] = extend_prefix(prefixes["bust"], busted)
+
+    terms = _moment_terms(_series_returns(prices[rows]), state["centres"]["price"])
+    prefixes["price_moments"] = extend_prefix(prefixes["price_moments"], np.stack(terms))
+    return prefixes
+
+
+def keep_tail(prefixes, n_rows, window_sizes):
+    """Trim full or extended ``prefixes`` to what the next append needs.
+
+    Returns ``(base, tails)`` where ``base`` is the row of the first kept
+    entry.
+    """
+    span = max(window_sizes) + 1
+    base = max(n_rows - span, 0)
+    tails = {}
+    for name, arr in prefixes.items():
+        first = arr.shape[-1] - (n_rows - base)
+        tails[name] = np.ascontiguousarray(arr[..., first:])
+    return base, tails
+
+
+def sweep_prefixes(prices, leverages, window_size, chunk_windows):
+    """Prefix arrays for consecutive chunks of ``chunk_windows`` windows.
+
+    Yields ``(lo, hi, centres, prefixes)`` for windows ``[lo, hi)``, where
+    ``prefixes`` holds the :func:`prefix_state` arrays of rows
+    ``lo .. hi + window_size - 1``. The sums are carried from chunk to chunk
+    with :func:`extend_prefix`, so each chunk equals the corresponding slice of
+    the full-length arrays while only ``chunk_windows + window_size`` rows are
+    held at a time.
+    """
+    prices = np.asarray(prices, dtype=float)
+    leverages = np.asarray(leverages, dtype=float).ravel()
+    n_windows = max(len(prices) - window_size, 0)
+
+    def centre(r):
+        return float(r.mean()) if len(r) else 0.0
+
+    state = {
+        "n_rows": 1,
+        "base": 0,
+        "centres": {"price": centre(_series_returns(prices))},
+        "prefixes": {
+            "log": np.zeros((len(leverages), 1)),
+            "bust": np.zeros((len(leverages), 1), dtype=np.int64),
+            "price_moments": np.zeros((4, 1)),
+        },
+    }
+
+    for lo in range(0, n_windows, chunk_windows):
+        hi = min(lo + chunk_windows, n_windows)
+        end = hi + window_size
+        prefixes = extend_prefixes(state, prices[:end], leverages)
+        offset = lo - state["base"]
+        yield lo, hi, state["centres"], {k: v[..., offset:] for k, v in prefixes.items()}
+        # the next chunk starts at row hi
+        offset = hi - state["base"]
+        state["prefixes"] = {
+            k: np.ascontiguousarray(v[..., offset:]) for k, v in prefixes.items()
+        }
+        state["base"], state["n_rows"] = hi, end
+
+
+def new_accumulators(value_cols, sketch_k=None):
+    """Empty accumulators of every :data:`ACCUMULATED_METRICS` per column.
+
+    With ``sketch_k`` the total-return accumulators carry a
+    :class:`~portfolio.accumulators.QuantileSketch` of that size, which
+    :func:`portfolio.report.accumulated_statistics` uses for the
+    interquartile range.
+    """
+    return {
+        col: {
+            m: RunningStats(sketch_k if m == "total_return" else None)
+            for m in ACCUMULATED_METRICS
+        }
+        for col in value_cols
+    }
+
+
+def accumulate(accumulators, trackers):
+    """Fold the per-window ``trackers`` of :func:`portfolio.cli._window_tables`."""
+    for col, metrics in accumulators.items():
+        for metric, acc in metrics.items():
+            acc.update(trackers[metric][col])
+
+
+def save_state(path, state):
+    """Write ``state`` to the directory ``path``."""
+    os.makedirs(path, exist_ok=True)
+    meta = {
+        key: state[key]
+        for key in ("params", "n_rows", "fingerprint", "base", "centres")
+    }
+    meta["windows"] = {
+        str(w): {
+            "n_windows": info["n_windows"],
+            "busts": info["busts"],
+            "accumulators": {
+                col: {m: acc.to_list() for m, acc in metrics.items()}
+                for col, metrics in info["accumulators"].items()
+            },
+        }
+        for w, info in state["windows"].items()
+    }
+    with open(os.path.join(path, "state.json"), "w") as fh:
+        json.dump(meta, fh)
+    np.savez(os.path.join(path, "prefixes.npz"), **state["prefixes"])
+    with open(os.path.join(path, "tables.pkl"), "wb") as fh:
+        pickle.dump(state["tables"], fh)
+
+
+def load_state(path, params):
+    """Read a state saved by :func:`save_state`.
+
+    Returns ``None`` when there is no state or it was produced with different
+    ``params``.
+    """
+    meta_path = os.path.join(path, "state.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as fh:
+        meta = json.load(fh)
+    if meta["params"] != params:
+        return None
+    state = {key: meta[key] for key in ("params", "n_rows", "fingerprint", "base", "centres")}
+    state["windows"] = {
+        int(w): {
+            "n_windows": info["n_windows"],
+            "busts": info["busts"],
+            "accumulators": {
+                col: {m: RunningStats.from_list(v) for m, v in metrics.items()}
+                for col, metrics in info["accumulators"].items()
+            },
+        }
+        for w, info in meta["windows"].items()
+    }
+    with np.load(os.path.join(path, "prefixes.npz")) as arrays:
+        state["prefixes"] = {name: arrays[name] for name in arrays.files}
+    with open(os.path.join(path, "tables.pkl"), "rb") as fh:
+        state["tables"] = pickle.load(fh)
+    return state
+
+
+__all__ = [
+    "run_params",
+    "fingerprint",
+    "is_continuation",
+    "prefix_state",
+    "extend_prefix",
+    "extend_prefixes",
+    "keep_tail",
+    "sweep_prefixes",
+    "new_accumulators",
+    "accumulate",
+    "save_state",
+    "load_state",
+]
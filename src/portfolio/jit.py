@@ -0,0 +1,142 @@
+"""Array kernels for the path-dependent simulators, optionally Numba-compiled.
+
+``simulate_portfolio`` (with ``rebalance_period``), ``simulate_window`` and
+``simulate_window_dividend`` cannot all be written as prefix sums, so their
+loops live here as plain functions over NumPy arrays. :func:`get_kernels`
+returns them as-is for the ``"numpy"`` engine, or compiled with
+``numba.njit(cache=True)`` for the ``"numba"`` engine. Compiled code is
+cached on disk next to this module (or under ``NUMBA_CACHE_DIR``), so only
+the first run after an upgrade pays the compilation cost.
+
+The engine is chosen by the ``engine`` argument of those simulators. The CLI
+reads every result off prefix sums and runs none of these kernels, so it
+has no engine option.
+"""
+
+from functools import lru_cache
+from types import SimpleNamespace
+import warnings
+
+import numpy as np
+
+# optional dependency, imported on first use of the "numba" engine: importing
+# numba costs more than the whole CLI start-up otherwise
+_UNLOADED = object()
+numba = _UNLOADED
+
+ENGINES = ("numpy", "numba")
+
+
+def leveraged_path(prices, leverage, init_value):
+    """Equity path of a position rebalanced to ``leverage`` every period."""
+    V = np.empty(len(prices), dtype=np.float64)
+    if len(prices) == 0:
+        return V
+    V[0] = init_value
+    for i in range(len(prices) - 1):
+        Q_i = leverage * V[i] / prices[i]
+        V[i + 1] = V[i] + Q_i * (prices[i + 1] - prices[i])
+    return V
+
+
+def dividend_path(prices, dividends):
+    """Unleveraged equity path with dividends reinvested, starting at ``1.0``."""
+    V = np.empty(len(prices), dtype=np.float64)
+    if len(prices) == 0:
+        return V
+    V[0] = 1.0
+    for i in range(len(prices) - 1):
+        shares = V[i] / prices[i]
+        V[i + 1] = prices[i + 1] * shares + dividends[i + 1] * shares
+    return V
+
+
+def rebalance_path(prices, leverage, rebalance_period):
+    """Portfolio value rebalanced every ``rebalance_period`` rows, as in
+    ``simulate_portfolio``; the value is carried forward between rebalances."""
+    V = np.empty(len(prices), dtype=np.float64)
+    if len(prices) == 0:
+        return V
+    V[0] = 1.0
+    last_rebalance = 0
+    for i in range(1, len(prices)):
+        if i - last_rebalance == rebalance_period:
+            V[i] = V[last_rebalance] * (prices[i] / prices[last_rebalance]) ** leverage
+            last_rebalance = i
+        else:
+            V[i] = V[i - 1]
+    return V
+
+
+def dividend_window_growth(prices, dividends, window_size):
+    """``V_end / V_start`` of :func:`dividend_path` over every rolling window."""
+    n_windows = max(len(prices) - window_size, 0)
+    growth = np.empty(n_windows, dtype=np.float64)
+    for s in range(n_windows):
+        v = 1.0
+        for i in range(s, s + window_size):
+            shares = v / prices[i]
+            v = prices[i + 1] * shares + dividends[i + 1] * shares
+        growth[s] = v
+    return growth
+
+
+_KERNELS = {
+    "leveraged_path": leveraged_path,
+    "dividend_path": dividend_path,
+    "rebalance_path": rebalance_path,
+    "dividend_window_growth": dividend_window_growth,
+}
+
+
+def _load_numba():
+    """Import numba once; ``None`` when it is not installed."""
+    global numba
+    if numba is _UNLOADED:
+        try:
+            import numba as module
+        except ImportError:
+            module = None
+        numba = module
+    return numba
+
+
+@lru_cache(maxsize=None)
+def get_kernels(engine: str = "numpy") -> SimpleNamespace:
+    """Return the simulation kernels for ``engine``.
+
+    Parameters
+    ----------
+    engine : {"numpy", "numba"}
+        ``"numba"`` compiles the kernels with on-disk caching. If Numba is not
+        installed a warning is emitted and the pure NumPy kernels are used.
+
+    Returns
+    -------
+    SimpleNamespace
+        Attributes ``leveraged_path``, ``dividend_path``, ``rebalance_path``
+        and ``dividend_window_growth``.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> get_kernels("numpy").dividend_path(np.array([100.0, 110.0]), np.array([0.0, 1.0]))
+    array([1.  , 1.11])
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"unknown engine {engine!r}; expected one of {ENGINES}")
+    if engine == "numba":
+        if _load_numba() is None:
+            warnings.warn(
+                "numba is not installed; falling back to the numpy engine",
+                RuntimeWarning,
+                stacklevel=2,
+            )
+            return get_kernels("numpy")
+        return SimpleNamespace(
+            **{name: numba.njit(cache=True)(fn) for name, fn in _KERNELS.items()}
+        )
+    return SimpleNamespace(**_KERNELS)
+
+
+__all__ = ["ENGINES", "get_kernels"]
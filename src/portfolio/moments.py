@@ -0,0 +1,182 @@
+"""Rolling return moments computed from prefix sums.
+
+For a daily-rebalanced position with leverage ``L`` the period returns of
+every window are just ``L * r_i``, so the per-window mean, standard
+deviation and downside deviation follow from running sums of ``r``, ``r**2``
+and the squared negative / positive parts of ``r``. Nothing here
+materialises an equity path.
+"""
+
+import numpy as np
+
+
+def _prefix(values):
+    out = np.zeros(len(values) + 1, dtype=float)
+    np.cumsum(values, out=out[1:])
+    return out
+
+
+def moment_prefixes(period_returns, centre=None):
+    """Prefix sums shared by every window size in :func:`rolling_moments`.
+
+    Returns ``(centre, s1, s2, neg, pos)``: the centre (the series mean unless
+    given) and the prefix sums of the centred returns, their squares, and the
+    squared negative and positive parts of the returns.
+    """
+    r = np.asarray(period_returns, dtype=float)
+    # centre on the series mean so the sum-of-squares identity keeps precision
+    if centre is None:
+        centre = r.mean() if len(r) else 0.0
+    return (centre,) + tuple(_prefix(terms) for terms in _moment_terms(r, centre))
+
+
+def _moment_terms(r, centre):
+    """Per-period summands of the four prefix sums in :func:`moment_prefixes`."""
+    d = r - centre
+    return d, d * d, np.minimum(r, 0.0) ** 2, np.maximum(r, 0.0) ** 2
+
+
+def rolling_moments(
+    period_returns, window_size: int, start: int = 0, stop=None, prefixes=None
+):
+    """Mean, sample std and semi-deviations of every window of ``period_returns``.
+
+    Window ``w`` covers ``period_returns[w : w + window_size]``, i.e. the
+    returns earned inside the price window ``[w, w + window_size]`` from
+    :func:`portfolio.core.identify_windows`.
+
+    Parameters
+    ----------
+    period_returns : array-like
+        Simple return of each period.
+    window_size : int
+        Number of returns in each window.
+    start, stop : int, optional
+        Only compute windows ``start <= w < stop``. The prefix sums always
+        span the whole series, so a window's value does not depend on the
+        range it is computed in.
+    prefixes : tuple, optional
+        ``moment_prefixes(period_returns)`` computed by the caller, e.g. to
+        share it across several window sizes.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+        ``(mean, std, downside, upside)`` per window. ``std`` uses
+        ``ddof=1`` and is ``nan`` for single-return windows; ``downside`` and
+        ``upside`` are the root-mean-square of the negative and positive
+        parts of the returns.
+
+    Examples
+    --------
+    >>> mean, std, down, up = rolling_moments([0.1, -0.05, 0.3], 2)
+    >>> mean.round(3).tolist()
+    [0.025, 0.125]
+    >>> down.round(4).tolist()
+    [0.0354, 0.0354]
+    """
+    if prefixes is None:
+        prefixes = moment_prefixes(period_returns)
+    centre, s1, s2, neg, pos = prefixes
+    n_windows = max(len(s1) - window_size, 0)
+    stop = n_windows if stop is None else min(stop, n_windows)
+    lo = np.arange(min(start, stop), stop)
+    hi = lo + window_size
+
+    sum1 = s1[hi] - s1[lo]
+    sum2 = s2[hi] - s2[lo]
+
+    mean = centre + sum1 / window_size
+    sq_dev = np.maximum(sum2 - sum1 * sum1 / window_size, 0.0)
+    # differences at rounding level are a constant window, not dispersion
+    sq_dev[sq_dev <= 1e-12 * sum2] = 0.0
+    if window_size > 1:
+        std = np.sqrt(sq_dev / (window_size - 1))
+    else:
+        std = np.full(len(lo), np.nan)
+
+    downside = np.sqrt(np.maximum(neg[hi] - neg[lo], 0.0) / window_size)
+    upside = np.sqrt(np.maximum(pos[hi] - pos[lo], 0.0) / window_size)
+    return mean, std, downside, upside
+
+
+def rolling_risk_metrics(
+    period_returns,
+    window_size: int,
+    periods_per_year: int = 12,
+    leverage=1.0,
+    start: int = 0,
+    stop=None,
+    prefixes=None,
+):
+    """Per-window Sharpe, annualised volatility and Sortino ratio.
+
+    The moments of ``period_returns`` are computed once and rescaled for
+    each leverage, so a whole leverage grid costs O(N + leverages x windows).
+    Undefined ratios (zero or ``nan`` deviation) are reported as ``0.0``,
+    matching the CLI's Sharpe convention.
+
+    Parameters
+    ----------
+    period_returns : array-like
+        Unleveraged simple return of each period.
+    window_size : int
+        Number of returns in each window.
+    periods_per_year : int, optional
+        How many periods constitute one year.
+    leverage : float or array-like, optional
+        Leverage applied to every period return. A 1-D array gives results of
+        shape ``(len(leverage), n_windows)``.
+    start, stop : int, optional
+        Only compute windows ``start <= w < stop``.
+    prefixes : tuple, optional
+        Precomputed :func:`moment_prefixes` of ``period_returns``.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray, np.ndarray]
+        ``(sharpe, volatility, sortino)``.
+
+    Examples
+    --------
+    >>> sharpe, vol, sortino = rolling_risk_metrics([0.1, -0.05, 0.3], 2, 1, [1, 2])
+    >>> sharpe.round(4).tolist()
+    [[0.2357, 0.5051], [0.2357, 0.5051]]
+    >>> vol.round(4).tolist()
+    [[0.1061, 0.2475], [0.2121, 0.495]]
+    """
+    mean, std, downside, upside = rolling_moments(
+        period_returns, window_size, start, stop, prefixes
+    )
+    return scaled_risk_metrics(mean, std, downside, upside, leverage, periods_per_year)
+
+
+def scaled_risk_metrics(mean, std, downside, upside, leverage, periods_per_year):
+    """Sharpe, annualised volatility and Sortino of leveraged returns from the
+    unleveraged moments of :func:`rolling_moments`.
+
+    ``leverage`` may be a 1-D array, which adds a leading leverage axis.
+    """
+    lev = np.asarray(leverage, dtype=float)[..., None]
+    annualiser = np.sqrt(periods_per_year)
+
+    lev_mean = lev * mean
+    lev_std = np.abs(lev) * std
+    # a short position's losses come from the positive returns
+    lev_down = np.abs(lev) * np.where(lev >= 0, downside, upside)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sharpe = lev_mean / lev_std * annualiser
+        sortino = lev_mean / lev_down * annualiser
+    sharpe = np.where((lev_std == 0) | np.isnan(lev_std), 0.0, sharpe)
+    sortino = np.where((lev_down == 0) | np.isnan(lev_down), 0.0, sortino)
+    volatility = np.nan_to_num(lev_std * annualiser, nan=0.0)
+    return sharpe, volatility, sortino
+
+
+__all__ = [
+    "moment_prefixes",
+    "rolling_moments",
+    "rolling_risk_metrics",
+    "scaled_risk_metrics",
+]
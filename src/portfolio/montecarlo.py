@@ -0,0 +1,376 @@
+"""Monte Carlo windows from a block bootstrap of historical period returns.
+
+Historical rolling windows overlap heavily, so a long monthly series still
+yields few independent samples of, say, 20-year outcomes. Here synthetic
+windows are drawn by resampling the period returns in blocks, which keeps
+their short-range autocorrelation and volatility clustering:
+
+* ``"stationary"`` (Politis & Romano): blocks have geometric lengths with
+  mean ``block_size``;
+* ``"block"``: blocks of exactly ``block_size`` returns (moving blocks).
+
+Blocks wrap around the end of the series. Paths are produced in batches of
+``(paths x steps)`` arrays by a generator, so memory stays bounded however
+many paths are drawn, and every path gets the :data:`GRID_METRICS` of one
+historical window, with the same conventions (busted paths report ``0.0``
+returns and ratios, a drawdown of ``1.0`` and a duration of the whole path).
+Every run of :data:`SEED_BLOCK_PATHS` paths is drawn from its own generator,
+spawned from the seed, so the same seed always gives the same paths
+whatever the batch size or memory budget.
+
+:func:`simulate_bootstrap` returns the metrics of every path;
+:func:`bootstrap_accumulators` folds each batch into mergeable accumulators
+instead, so the number of paths is not limited by memory.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+from .accumulators import DEFAULT_SKETCH_K
+from .core import DEFAULT_MAX_BYTES
+from .incremental import new_accumulators
+from .moments import scaled_risk_metrics
+from .parallel import GRID_METRICS
+
+BOOTSTRAP_METHODS = ("stationary", "block")
+
+# paths drawn from each generator spawned from the seed
+SEED_BLOCK_PATHS = 256
+
+
+def bootstrap_indices(n_returns, n_paths, n_steps, block_size, rng, method="stationary"):
+    """``(n_paths, n_steps)`` indices into a series of ``n_returns`` returns.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> idx = bootstrap_indices(10, 2, 6, 3, np.random.default_rng(0), "block")
+    >>> idx.shape, bool((np.diff(idx[:, :3]) % 10 == 1).all())
+    ((2, 6), True)
+    """
+    if method not in BOOTSTRAP_METHODS:
+        raise ValueError(f"unknown method {method!r}; expected one of {BOOTSTRAP_METHODS}")
+    if block_size < 1:
+        raise ValueError(f"block_size must be at least 1, got {block_size}")
+    if n_returns < 1:
+        raise ValueError("cannot bootstrap an empty return series")
+
+    steps = np.arange(n_steps)
+    if method == "block":
+        n_blocks = -(-n_steps // block_size)
+        starts = rng.integers(0, n_returns, (n_paths, n_blocks))
+        return (np.repeat(starts, block_size, axis=1)[:, :n_steps] + steps % block_size) % n_returns
+
+    # a new block starts with probability 1 / block_size at every step
+    starts = rng.integers(0, n_returns, (n_paths, n_steps))
+    new_block = rng.random((n_paths, n_steps)) < 1.0 / block_size
+    new_block[:, 0] = True
+    block_start = np.maximum.accumulate(np.where(new_block, steps, 0), axis=1)
+    first = np.take_along_axis(starts, block_start, axis=1)
+    return (first + steps - block_start) % n_returns
+
+
+def bootstrap_returns(
+    returns,
+    n_paths: int,
+    n_steps: int,
+    block_size: int = 12,
+    method: str = "stationary",
+    seed=None,
+    batch_paths: int = 1024,
+):
+    """Yield ``(batch, n_steps)`` arrays of resampled ``returns``.
+
+    Parameters
+    ----------
+    returns : array-like
+        Historical simple return of each period.
+    n_paths : int
+        Total number of paths; the last batch may be smaller.
+    n_steps : int
+        Returns per path.
+    block_size : int, optional
+        Block length (mean block length for ``"stationary"``).
+    method : {"stationary", "block"}, optional
+        Bootstrap scheme.
+    seed : int, numpy.random.SeedSequence or numpy.random.Generator, optional
+        Seed of the random generators. Path ``i`` is drawn by the generator
+        of block ``i // SEED_BLOCK_PATHS``, so the paths do not depend on
+        ``batch_paths``.
+    batch_paths : int, optional
+        Paths per yielded batch.
+
+    Examples
+    --------
+    >>> batches = list(bootstrap_returns([0.1, -0.1, 0.2], 5, 4, seed=1, batch_paths=2))
+    >>> [b.shape for b in batches]
+    [(2, 4), (2, 4), (1, 4)]
+    >>> whole = next(bootstrap_returns([0.1, -0.1, 0.2], 5, 4, seed=1))
+    >>> bool((np.concatenate(batches) == whole).all())
+    True
+    """
+    returns = np.asarray(returns, dtype=float)
+    if isinstance(seed, np.random.Generator):
+        seed = seed.integers(2**63)
+    seeds = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+    def block_indices(j):
+        rng = np.random.default_rng(
+            np.random.SeedSequence(seeds.entropy, spawn_key=(*seeds.spawn_key, j))
+        )
+        size = min(SEED_BLOCK_PATHS, n_paths - j * SEED_BLOCK_PATHS)
+        return bootstrap_indices(len(returns), size, n_steps, block_size, rng, method)
+
+    block = (None, None)
+    for lo in range(0, n_paths, batch_paths):
+        hi = min(lo + batch_paths, n_paths)
+        parts = []
+        for j in range(lo // SEED_BLOCK_PATHS, (hi - 1) // SEED_BLOCK_PATHS + 1):
+            # batches run in order, so only the last block drawn can be reused
+            if block[0] != j:
+                block = (j, block_indices(j))
+            first = j * SEED_BLOCK_PATHS
+            parts.append(block[1][max(lo, first) - first : hi - first])
+        yield returns[np.concatenate(parts)]
+
+
+def path_metrics(path_returns, leverages, periods_per_year: int = 12):
+    """:data:`GRID_METRICS` of daily-rebalanced positions over each path.
+
+    Parameters
+    ----------
+    path_returns : array-like
+        ``(n_paths, n_steps)`` unleveraged period returns.
+    leverages : array-like
+        1-D sequence of leverage levels.
+    periods_per_year : int, optional
+        How many periods constitute one year.
+
+    Returns
+    -------
+    dict[str, np.ndarray]
+        One ``(len(leverages), n_paths)`` array per metric.
+
+    Examples
+    --------
+    >>> out = path_metrics([[0.1, -0.5], [0.1, 0.1]], [1, 2], 1)
+    >>> out["total_return"].round(2).tolist(), out["bust"].tolist()
+    ([[-0.45, 0.21], [0.0, 0.44]], [[False, False], [True, False]])
+    """
+    r = np.atleast_2d(np.asarray(path_returns, dtype=float))
+    leverages = np.asarray(leverages, dtype=float).ravel()
+    n_paths, n_steps = r.shape
+
+    mean = r.mean(axis=1)
+    if n_steps > 1:
+        std = r.std(axis=1, ddof=1)
+    else:
+        std = np.full(n_paths, np.nan)
+    downside = np.sqrt((np.minimum(r, 0.0) ** 2).mean(axis=1))
+    upside = np.sqrt((np.maximum(r, 0.0) ** 2).mean(axis=1))
+    sharpe, volatility, sortino = scaled_risk_metrics(
+        mean, std, downside, upside, leverages, periods_per_year
+    )
+
+    out = {name: np.empty((len(leverages), n_paths), dtype=dtype) for name, dtype in GRID_METRICS.items()}
+    log_equity = np.zeros((n_paths, n_steps + 1))
+    for row, lev in enumerate(leverages):
+        factors = 1.0 + lev * r
+        busted = factors <= 0
+        bust = busted.any(axis=1)
+        np.cumsum(np.log(np.where(busted, 1.0, factors)), axis=1, out=log_equity[:, 1:])
+        log_growth = log_equity[:, -1]
+
+        peak = np.maximum.accumulate(log_equity, axis=1)
+        max_drawdown = -np.expm1(-(peak - log_equity).max(axis=1))
+        # longest run of consecutive points below the running peak
+        below = log_equity < peak
+        runs = np.cumsum(below, axis=1)
+        runs -= np.maximum.accumulate(np.where(below, 0, runs), axis=1)
+
+        out["bust"][row] = bust
+        out["total_return"][row] = np.where(bust, 0.0, np.expm1(log_growth))
+        out["cagr"][row] = np.where(
+            bust, 0.0, np.expm1(log_growth * periods_per_year / n_steps)
+        )
+        out["sharpe"][row] = np.where(bust, 0.0, sharpe[row])
+        out["volatility"][row] = np.where(bust, 0.0, volatility[row])
+        out["sortino"][row] = np.where(bust, 0.0, sortino[row])
+        out["max_drawdown"][row] = np.where(bust, 1.0, max_drawdown)
+        out["drawdown_duration"][row] = np.where(bust, n_steps, runs.max(axis=1))
+    return out
+
+
+def simulate_bootstrap(
+    prices,
+    leverages,
+    window_size: int,
+    n_paths: int,
+    periods_per_year: int = 12,
+    block_size: int = 12,
+    method: str = "stationary",
+    seed=None,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    batch_paths: Optional[int] = None,
+):
+    """Window metrics of ``leverages`` over ``n_paths`` bootstrapped windows.
+
+    The period returns of ``prices`` are resampled into paths of
+    ``window_size`` returns and each path is evaluated like one historical
+    window of :func:`portfolio.parallel.simulate_grid`.
+
+    Parameters
+    ----------
+    prices : array-like
+        Historical price series, one entry per row.
+    leverages : array-like
+        1-D sequence of leverage levels.
+    window_size : int
+        Number of periods in each synthetic window.
+    n_paths : int
+        Number of synthetic windows.
+    periods_per_year : int, optional
+        How many periods constitute one year.
+    block_size, method, seed
+        See :func:`bootstrap_returns`.
+    max_bytes : int, optional
+        Approximate memory budget for one batch of paths.
+    batch_paths : int, optional
+        Paths per batch; overrides the size derived from ``max_bytes``.
+
+    Returns
+    -------
+    dict[str, np.ndarray]
+        One ``(len(leverages), n_paths)`` array per :data:`GRID_METRICS` key.
+
+    Examples
+    --------
+    >>> out = simulate_bootstrap([100, 110, 99, 120], [1, 3], 2, 1000, seed=0)
+    >>> out["total_return"].shape
+    (2, 1000)
+    """
+    leverages = np.asarray(leverages, dtype=float).ravel()
+    out = {name: np.empty((len(leverages), n_paths), dtype=dtype) for name, dtype in GRID_METRICS.items()}
+    lo = 0
+    for metrics in _metric_batches(
+        prices,
+        leverages,
+        window_size,
+        n_paths,
+        periods_per_year,
+        block_size,
+        method,
+        seed,
+        max_bytes,
+        batch_paths,
+    ):
+        hi = lo + metrics["bust"].shape[1]
+        for name, values in metrics.items():
+            out[name][:, lo:hi] = values
+        lo = hi
+    return out
+
+
+def bootstrap_accumulators(
+    prices,
+    leverages,
+    window_size: int,
+    n_paths: int,
+    periods_per_year: int = 12,
+    block_size: int = 12,
+    method: str = "stationary",
+    seed=None,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    batch_paths: Optional[int] = None,
+    columns=None,
+    sketch_k: int = DEFAULT_SKETCH_K,
+):
+    """:func:`simulate_bootstrap` folded into mergeable accumulators.
+
+    Only one batch of paths is in memory at a time. Accumulators of runs
+    with different seeds (e.g. from several workers) can be merged with
+    :meth:`~portfolio.accumulators.RunningStats.merge`, and their bust
+    counts added.
+
+    Parameters
+    ----------
+    columns : list[str], optional
+        Accumulator key of each leverage; ``portfolio_<lev>x`` by default.
+    sketch_k : int, optional
+        Size of the total-return quantile sketches.
+
+    Other parameters are those of :func:`simulate_bootstrap`.
+
+    Returns
+    -------
+    tuple[dict, np.ndarray]
+        ``(accumulators, busts)``: the accumulators of
+        :func:`portfolio.incremental.new_accumulators` by column, and the
+        number of busted paths of each leverage. They feed
+        :func:`portfolio.report.accumulated_statistics` with
+        ``returns_df=None``.
+
+    Examples
+    --------
+    >>> acc, busts = bootstrap_accumulators([100, 110, 99, 120], [1, 3], 2, 1000, seed=0)
+    >>> acc["portfolio_1.0x"]["total_return"].count, busts.shape
+    (1000, (2,))
+    """
+    leverages = np.asarray(leverages, dtype=float).ravel()
+    if columns is None:
+        columns = [f"portfolio_{lev}x" for lev in leverages]
+    accumulators = new_accumulators(columns, sketch_k)
+    busts = np.zeros(len(leverages), dtype=np.int64)
+    for metrics in _metric_batches(
+        prices,
+        leverages,
+        window_size,
+        n_paths,
+        periods_per_year,
+        block_size,
+        method,
+        seed,
+        max_bytes,
+        batch_paths,
+    ):
+        for row, col in enumerate(columns):
+            for metric, acc in accumulators[col].items():
+                acc.update(metrics[metric][row])
+        busts += metrics["bust"].sum(axis=1)
+    return accumulators, busts
+
+
+def _metric_batches(
+    prices,
+    leverages,
+    window_size,
+    n_paths,
+    periods_per_year,
+    block_size,
+    method,
+    seed,
+    max_bytes,
+    batch_paths,
+):
+    """Yield the :func:`path_metrics` of each batch of bootstrapped paths."""
+    prices = np.asarray(prices, dtype=float)
+    returns = np.diff(prices) / prices[:-1]
+    if batch_paths is None:
+        # the path returns, the log equity, its running peak and the run counters
+        batch_paths = max(1, int(max_bytes // (8 * 6 * (window_size + 1))))
+    for batch in bootstrap_returns(
+        returns, n_paths, window_size, block_size, method, seed, batch_paths
+    ):
+        yield path_metrics(batch, leverages, periods_per_year)
+
+
+__all__ = [
+    "BOOTSTRAP_METHODS",
+    "SEED_BLOCK_PATHS",
+    "bootstrap_indices",
+    "bootstrap_returns",
+    "path_metrics",
+    "simulate_bootstrap",
+    "bootstrap_accumulators",
+]
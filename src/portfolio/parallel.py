@@ -0,0 +1,323 @@
+"""Leverage-grid simulation split into work units across a process pool.
+
+A work unit is one chunk of leverages of one asset. The chunk is sized by
+:func:`portfolio.core.leverage_chunk_size` to stay within the memory
+budget. Its prefix arrays are built once and shared by every window size.
+Every metric is computed from prefix arrays that span the whole series, so
+a window's value does not depend on which unit computed it: a run with
+``jobs > 1`` is bit-identical to a serial one. The ``(asset, row)`` prices
+are published once through :mod:`multiprocessing.shared_memory` and
+attached by each worker, and finished units are copied straight into the
+preallocated output arrays as they complete.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .core import (
+    DEFAULT_MAX_BYTES,
+    batched_leveraged_returns,
+    leverage_chunk_size,
+    leveraged_log_prefix,
+)
+from .drawdown import leveraged_drawdowns
+from .moments import moment_prefixes, rolling_risk_metrics
+
+# per-(leverage x window) outputs of :func:`leveraged_block`
+GRID_METRICS = {
+    "total_return": np.float64,
+    "cagr": np.float64,
+    "bust": np.bool_,
+    "sharpe": np.float64,
+    "volatility": np.float64,
+    "sortino": np.float64,
+    "max_drawdown": np.float64,
+    "drawdown_duration": np.int64,
+}
+
+_SHARED = {}
+
+
+def _grid_dtypes(dtype=float):
+    """:data:`GRID_METRICS` with the float metrics stored as ``dtype``."""
+    return {
+        name: dtype if kind == np.float64 else kind for name, kind in GRID_METRICS.items()
+    }
+
+
+def leveraged_prefixes(prices, leverages):
+    """Prefix arrays of ``leverages`` that every window size can share."""
+    prices = np.asarray(prices, dtype=float)
+    return {
+        "log": leveraged_log_prefix(prices, np.asarray(leverages, dtype=float).ravel()),
+        "moments": moment_prefixes(np.diff(prices) / prices[:-1]),
+    }
+
+
+def leveraged_block(
+    prices,
+    leverages,
+    window_size,
+    periods_per_year,
+    start=0,
+    stop=None,
+    max_bytes=DEFAULT_MAX_BYTES,
+    prefixes=None,
+    dtype=float,
+):
+    """All :data:`GRID_METRICS` for ``leverages`` over windows ``[start, stop)``.
+
+    Busted windows report ``0.0`` Sharpe, volatility and Sortino, like their
+    returns. ``prefixes`` may hold :func:`leveraged_prefixes` of the same
+    prices and leverages, computed once for several window sizes. The float
+    metrics are computed in float64 and stored as ``dtype``.
+    """
+    prices = np.asarray(prices, dtype=float)
+    leverages = np.asarray(leverages, dtype=float).ravel()
+    if prefixes is None:
+        prefixes = leveraged_prefixes(prices, leverages)
+    out = {}
+    out["total_return"], out["cagr"], out["bust"] = batched_leveraged_returns(
+        prices,
+        leverages,
+        window_size,
+        periods_per_year,
+        max_bytes=max_bytes,
+        start=start,
+        stop=stop,
+        prefix=prefixes["log"],
+        dtype=dtype,
+    )
+    sharpe, volatility, sortino = rolling_risk_metrics(
+        None,
+        window_size,
+        periods_per_year,
+        leverages,
+        start,
+        stop,
+        prefixes=prefixes["moments"],
+    )
+    out["sharpe"] = np.where(out["bust"], 0.0, sharpe).astype(dtype, copy=False)
+    out["volatility"] = np.where(out["bust"], 0.0, volatility).astype(dtype, copy=False)
+    out["sortino"] = np.where(out["bust"], 0.0, sortino).astype(dtype, copy=False)
+    max_drawdown, out["drawdown_duration"] = leveraged_drawdowns(
+        prices, leverages, window_size, start, stop, prefix=prefixes["log"]
+    )
+    out["max_drawdown"] = max_drawdown.astype(dtype, copy=False)
+    return out
+
+
+def _leverage_chunks(n_rows, n_leverages, n_windows, max_bytes, jobs=1):
+    """``(lo, hi)`` leverage ranges of at most ``max_bytes`` each.
+
+    With ``jobs > 1`` the chunks are also small enough that every worker
+    gets one, as far as there are leverages to split.
+    """
+    chunk = leverage_chunk_size(n_rows, n_windows, max_bytes)
+    if jobs > 1:
+        chunk = min(chunk, max(1, -(-n_leverages // jobs)))
+    return [(lo, min(lo + chunk, n_leverages)) for lo in range(0, n_leverages, chunk)]
+
+
+def _grid_chunk(prices, leverages, window_sizes, periods_per_year, max_bytes, dtype):
+    """:func:`leveraged_block` of one leverage chunk for every window size,
+    from one set of prefix arrays."""
+    prefixes = leveraged_prefixes(prices, leverages)
+    return {
+        w: leveraged_block(
+            prices,
+            leverages,
+            w,
+            periods_per_year,
+            max_bytes=max_bytes,
+            prefixes=prefixes,
+            dtype=dtype,
+        )
+        for w in window_sizes
+    }
+
+
+def _publish(arrays):
+    """Copy ``arrays`` into shared memory; return the blocks and attach specs."""
+    blocks, specs = [], {}
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+        blocks.append(shm)
+        specs[name] = (shm.name, arr.shape, arr.dtype.str)
+    return blocks, specs
+
+
+def _attach(specs):
+    """Worker initializer: map the published arrays without copying them."""
+    for name, (shm_name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _SHARED[name] = (shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+
+
+def _run_leveraged(
+    asset, lev_range, leverages, window_sizes, periods_per_year, max_bytes, dtype
+):
+    prices = _SHARED["prices"][1][asset]
+    out = _grid_chunk(
+        prices,
+        leverages[lev_range[0] : lev_range[1]],
+        window_sizes,
+        periods_per_year,
+        max_bytes,
+        dtype,
+    )
+    return asset, lev_range, out
+
+
+def simulate_grid(
+    prices,
+    leverages,
+    window_size,
+    periods_per_year=12,
+    jobs=1,
+    max_bytes=DEFAULT_MAX_BYTES,
+    dtype=float,
+):
+    """Simulate a leverage grid over every window.
+
+    Dividend-reinvested portfolios are the grid of the total-return prices
+    of :func:`portfolio.core.total_return_prices`, as ``--dividendcol`` runs
+    them.
+
+    Parameters
+    ----------
+    prices : array-like
+        Price series, one entry per row, or an ``(asset, row)`` array of
+        several price series over the same rows. Every (asset, leverage
+        chunk) pair is one work unit, and with ``jobs > 1`` the whole array
+        is published once to a single pool.
+    leverages : array-like
+        1-D sequence of leverage levels.
+    window_size : int or sequence of int
+        Number of periods in each window. With several sizes the prefix
+        arrays of each leverage chunk are built once and shared by all sizes.
+    periods_per_year : int, optional
+        How many periods constitute one year.
+    jobs : int, optional
+        Number of worker processes. ``1`` runs in-process.
+    max_bytes : int, optional
+        Memory budget for one leverage chunk, see
+        :func:`portfolio.core.batched_leveraged_returns`.
+    dtype : dtype, optional
+        Storage dtype of the float metrics. ``float32`` halves the grid's
+        memory; every value is the float64 one rounded once, within
+        :data:`portfolio.core.FLOAT32_RTOL`.
+
+    Returns
+    -------
+    dict[str, np.ndarray]
+        One ``(len(leverages), n_windows)`` array per :data:`GRID_METRICS`
+        key. When ``window_size`` is a sequence, a dict of
+        such results keyed by window size. A 2-D ``prices`` adds a leading
+        asset axis to every array; each asset is filled in place, so
+        ``result[name][a]`` is a view of asset ``a``.
+
+    Examples
+    --------
+    >>> grid = simulate_grid([[100, 110, 99], [50, 49, 51]], [1, 2], 1)
+    >>> grid["total_return"].shape
+    (2, 2, 2)
+    >>> grid["total_return"][1].round(2).tolist()
+    [[-0.02, 0.04], [-0.04, 0.08]]
+    """
+    prices = np.asarray(prices, dtype=float)
+    leverages = np.asarray(leverages, dtype=float).ravel()
+    window_sizes = [window_size] if np.ndim(window_size) == 0 else list(window_size)
+    # a single series is the one asset of an (asset, row) array
+    series = np.atleast_2d(prices)
+    n_assets, n_rows = series.shape
+
+    def n_windows(w):
+        return max(n_rows - w, 0)
+
+    results = {}
+    for w in window_sizes:
+        results[w] = {
+            name: np.empty((n_assets, len(leverages), n_windows(w)), dtype=kind)
+            for name, kind in _grid_dtypes(dtype).items()
+        }
+
+    # the assets already split the work between the workers
+    chunks = _leverage_chunks(
+        n_rows,
+        len(leverages),
+        max(map(n_windows, window_sizes)),
+        max_bytes,
+        -(-jobs // n_assets),
+    )
+    units = [(a, lev_range) for a in range(n_assets) for lev_range in chunks]
+    if jobs <= 1:
+        for a, (lo, hi) in units:
+            blocks = _grid_chunk(
+                series[a], leverages[lo:hi], window_sizes, periods_per_year, max_bytes, dtype
+            )
+            _store(results, a, (lo, hi), blocks)
+    else:
+        _simulate_pooled(
+            results, series, leverages, units, periods_per_year, jobs, max_bytes, dtype
+        )
+
+    if prices.ndim == 1:
+        results = {
+            w: {name: arr[0] for name, arr in grid.items()} for w, grid in results.items()
+        }
+    if np.ndim(window_size) == 0:
+        return results[window_size]
+    return results
+
+
+def _store(results, asset, lev_range, blocks):
+    """Copy the per-window-size ``blocks`` of one work unit into ``results``."""
+    rows = slice(*lev_range)
+    for w, block in blocks.items():
+        for name in GRID_METRICS:
+            results[w][name][asset, rows] = block[name]
+
+
+def _simulate_pooled(
+    results, series, leverages, units, periods_per_year, jobs, max_bytes, dtype
+):
+    """Fill the preallocated ``results`` by running the ``(asset, leverage
+    chunk)`` work ``units`` on one process pool."""
+    window_sizes = list(results)
+    blocks, specs = _publish({"prices": series})
+    try:
+        with ProcessPoolExecutor(
+            max_workers=jobs, initializer=_attach, initargs=(specs,)
+        ) as pool:
+            futures = [
+                pool.submit(
+                    _run_leveraged,
+                    asset,
+                    lev_range,
+                    leverages,
+                    window_sizes,
+                    periods_per_year,
+                    max_bytes,
+                    dtype,
+                )
+                for asset, lev_range in units
+            ]
+            for future in as_completed(futures):
+                _store(results, *future.result())
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+
+__all__ = [
+    "GRID_METRICS",
+    "leveraged_prefixes",
+    "leveraged_block",
+    "simulate_grid",
+]
@@ -0,0 +1,131 @@
+"""Opt-in stage timing and memory instrumentation for CLI runs.
+
+A :class:`StageProfiler` records, for each named stage, the number of calls,
+wall time, CPU time and the ``tracemalloc`` peak, plus free-form counters of
+hot-path events. A disabled profiler does no timing and no tracing, so the
+instrumented code paths cost nothing when profiling is off.
+"""
+
+from contextlib import contextmanager
+import json
+import os
+import time
+import tracemalloc
+
+PROFILE_ENV = "PORTFOLIO_PROFILE"
+
+
+def profiling_requested(flag=False):
+    """Whether ``--profile`` or the ``PORTFOLIO_PROFILE`` environment variable
+    asks for a profile.
+
+    Examples
+    --------
+    >>> profiling_requested(True)
+    True
+    """
+    env = os.environ.get(PROFILE_ENV, "").strip().lower()
+    return bool(flag) or env not in ("", "0", "false", "no")
+
+
+class StageProfiler:
+    """Per-stage wall time, CPU time and traced peak memory.
+
+    Stages may nest and may be entered repeatedly (e.g. once per chunk);
+    repeated stages accumulate their times and keep the largest peak. A
+    nested stage's peak also counts toward its enclosing stage.
+
+    Examples
+    --------
+    >>> profiler = StageProfiler()
+    >>> with profiler.stage("load"):
+    ...     data = list(range(1000))
+    >>> profiler.count("rows", len(data))
+    >>> report = profiler.report()
+    >>> report["stages"]["load"]["calls"], report["counters"]["rows"]
+    (1, 1000)
+    >>> profiler.close()
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.stages = {}
+        self.counters = {}
+        self._stack = []
+        self._started_tracing = False
+        if enabled:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+            self._start = (time.perf_counter(), time.process_time())
+            self._overall_peak = 0
+
+    def _fold_peak(self):
+        """Credit the peak since the last reset to every open stage."""
+        peak = tracemalloc.get_traced_memory()[1]
+        for frame in self._stack:
+            frame["peak"] = max(frame["peak"], peak)
+        self._overall_peak = max(self._overall_peak, peak)
+        tracemalloc.reset_peak()
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as stage ``name``."""
+        if not self.enabled:
+            yield
+            return
+        self._fold_peak()
+        frame = {"peak": 0}
+        self._stack.append(frame)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            self._fold_peak()
+            self._stack.pop()
+            record = self.stages.setdefault(
+                name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_bytes": 0}
+            )
+            record["calls"] += 1
+            record["wall_s"] += wall
+            record["cpu_s"] += cpu
+            record["peak_bytes"] = max(record["peak_bytes"], frame["peak"])
+
+    def count(self, name, n=1):
+        """Add ``n`` to the counter ``name``."""
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + int(n)
+
+    def report(self):
+        """The recorded stages, counters and run totals as a dict."""
+        if not self.enabled:
+            return {}
+        self._fold_peak()
+        return {
+            "total": {
+                "wall_s": time.perf_counter() - self._start[0],
+                "cpu_s": time.process_time() - self._start[1],
+                "peak_bytes": self._overall_peak,
+            },
+            "stages": self.stages,
+            "counters": self.counters,
+        }
+
+    def write(self, path, **extra):
+        """Write :meth:`report` (plus ``extra`` keys) to ``path`` as JSON."""
+        with open(path, "w") as fh:
+            json.dump({**self.report(), **extra}, fh, indent=2, default=str)
+
+    def close(self):
+        """Stop tracing if this profiler started it."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+
+NULL_PROFILER = StageProfiler(enabled=False)
+
+__all__ = ["PROFILE_ENV", "profiling_requested", "StageProfiler", "NULL_PROFILER"]
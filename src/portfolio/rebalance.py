@@ -0,0 +1,179 @@
+"""Periodically rebalanced leveraged portfolios over every rolling window.
+
+Between two rebalance dates a leveraged position is bought and held: ``L``
+times the equity is invested in the asset and the rest is borrowed, so the
+equity ``t`` rows after a rebalance at row ``a`` is
+``V_a * (1 + L * (T[a + t] / T[a] - 1))``, where ``T`` is the total-return
+index of the asset (price with dividends reinvested, as in
+:func:`portfolio.core.simulate_window_dividend`). Each window rebalances on
+its first row and every ``rebalance_period`` rows after that, so its log
+growth is a sum of segment log factors spaced ``rebalance_period`` rows
+apart, plus one final partial segment. The sum is read off prefix sums
+taken with stride ``rebalance_period``, so every window of a series is
+evaluated in O(N) per leverage and period, without simulating any window
+individually. A window is busted when its equity reaches zero on any row,
+which the range minimum (maximum, for short positions) of ``T`` over each
+segment detects.
+
+With ``rebalance_period=1`` this is the daily-rebalanced position of
+:func:`portfolio.core.rolling_leveraged_returns`.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+from .core import (
+    DEFAULT_MAX_BYTES,
+    _window_range,
+    leverage_chunk_size,
+    log_total_return_index,
+)
+from .drawdown import _range, _sparse_tables
+
+
+def _segment_factors(index, tables, leverages, length):
+    """Log growth (``0`` where busted) and bust flag of every buy-and-hold
+    segment of ``length`` rows, one row per leverage."""
+    n_segments = max(len(index) - length, 0)
+    starts = np.arange(n_segments)
+    base = index[starts]
+    ratio = np.exp(index[starts + length] - base)
+    lowest = np.exp(np.minimum(*_range(tables[1], starts, length + 1)) - base)
+    highest = np.exp(np.maximum(*_range(tables[0], starts, length + 1)) - base)
+
+    lev = leverages[:, None]
+    factors = 1.0 + lev * (ratio - 1.0)
+    # the worst row of a segment is its lowest price for longs, highest for shorts
+    worst = 1.0 + lev * (np.where(lev >= 0, lowest, highest) - 1.0)
+    busted = worst <= 0
+    return np.log(np.where(busted, 1.0, factors)), busted
+
+
+def _strided_prefix(values, stride):
+    """``P`` with ``P[j + stride] = P[j] + values[..., j]`` and ``P[:stride] = 0``.
+
+    The sum of ``values[s], values[s + stride], ...`` over ``m`` terms is
+    ``P[s + m * stride] - P[s]``.
+    """
+    n = values.shape[-1] + stride
+    padded = np.zeros(values.shape[:-1] + (-(-n // stride) * stride,), values.dtype)
+    padded[..., stride:n] = values
+    shape = values.shape[:-1] + (-1, stride)
+    return np.cumsum(padded.reshape(shape), axis=-2).reshape(padded.shape)[..., :n]
+
+
+def _rebalanced_block(index, tables, leverages, period, window_size, starts):
+    """Window log growth and bust flags for one chunk of leverages."""
+    n_full, rest = divmod(window_size, period)
+    log_growth = np.zeros((len(leverages), len(starts)))
+    busts = np.zeros((len(leverages), len(starts)), dtype=np.int64)
+    if n_full:
+        logs, busted = _segment_factors(index, tables, leverages, period)
+        ends = starts + n_full * period
+        log_prefix = _strided_prefix(logs, period)
+        bust_prefix = _strided_prefix(busted.astype(np.int64), period)
+        log_growth += log_prefix[:, ends] - log_prefix[:, starts]
+        busts += bust_prefix[:, ends] - bust_prefix[:, starts]
+    if rest:
+        logs, busted = _segment_factors(index, tables, leverages, rest)
+        last = starts + n_full * period
+        log_growth += logs[:, last]
+        busts += busted[:, last]
+    return log_growth, busts > 0
+
+
+def rolling_rebalanced_returns(
+    prices,
+    leverages,
+    rebalance_period,
+    window_size: int,
+    periods_per_year: int = 12,
+    dividends=None,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    start: int = 0,
+    stop: Optional[int] = None,
+):
+    """Window metrics of leveraged positions rebalanced every ``rebalance_period`` rows.
+
+    Parameters
+    ----------
+    prices : array-like
+        Price series, one entry per row.
+    leverages : array-like
+        1-D sequence of leverage levels, restored at every rebalance.
+    rebalance_period : int or sequence of int
+        Rows between rebalances. Several periods are evaluated in one call
+        and share the total-return index and its range tables.
+    window_size : int
+        Number of periods in each window.
+    periods_per_year : int, optional
+        How many periods constitute one year, used for the CAGR.
+    dividends : array-like, optional
+        Dividend series, reinvested at the price of the row they are paid.
+    max_bytes : int, optional
+        Approximate memory budget for one chunk of leverages.
+    start, stop : int, optional
+        Only compute windows ``start <= w < stop``.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray, np.ndarray]
+        ``(total_return, cagr, bust)``, each of shape
+        ``(len(leverages), stop - start)``. Busted windows report ``0.0``
+        for both returns, as :func:`portfolio.core.batched_leveraged_returns`
+        does. When ``rebalance_period`` is a sequence, a dict of such tuples
+        keyed by period.
+
+    Raises
+    ------
+    ValueError
+        If a rebalance period is smaller than one row.
+
+    Examples
+    --------
+    Held for both periods, a 2x position gains ``2 * 20%``; rebalanced after
+    the first, it compounds ``1.2 * (1 + 2 * 10/110)``:
+
+    >>> out = rolling_rebalanced_returns([100, 110, 120], [2], [1, 2], 2)
+    >>> out[1][0].round(4).tolist(), out[2][0].round(4).tolist()
+    ([[0.4182]], [[0.4]])
+    """
+    prices = np.asarray(prices, dtype=float)
+    leverages = np.asarray(leverages, dtype=float).ravel()
+    periods = [rebalance_period] if np.ndim(rebalance_period) == 0 else list(rebalance_period)
+    if min(periods) < 1:
+        raise ValueError(f"rebalance periods must be at least 1, got {periods}")
+
+    start, stop = _window_range(len(prices), window_size, start, stop)
+    starts = np.arange(start, stop)
+    index = log_total_return_index(prices, dividends)
+    longest = min(max(periods), window_size) + 1
+    tables = _sparse_tables(index, longest.bit_length())[:2]
+
+    # segment factors, both strided prefixes and the per-window temporaries
+    chunk = leverage_chunk_size(len(prices), len(starts), max_bytes)
+    results = {}
+    for period in periods:
+        total_return = np.empty((len(leverages), len(starts)), dtype=float)
+        cagr = np.empty((len(leverages), len(starts)), dtype=float)
+        bust = np.empty((len(leverages), len(starts)), dtype=bool)
+        for lo in range(0, len(leverages), chunk):
+            hi = min(lo + chunk, len(leverages))
+            log_growth, bust[lo:hi] = _rebalanced_block(
+                index, tables, leverages[lo:hi], period, window_size, starts
+            )
+            total_return[lo:hi] = np.where(bust[lo:hi], 0.0, np.expm1(log_growth))
+            cagr[lo:hi] = np.where(
+                bust[lo:hi],
+                0.0,
+                np.expm1(log_growth * periods_per_year / window_size),
+            )
+        results[period] = (total_return, cagr, bust)
+
+    if np.ndim(rebalance_period) == 0:
+        return results[rebalance_period]
+    return results
+
+
+__all__ = ["log_total_return_index", "rolling_rebalanced_returns"]
@@ -1,13 +1,83 @@
+import re
+import warnings
+from typing import Optional
+
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+
+_PORTFOLIO_COLUMN = re.compile(r"portfolio_(.+)x")
+
+
+def box_statistics(returns_df: pd.DataFrame, portfolio_cols, whis=1.5):
+    """Box-and-whisker statistics of every column, for ``Axes.bxp``.
+
+    Quartiles, whiskers (the most extreme values within ``whis`` IQRs of the
+    box) and fliers are computed for all columns at once, ignoring ``nan``
+    and non-numeric entries, with the conventions of
+    ``matplotlib.cbook.boxplot_stats``. ``returns_df`` is not modified.
+
+    Returns
+    -------
+    list[dict]
+        One dict per column with ``label``, ``med``, ``q1``, ``q3``,
+        ``whislo``, ``whishi``, ``mean`` and ``fliers``.
+
+    Examples
+    --------
+    >>> df = pd.DataFrame({"a": [1.0, 2.0, 3.0, 4.0, 100.0]})
+    >>> (stats,) = box_statistics(df, ["a"])
+    >>> stats["med"], stats["whishi"], stats["fliers"].tolist()
+    (3.0, 4.0, [100.0])
+    """
+    portfolio_cols = list(portfolio_cols)
+    values = _numeric_block(returns_df, portfolio_cols)
+    present = ~np.isnan(values)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        q1, med, q3 = np.nanpercentile(values, [25, 50, 75], axis=0)
+        mean = np.nanmean(values, axis=0)
+    iqr = q3 - q1
+    inside = present & (values >= q1 - whis * iqr) & (values <= q3 + whis * iqr)
+    whislo = np.min(np.where(inside, values, np.inf), axis=0, initial=np.inf)
+    whishi = np.max(np.where(inside, values, -np.inf), axis=0, initial=-np.inf)
+    # no value within reach of the box: the whisker collapses onto it
+    whislo = np.where(np.isinf(whislo), q1, whislo)
+    whishi = np.where(np.isinf(whishi), q3, whishi)
+    outside = present & ~inside
+    return [
+        {
+            "label": col,
+            "med": float(med[j]),
+            "q1": float(q1[j]),
+            "q3": float(q3[j]),
+            "iqr": float(iqr[j]),
+            "whislo": float(whislo[j]),
+            "whishi": float(whishi[j]),
+            "mean": float(mean[j]),
+            "fliers": values[outside[:, j], j],
+        }
+        for j, col in enumerate(portfolio_cols)
+    ]
 
 
 def boxplot_returns(
-    returns_df: pd.DataFrame, portfolio_cols, log=False, showfliers=True, label="Return"
+    returns_df: pd.DataFrame,
+    portfolio_cols,
+    log=False,
+    showfliers=True,
+    label="Return",
+    stats=None,
+    figure=None,
 ):
     """
     Draw a box-and-whisker plot of window returns.
 
+    The box statistics are computed once with :func:`box_statistics` and
+    drawn with ``Axes.bxp``, so the raw points are never handed to
+    matplotlib. Without ``figure`` the plot goes on a standalone
+    ``matplotlib.figure.Figure`` that pyplot does not track, which can be
+    drawn and saved from a worker thread.
+
     Parameters
     ----------
     returns_df : DataFrame
@@ -16,29 +86,103 @@ def boxplot_returns(
         If True, use a logarithmic scale for the y-axis.
     showfliers : bool, optional
         If False, outlier points will not be shown.
+    label : str, optional
+        Y-axis label.
+    stats : list[dict], optional
+        Precomputed :func:`box_statistics` of ``returns_df``, e.g. shared by
+        several plots of the same table.
+    figure : matplotlib.figure.Figure, optional
+        Figure to draw on, e.g. one created by ``pyplot`` to be shown.
     """
-    returns_df[portfolio_cols] = returns_df[portfolio_cols].apply(
-        pd.to_numeric, errors="coerce"
-    )
+    from matplotlib.figure import Figure
+
+    if stats is None:
+        stats = box_statistics(returns_df, portfolio_cols)
 
-    ax = returns_df[portfolio_cols].boxplot(showfliers=showfliers)
+    fig = Figure() if figure is None else figure
+    ax = fig.add_subplot()
+    ax.bxp(stats, showfliers=showfliers)
+    ax.grid(True)
     ax.set_ylabel(label)
-    ax.set_xticklabels(ax.get_xticklabels(), rotation=45)
+    ax.set_xticklabels([s["label"] for s in stats], rotation=45)
     if log:
         ax.set_yscale("log")
-    fig = ax.get_figure()
     fig.tight_layout()
     return fig
 
 
+def _column_leverage(col):
+    """Leverage of a ``portfolio_<leverage>x`` column, or ``None``.
+
+    Examples
+    --------
+    >>> _column_leverage("portfolio_1.25x"), _column_leverage("portfolio_2x")
+    (1.25, 2.0)
+    >>> _column_leverage("underlying") is None
+    True
+    """
+    match = _PORTFOLIO_COLUMN.fullmatch(str(col))
+    if match is None:
+        return None
+    try:
+        return float(match.group(1))
+    except ValueError:
+        return None
+
+
+def _bust_ratios(bust_df, portfolio_cols):
+    """Bust ratio of each column; ``0.0`` for columns without a row (e.g.
+    ``underlying``).
+
+    Rows are matched on the ``portfolio`` column of ``bust_df`` when it has
+    one, otherwise on the leverage parsed from ``portfolio_<leverage>x``.
+    """
+    ratios = bust_df["bust_ratio"].astype(float).tolist()
+    if "portfolio" in bust_df:
+        by_column = dict(zip(bust_df["portfolio"].astype(str).tolist(), ratios))
+        return np.array([by_column.get(str(col), 0.0) for col in portfolio_cols], dtype=float)
+    by_leverage = dict(zip(bust_df["leverage"].astype(float).tolist(), ratios))
+    return np.array(
+        [by_leverage.get(_column_leverage(col), 0.0) for col in portfolio_cols],
+        dtype=float,
+    )
+
+
+def _numeric_block(df, cols):
+    """``df[cols]`` as a 2D float array; non-numeric entries become ``nan``."""
+    try:
+        return df[cols].to_numpy(dtype=float)
+    except (TypeError, ValueError):
+        return df[cols].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+
+
+def _stack(values, cols):
+    """Per-column sequences as ``nan``-padded rows of a 2D array, and their lengths."""
+    lengths = np.array([len(values.get(col, ())) for col in cols], dtype=np.int64)
+    block = np.full((len(cols), int(lengths.max(initial=0))), np.nan)
+    for j, col in enumerate(cols):
+        block[j, : lengths[j]] = values.get(col, ())
+    return block, lengths
+
+
 def summary_statistics(
     returns_df: pd.DataFrame,
     annualised_df: pd.DataFrame,
     bust_df: pd.DataFrame,
     sharpe_dict: dict[str, list[float]],
+    volatility_dict: Optional[dict[str, list[float]]] = None,
+    sortino_dict: Optional[dict[str, list[float]]] = None,
+    drawdown_dict: Optional[dict[str, list[float]]] = None,
+    duration_dict: Optional[dict[str, list[float]]] = None,
 ) -> pd.DataFrame:
     """Aggregate window statistics for each portfolio column.
 
+    Every metric is computed for all columns at once, along the window axis
+    of the 2D returns and CAGR arrays, ignoring ``nan`` entries as pandas
+    does. Bust ratios are matched to ``portfolio_<leverage>x`` columns by
+    the numeric leverage, so ``portfolio_1x`` and ``portfolio_1.0x`` both
+    pick up the row of leverage ``1``.
+
     Parameters
     ----------
     returns_df : DataFrame
@@ -46,10 +190,24 @@ def summary_statistics(
     annualised_df : DataFrame
         Table of annualised returns (CAGR) for each window.
     bust_df : DataFrame
-        Summary of bust proportions with columns ``leverage`` and ``bust_ratio``.
+        Summary of bust proportions with columns ``leverage`` and
+        ``bust_ratio``, and optionally ``portfolio`` naming the column of
+        each row.
     sharpe_dict : dict[str, list[float]]
         Mapping of portfolio column name to a list of Sharpe ratios for each
         window.
+    volatility_dict : dict[str, list[float]], optional
+        Per-window annualised volatility for each portfolio column. Adds an
+        ``avg_volatility`` column when given.
+    sortino_dict : dict[str, list[float]], optional
+        Per-window Sortino ratios for each portfolio column. Adds an
+        ``avg_sortino`` column when given.
+    drawdown_dict : dict[str, list[float]], optional
+        Per-window maximum drawdown for each portfolio column. Adds
+        ``mean_max_drawdown`` and ``worst_max_drawdown`` columns when given.
+    duration_dict : dict[str, list[float]], optional
+        Per-window longest drawdown duration (in periods) for each portfolio
+        column. Adds a ``max_drawdown_duration`` column when given.
 
     Returns
     -------
@@ -61,44 +219,119 @@ def summary_statistics(
     start_col, end_col = returns_df.columns[:2]
     portfolio_cols = [c for c in returns_df.columns if c not in (start_col, end_col)]
 
-    # map columns like ``portfolio_1x`` to bust ratios
-    def _col_name(lev):
-        text = str(lev)
-        if text.endswith(".0"):
-            text = text[:-2]
-        return f"portfolio_{text}x"
+    returns = _numeric_block(returns_df, portfolio_cols)
+    cagr = _numeric_block(annualised_df, portfolio_cols)
 
-    bust_map = {_col_name(row["leverage"]): row["bust_ratio"] for _, row in bust_df.iterrows()}
+    def mean_or_zero(values):
+        block, lengths = _stack(values, portfolio_cols)
+        return np.where(lengths > 0, np.nanmean(block, axis=1), 0.0)
 
-    stats = []
-    for col in portfolio_cols:
-        series_ret = pd.to_numeric(returns_df[col], errors="coerce")
-        series_cagr = pd.to_numeric(annualised_df[col], errors="coerce")
+    def max_or_zero(values):
+        block, lengths = _stack(values, portfolio_cols)
+        return np.where(lengths > 0, np.nanmax(block, axis=1), 0.0)
 
-        mean_ret = series_ret.mean()
-        iqr_ret = series_ret.quantile(0.75) - series_ret.quantile(0.25)
-        mean_cagr = series_cagr.mean()
-        std_cagr = series_cagr.std()
-        bust_ratio = bust_map.get(col, 0.0)
+    # all-nan (or empty) columns give nan, as the pandas reductions do
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        # nanpercentile is much slower than percentile, so only pay for it with gaps
+        percentile = np.nanpercentile if np.isnan(returns).any() else np.percentile
+        q25, q75 = percentile(returns, [25, 75], axis=0)
+        stats = {
+            "portfolio": portfolio_cols,
+            "mean_total_return": np.nanmean(returns, axis=0),
+            "iqr_total_return": q75 - q25,
+            "mean_cagr": np.nanmean(cagr, axis=0),
+            "std_cagr": np.nanstd(cagr, axis=0, ddof=1),
+            "bust_ratio": _bust_ratios(bust_df, portfolio_cols),
+            "avg_sharpe": mean_or_zero(sharpe_dict),
+            "min_total_return": np.nanmin(returns, axis=0, initial=np.inf),
+            "max_total_return": np.nanmax(returns, axis=0, initial=-np.inf),
+        }
+        if volatility_dict is not None:
+            stats["avg_volatility"] = mean_or_zero(volatility_dict)
+        if sortino_dict is not None:
+            stats["avg_sortino"] = mean_or_zero(sortino_dict)
+        if drawdown_dict is not None:
+            stats["mean_max_drawdown"] = mean_or_zero(drawdown_dict)
+            stats["worst_max_drawdown"] = max_or_zero(drawdown_dict)
+        if duration_dict is not None:
+            stats["max_drawdown_duration"] = max_or_zero(duration_dict)
 
-        sharpe_vals = sharpe_dict.get(col, [])
-        avg_sharpe = float(pd.Series(sharpe_vals).mean()) if sharpe_vals else 0.0
+    for name in ("min_total_return", "max_total_return"):
+        stats[name] = np.where(np.isinf(stats[name]), np.nan, stats[name])
+    return pd.DataFrame(stats)
+
+
+def accumulated_statistics(
+    returns_df: Optional[pd.DataFrame], bust_df: pd.DataFrame, accumulators
+):
+    """:func:`summary_statistics` from mergeable per-column accumulators.
 
+    Parameters
+    ----------
+    returns_df : DataFrame or dict[str, array-like], optional
+        Total returns of every window by column; only used for the
+        interquartile range, which has no exact mergeable form. When
+        ``None`` the range comes from the quantile sketch of each
+        ``total_return`` accumulator (see
+        :func:`portfolio.incremental.new_accumulators`), so no window's
+        return has to be kept.
+    bust_df : DataFrame
+        Summary of bust proportions with columns ``leverage`` and
+        ``bust_ratio``, and optionally ``portfolio`` naming the column of
+        each row.
+    accumulators : dict[str, dict[str, RunningStats]]
+        Per portfolio column, a :class:`~portfolio.accumulators.RunningStats`
+        for each of ``total_return``, ``cagr``, ``sharpe``, ``volatility``,
+        ``sortino``, ``max_drawdown`` and ``drawdown_duration``.
+
+    Returns
+    -------
+    DataFrame
+        The columns of :func:`summary_statistics` with every optional metric.
+    """
+    bust_ratios = _bust_ratios(bust_df, list(accumulators))
+
+    def mean(acc, empty=float("nan")):
+        return acc.mean if acc.count else empty
+
+    def extreme(acc, value, empty=float("nan")):
+        return value if acc.count else empty
+
+    stats = []
+    for (col, acc), bust_ratio in zip(accumulators.items(), bust_ratios):
+        ret = acc["total_return"]
+        if returns_df is None:
+            q25, q75 = ret.quantile([0.25, 0.75])
+        else:
+            series_ret = pd.to_numeric(pd.Series(returns_df[col]), errors="coerce")
+            q25, q75 = series_ret.quantile(0.25), series_ret.quantile(0.75)
+        drawdown = acc["max_drawdown"]
+        duration = acc["drawdown_duration"]
         stats.append(
             {
                 "portfolio": col,
-                "mean_total_return": mean_ret,
-                "iqr_total_return": iqr_ret,
-                "mean_cagr": mean_cagr,
-                "std_cagr": std_cagr,
+                "mean_total_return": mean(ret),
+                "iqr_total_return": q75 - q25,
+                "mean_cagr": mean(acc["cagr"]),
+                "std_cagr": acc["cagr"].std,
                 "bust_ratio": bust_ratio,
-                "avg_sharpe": avg_sharpe,
-                "min_total_return": series_ret.min(),
-                "max_total_return": series_ret.max(),
+                "avg_sharpe": mean(acc["sharpe"], 0.0),
+                "min_total_return": extreme(ret, ret.min),
+                "max_total_return": extreme(ret, ret.max),
+                "avg_volatility": mean(acc["volatility"], 0.0),
+                "avg_sortino": mean(acc["sortino"], 0.0),
+                "mean_max_drawdown": mean(drawdown, 0.0),
+                "worst_max_drawdown": extreme(drawdown, drawdown.max, 0.0),
+                "max_drawdown_duration": extreme(duration, duration.max, 0.0),
             }
         )
-
     return pd.DataFrame(stats)
 
 
-__all__ = ["boxplot_returns", "summary_statistics"]
+__all__ = [
+    "box_statistics",
+    "boxplot_returns",
+    "summary_statistics",
+    "accumulated_statistics",
+]
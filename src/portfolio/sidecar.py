@@ -0,0 +1,135 @@
+"""Binary sidecar cache of parsed CSV columns.
+
+The first read of ``prices.csv`` parses only the requested columns and saves
+each as a ``.npy`` file in ``prices.csv.sidecar/``, together with the CSV's
+size, modification time and SHA-256. Later reads memory-map those arrays
+instead of parsing the CSV again. A changed size or mtime triggers a hash of
+the file; only a changed hash (or a different column selection) re-parses.
+
+Text columns are stored as fixed-width unicode so they can be mapped too,
+and are turned back into ``object`` columns on load, so the returned frame
+has the same dtypes as a plain ``pandas.read_csv``. Object columns holding
+anything but strings (e.g. missing labels) are pickled instead of mapped.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+SIDECAR_VERSION = 1
+
+
+def sidecar_dir(path):
+    """Directory holding the sidecar of the CSV at ``path``."""
+    return f"{path}.sidecar"
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of the file at ``path``."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _load_meta(directory):
+    try:
+        with open(os.path.join(directory, "meta.json")) as fh:
+            return json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_json(directory, name, payload):
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as fh:
+        json.dump(payload, fh)
+    os.replace(tmp, os.path.join(directory, name))
+
+
+def _save(directory, meta, data, columns):
+    os.makedirs(directory, exist_ok=True)
+    meta["columns"] = {}
+    for i, col in enumerate(columns):
+        values = data[col].to_numpy()
+        kind = "array"
+        if values.dtype == object:
+            # missing values or mixed types cannot be stored as fixed-width text
+            kind = "text" if all(isinstance(v, str) for v in values) else "pickle"
+            if kind == "text":
+                values = values.astype(str)
+        fname = f"c{i}.npy"
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fh:
+            np.save(fh, values, allow_pickle=kind == "pickle")
+        os.replace(tmp, os.path.join(directory, fname))
+        meta["columns"][col] = {"file": fname, "kind": kind}
+    # meta goes last: its presence means every array is complete
+    _write_json(directory, "meta.json", meta)
+
+
+def _load(directory, meta, columns):
+    frame = {}
+    for col in columns:
+        info = meta["columns"][col]
+        fname = os.path.join(directory, info["file"])
+        if info["kind"] == "pickle":
+            frame[col] = np.load(fname, allow_pickle=True)
+            continue
+        values = np.load(fname, mmap_mode="r")
+        frame[col] = values.astype(object) if info["kind"] == "text" else values
+    return pd.DataFrame(frame, copy=False)
+
+
+def read_csv_cached(path, columns, dtype=None):
+    """Read ``columns`` of the CSV at ``path`` through its binary sidecar.
+
+    Parameters
+    ----------
+    path : str
+        CSV file.
+    columns : list[str]
+        Columns to load, in the order they should appear.
+    dtype : dict, optional
+        Explicit dtypes passed to ``pandas.read_csv`` when parsing.
+
+    Returns
+    -------
+    DataFrame
+        The requested columns; numeric columns are backed by read-only
+        memory maps on a hit.
+    """
+    columns = list(columns)
+    directory = sidecar_dir(path)
+    stat = os.stat(path)
+    meta = _load_meta(directory)
+    wanted = {
+        "version": SIDECAR_VERSION,
+        "names": columns,
+        "dtype": {k: str(v) for k, v in (dtype or {}).items()},
+    }
+    if meta is not None and all(meta.get(k) == v for k, v in wanted.items()):
+        if meta["size"] == stat.st_size and meta["mtime_ns"] == stat.st_mtime_ns:
+            return _load(directory, meta, columns)
+        # touched but possibly unchanged: compare contents before re-parsing
+        if meta["size"] == stat.st_size and meta["sha256"] == file_digest(path):
+            meta["mtime_ns"] = stat.st_mtime_ns
+            _write_json(directory, "meta.json", meta)
+            return _load(directory, meta, columns)
+
+    wanted_cols = set(columns)
+    data = pd.read_csv(path, usecols=lambda name: name in wanted_cols, dtype=dtype)
+    data = data[columns]
+    meta = dict(
+        wanted, size=stat.st_size, mtime_ns=stat.st_mtime_ns, sha256=file_digest(path)
+    )
+    _save(directory, meta, data, columns)
+    return data
+
+
+__all__ = ["sidecar_dir", "file_digest", "read_csv_cached"]
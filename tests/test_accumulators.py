@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from portfolio.accumulators import RunningStats
+
+
+def test_merged_batches_match_whole_sample():
+    rng = np.random.default_rng(0)
+    values = rng.normal(3.0, 2.0, 1000)
+    merged = RunningStats()
+    for part in np.array_split(values, 7):
+        acc = RunningStats()
+        acc.update(part)
+        merged.merge(acc)
+    assert merged.count == len(values)
+    assert merged.mean == pytest.approx(values.mean(), rel=1e-12)
+    assert merged.std == pytest.approx(values.std(ddof=1), rel=1e-12)
+    assert (merged.min, merged.max) == (values.min(), values.max())
+
+
+def test_nan_ignored_and_round_trip():
+    acc = RunningStats()
+    acc.update([1.0, np.nan, 5.0])
+    assert acc.count == 2
+    restored = RunningStats.from_list(acc.to_list())
+    assert restored.to_list() == acc.to_list()
+    assert np.isnan(RunningStats().std)
+
+
+def test_sketch_is_exact_until_k_values():
+    from portfolio.accumulators import QuantileSketch
+
+    values = np.random.default_rng(1).normal(size=500)
+    sketch = QuantileSketch(k=512)
+    for part in np.array_split(values, 4):
+        sketch.update(part)
+    assert sketch.exact
+    assert sketch.quantile(0.25) == np.quantile(values, 0.25)
+
+
+def test_merged_sketches_stay_within_rank_error():
+    from portfolio.accumulators import QuantileSketch
+
+    rng = np.random.default_rng(2)
+    values = rng.standard_t(3, 100_000)
+    k = 200
+    merged = QuantileSketch(k)
+    for part in np.array_split(values, 9):
+        sketch = QuantileSketch(k)
+        for chunk in np.array_split(part, 5):
+            sketch.update(chunk)
+        merged.merge(sketch)
+    assert merged.count == len(values)
+    assert sum(map(len, merged.levels)) <= 3 * k
+
+    qs = np.array([0.01, 0.25, 0.5, 0.75, 0.99])
+    ranks = np.searchsorted(np.sort(values), merged.quantile(qs)) / len(values)
+    assert np.abs(ranks - qs).max() < 3.3 / k
+
+    restored = QuantileSketch.from_list(merged.to_list())
+    np.testing.assert_array_equal(restored.quantile(qs), merged.quantile(qs))
+
+
+def test_running_stats_carries_sketch_through_merge_and_round_trip():
+    acc = RunningStats(sketch_k=64)
+    acc.update([1.0, 2.0, np.nan])
+    other = RunningStats(sketch_k=64)
+    other.update([3.0, 4.0])
+    acc.merge(other)
+    assert acc.quantile(0.5) == 2.5
+    restored = RunningStats.from_list(acc.to_list())
+    assert restored.quantile([0.25, 0.75]).tolist() == [1.75, 3.25]
+    with pytest.raises(ValueError):
+        RunningStats().quantile(0.5)
+
+
+def test_merge_rejects_mismatched_sketches():
+    with_sketch = RunningStats(sketch_k=64)
+    with_sketch.update([1.0])
+    plain = RunningStats()
+    plain.update([2.0, 3.0, 4.0])
+    with pytest.raises(ValueError, match="sketch"):
+        with_sketch.merge(plain)
+    with pytest.raises(ValueError, match="sketch"):
+        plain.merge(with_sketch)
+    assert (with_sketch.count, with_sketch.sketch.count) == (1, 1)
+
+    other = RunningStats(sketch_k=128)
+    other.update([2.0])
+    with pytest.raises(ValueError, match="different k"):
+        with_sketch.merge(other)
+
+    same = RunningStats(sketch_k=64)
+    same.update([2.0, 3.0, 4.0])
+    with_sketch.merge(same)
+    assert (with_sketch.count, with_sketch.sketch.count) == (4, 4)
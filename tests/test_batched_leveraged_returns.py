@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from portfolio.core import batched_leveraged_returns, rolling_leveraged_returns
+
+
+@pytest.fixture
+def prices():
+    rng = np.random.default_rng(1)
+    return 100 * np.cumprod(1 + rng.normal(0.004, 0.04, 200))
+
+
+def test_rows_match_single_leverage_engine(prices):
+    leverages = np.linspace(0.25, 6.0, 24)
+    total, cagr, bust = batched_leveraged_returns(prices, leverages, 36)
+
+    assert total.shape == cagr.shape == bust.shape == (24, 200 - 36)
+    for row, lev in enumerate(leverages):
+        exp_total, exp_cagr, exp_bust = rolling_leveraged_returns(prices, lev, 36)
+        np.testing.assert_allclose(total[row], exp_total, rtol=1e-12, atol=1e-14)
+        np.testing.assert_allclose(cagr[row], exp_cagr, rtol=1e-12, atol=1e-14)
+        np.testing.assert_array_equal(bust[row], exp_bust)
+
+
+def test_chunking_does_not_change_results(prices):
+    leverages = np.linspace(0.5, 4.0, 15)
+    unchunked = batched_leveraged_returns(prices, leverages, 12)
+    # a tiny budget forces one leverage per chunk
+    chunked = batched_leveraged_returns(prices, leverages, 12, max_bytes=1)
+    for a, b in zip(unchunked, chunked):
+        np.testing.assert_array_equal(a, b)
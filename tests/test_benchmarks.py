@@ -0,0 +1,63 @@
+import importlib.util
+import json
+from pathlib import Path
+
+import pytest
+
+BENCH = Path(__file__).resolve().parents[1] / "benchmarks" / "bench.py"
+
+
+@pytest.fixture(scope="module")
+def bench():
+    spec = importlib.util.spec_from_file_location("bench", BENCH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _report(**seconds):
+    return {"results": {key: {"seconds": value} for key, value in seconds.items()}}
+
+
+def test_compare_flags_only_real_slowdowns(bench):
+    baseline = _report(fast=0.010, steady=0.5, noisy=1e-6, gone=1.0)
+    current = _report(fast=0.013, steady=0.55, noisy=5e-6, new=2.0)
+    rows, regressions = bench.compare(baseline, current, threshold=0.2)
+    assert [row[0] for row in rows] == ["fast", "steady", "noisy"]
+    assert regressions == ["fast"]
+
+
+def test_run_and_compare_cli(bench, tmp_path):
+    out = tmp_path / "results.json"
+    assert (
+        bench.cli(
+            [
+                "run",
+                "--out",
+                str(out),
+                "--sizes",
+                "200",
+                "--windows",
+                "12",
+                "--repeat",
+                "1",
+                "--only",
+                "rolling_leveraged_returns",
+                "cli_main",
+            ]
+        )
+        == 0
+    )
+    report = json.loads(out.read_text())
+    assert set(report["results"]) == {
+        "rolling_leveraged_returns[rows=200,window=12]",
+        "cli_main[rows=200,window=12]",
+    }
+    assert bench.cli(["compare", str(out), str(out)]) == 0
+
+    slower = json.loads(out.read_text())
+    for entry in slower["results"].values():
+        entry["seconds"] = entry["seconds"] * 10 + 1.0
+    slow_path = tmp_path / "slow.json"
+    slow_path.write_text(json.dumps(slower))
+    assert bench.cli(["compare", str(out), str(slow_path)]) == 1
@@ -0,0 +1,167 @@
+from argparse import Namespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from portfolio.cli import main
+from portfolio.montecarlo import (
+    bootstrap_indices,
+    bootstrap_returns,
+    path_metrics,
+    simulate_bootstrap,
+)
+from portfolio.parallel import leveraged_block
+
+RNG = np.random.default_rng(11)
+PRICES = 100 * np.cumprod(1 + RNG.normal(0.008, 0.06, 200))
+
+
+@pytest.mark.parametrize("method", ["stationary", "block"])
+def test_indices_follow_blocks_and_stay_in_range(method):
+    idx = bootstrap_indices(50, 400, 36, 6, np.random.default_rng(0), method)
+    assert idx.shape == (400, 36)
+    assert idx.min() >= 0 and idx.max() < 50
+    continued = (np.diff(idx, axis=1) % 50) == 1
+    if method == "block":
+        # only every sixth step may start a new block
+        assert continued[:, np.arange(35) % 6 != 5].all()
+    else:
+        # new blocks start with probability 1/6
+        assert abs((~continued).mean() - 1 / 6) < 0.02
+
+
+def test_seed_reproduces_paths_and_batches_bound_memory():
+    returns = np.diff(PRICES) / PRICES[:-1]
+    first = np.concatenate(list(bootstrap_returns(returns, 100, 24, seed=5, batch_paths=32)))
+    again = np.concatenate(list(bootstrap_returns(returns, 100, 24, seed=5, batch_paths=32)))
+    other = np.concatenate(list(bootstrap_returns(returns, 100, 24, seed=6, batch_paths=32)))
+    assert first.shape == (100, 24)
+    np.testing.assert_array_equal(first, again)
+    assert not np.array_equal(first, other)
+    assert [len(b) for b in bootstrap_returns(returns, 100, 24, seed=5, batch_paths=32)] == [
+        32,
+        32,
+        32,
+        4,
+    ]
+
+
+def test_seed_alone_fixes_paths_whatever_the_batch_size():
+    returns = np.diff(PRICES) / PRICES[:-1]
+    whole = np.concatenate(list(bootstrap_returns(returns, 700, 24, seed=5, batch_paths=700)))
+    for batch_paths in (1, 100, 255, 256, 300):
+        batched = bootstrap_returns(returns, 700, 24, seed=5, batch_paths=batch_paths)
+        np.testing.assert_array_equal(np.concatenate(list(batched)), whole)
+
+    small = simulate_bootstrap(PRICES, [1.0, 3.0], 24, 5000, seed=7, max_bytes=2**20)
+    large = simulate_bootstrap(PRICES, [1.0, 3.0], 24, 5000, seed=7, max_bytes=2**30)
+    for name in small:
+        np.testing.assert_array_equal(small[name], large[name])
+
+
+def test_path_metrics_match_historical_window_engine():
+    paths = next(bootstrap_returns(np.diff(PRICES) / PRICES[:-1], 40, 24, seed=2))
+    leverages = [-1.0, 0.5, 1.0, 3.0, 10.0]
+    metrics = path_metrics(paths, leverages, 12)
+    for i, path in enumerate(paths):
+        prices = np.concatenate([[1.0], np.cumprod(1 + path)])
+        window = leveraged_block(prices, leverages, 24, 12)
+        for name, values in window.items():
+            np.testing.assert_allclose(metrics[name][:, i], values[:, 0], rtol=1e-9, atol=1e-12)
+
+
+def test_simulate_bootstrap_is_reproducible():
+    kwargs = dict(window_size=24, n_paths=300, seed=9, batch_paths=64)
+    whole = simulate_bootstrap(PRICES, [1.0, 3.0], **kwargs)
+    assert whole["total_return"].shape == (2, 300)
+    np.testing.assert_array_equal(
+        whole["cagr"], simulate_bootstrap(PRICES, [1.0, 3.0], **kwargs)["cagr"]
+    )
+
+
+def test_invalid_arguments_raise():
+    rng = np.random.default_rng(0)
+    with pytest.raises(ValueError):
+        bootstrap_indices(10, 2, 5, 0, rng)
+    with pytest.raises(ValueError):
+        bootstrap_indices(10, 2, 5, 3, rng, "circular")
+
+
+def test_cli_writes_bootstrap_summary(tmp_path):
+    csv = tmp_path / "prices.csv"
+    pd.DataFrame({"date": np.arange(len(PRICES)).astype(str), "price": PRICES}).to_csv(
+        csv, index=False
+    )
+    args = Namespace(
+        csv=str(csv),
+        window=["12", "24"],
+        leverage=[1.0, 3.0],
+        datecol="date",
+        pricecol="price",
+        out=str(tmp_path),
+        freq="month",
+        bootstrap=500,
+        block_size=6,
+        seed=3,
+    )
+    _, _, _, stats_df = main(args)
+
+    (stats_path,) = tmp_path.glob("bootstrap_summary_statistics_*.csv")
+    (bust_path,) = tmp_path.glob("bootstrap_bust_summary_*.csv")
+    boot = pd.read_csv(stats_path)
+    assert list(boot.columns) == list(stats_df.columns)
+    assert boot["window"].tolist() == [12, 12, 24, 24]
+    assert boot["portfolio"].tolist() == ["portfolio_1.0x", "portfolio_3.0x"] * 2
+
+    grid = simulate_bootstrap(PRICES, [1.0, 3.0], 24, 500, block_size=6, seed=3)
+    row = boot[(boot["window"] == 24) & (boot["portfolio"] == "portfolio_3.0x")].iloc[0]
+    assert row["mean_total_return"] == pytest.approx(grid["total_return"][1].mean())
+    assert pd.read_csv(bust_path)["bust_ratio"].tolist()[3] == pytest.approx(
+        grid["bust"][1].mean()
+    )
+
+
+def test_accumulated_bootstrap_matches_materialised_paths():
+    from portfolio.montecarlo import bootstrap_accumulators
+    from portfolio.report import accumulated_statistics, summary_statistics
+
+    leverages = [1.0, 3.0]
+    kwargs = dict(window_size=24, n_paths=600, seed=4, batch_paths=128)
+    grid = simulate_bootstrap(PRICES, leverages, **kwargs)
+    cols = ["portfolio_1x", "portfolio_3x"]
+
+    # two workers with their own seeds, merged afterwards
+    acc, busts = bootstrap_accumulators(PRICES, leverages, **kwargs, columns=cols)
+    more, more_busts = bootstrap_accumulators(
+        PRICES, leverages, **dict(kwargs, seed=5), columns=cols
+    )
+    for col in cols:
+        for metric in acc[col]:
+            acc[col][metric].merge(more[col][metric])
+    busts += more_busts
+
+    second = simulate_bootstrap(PRICES, leverages, **dict(kwargs, seed=5))
+    both = {k: np.concatenate([grid[k], second[k]], axis=1) for k in grid}
+    bust_df = pd.DataFrame({"leverage": leverages, "bust_ratio": busts / 1200})
+    np.testing.assert_allclose(bust_df["bust_ratio"], both["bust"].mean(axis=1))
+
+    def frame(metric):
+        return pd.DataFrame({"a": 0, "b": 0, **dict(zip(cols, both[metric]))})
+
+    def by_col(metric):
+        return dict(zip(cols, both[metric]))
+
+    expected = summary_statistics(
+        frame("total_return"),
+        frame("cagr"),
+        bust_df,
+        by_col("sharpe"),
+        by_col("volatility"),
+        by_col("sortino"),
+        by_col("max_drawdown"),
+        by_col("drawdown_duration"),
+    )
+    # 1200 paths fit in the default sketch, so even the IQR is exact
+    got = accumulated_statistics(None, bust_df, acc)
+    pd.testing.assert_frame_equal(got, expected, rtol=1e-10)
@@ -0,0 +1,86 @@
+from argparse import Namespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from matplotlib import cbook
+from matplotlib.figure import Figure
+
+from portfolio.cli import main
+from portfolio.report import box_statistics, boxplot_returns
+
+
+def _returns():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "portfolio_1.0x": rng.normal(0.05, 0.1, 200),
+            "portfolio_2.0x": rng.normal(0.1, 0.3, 200),
+        }
+    )
+
+
+def test_box_statistics_match_matplotlib():
+    df = _returns()
+    cols = list(df.columns)
+    ours = box_statistics(df, cols)
+    theirs = cbook.boxplot_stats([df[col].to_numpy() for col in cols], labels=cols)
+    for mine, ref in zip(ours, theirs):
+        for key in ("med", "q1", "q3", "whislo", "whishi", "mean"):
+            assert mine[key] == pytest.approx(ref[key])
+        np.testing.assert_allclose(np.sort(mine["fliers"]), np.sort(ref["fliers"]))
+        assert mine["label"] == ref["label"]
+
+
+def test_box_statistics_leave_frame_untouched():
+    df = _returns()
+    before = df.copy()
+    box_statistics(df, list(df.columns))
+    pd.testing.assert_frame_equal(df, before)
+
+
+def test_boxplot_from_precomputed_stats():
+    df = _returns()
+    cols = list(df.columns)
+    fig = boxplot_returns(df, cols, stats=box_statistics(df, cols))
+    assert isinstance(fig, Figure)
+    assert [t.get_text() for t in fig.axes[0].get_xticklabels()] == cols
+
+
+def test_headless_plot_saves_without_showing(tmp_path, monkeypatch):
+    df = pd.DataFrame(
+        {
+            "date": pd.date_range("2024-01-01", periods=6, freq="D"),
+            "price": [100.0, 101.0, 99.0, 103.0, 104.0, 102.0],
+        }
+    )
+    csv = tmp_path / "prices.csv"
+    df.to_csv(csv, index=False)
+
+    def fail_show(*args, **kwargs):
+        raise AssertionError("headless runs must not show figures")
+
+    monkeypatch.setattr(Figure, "show", fail_show)
+    monkeypatch.setattr("matplotlib.pyplot.show", fail_show)
+    monkeypatch.setattr(
+        "portfolio.cli.name_run_output",
+        lambda name, out, lev, ftype: str(tmp_path / f"{name}.{ftype}"),
+    )
+    args = Namespace(
+        csv=str(csv),
+        window=[2, 3],
+        leverage=[1.0, 2.0],
+        datecol="date",
+        pricecol="price",
+        dividendcol=None,
+        underlying=False,
+        out=str(tmp_path),
+        freq="day",
+        plot=True,
+        headless=True,
+    )
+    main(args)
+
+    for w in (2, 3):
+        for name in ("returns", "returns_log", "returns_annualized"):
+            assert (tmp_path / f"{name}_w{w}.png").stat().st_size > 0
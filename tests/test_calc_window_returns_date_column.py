@@ -17,5 +17,29 @@ def test_calc_window_returns_custom_date_column():
         portfolio_columns=["portfolio1"],
     )
 
-    expected_dates = [["t1", "t2"], ["t2", "t3"]]
-    assert out["window_dates"].tolist() == expected_dates
+    assert out["start_timestamp"].tolist() == ["t1", "t2"]
+    assert out["end_timestamp"].tolist() == ["t2", "t3"]
+
+
+def test_calc_window_returns_keeps_date_dtype():
+    df = pd.DataFrame(
+        {
+            "date": pd.date_range("2020-01-01", periods=5, freq="D"),
+            "portfolio1": [1.0, 2.0, 4.0, 8.0, 16.0],
+            "portfolio2": [16.0, 8.0, 4.0, 2.0, 1.0],
+        },
+        index=[10, 11, 12, 13, 14],
+    )
+
+    out = calc_window_returns(
+        df,
+        window_size=2,
+        date_column="date",
+        portfolio_columns=["portfolio1", "portfolio2"],
+    )
+
+    assert out["start_date"].dtype == df["date"].dtype
+    assert out["end_date"].tolist() == df["date"].iloc[2:].tolist()
+    assert out["portfolio1_returns"].tolist() == [4.0, 4.0, 4.0]
+    assert out["portfolio2_returns"].tolist() == [0.25, 0.25, 0.25]
+    assert out.index.tolist() == [0, 1, 2]
@@ -13,13 +13,13 @@ def test_calc_window_returns_various_portfolio_columns():
         }
     )
 
-    expected_dates = [["d1", "d2"], ["d2", "d3"]]
+    expected_dates = {"start_date": ["d1", "d2"], "end_date": ["d2", "d3"]}
 
-    # portfolio_columns=None -> only window_dates
+    # portfolio_columns=None -> only the start/end date columns
     out_none = calc_window_returns(
         df, window_size=1, date_column="date", portfolio_columns=None
     )
-    expected_none = pd.DataFrame({"window_dates": expected_dates})
+    expected_none = pd.DataFrame(expected_dates)
     assert_frame_equal(out_none, expected_none, check_dtype=False)
 
     # single portfolio column
@@ -28,7 +28,7 @@ def test_calc_window_returns_various_portfolio_columns():
     )
     expected_one = pd.DataFrame(
         {
-            "window_dates": expected_dates,
+            **expected_dates,
             "port1_returns": [2.0, 2.0],
         }
     )
@@ -43,7 +43,7 @@ def test_calc_window_returns_various_portfolio_columns():
     )
     expected_two = pd.DataFrame(
         {
-            "window_dates": expected_dates,
+            **expected_dates,
             "port1_returns": [2.0, 2.0],
             "port2_returns": [0.5, 0.5],
         }
@@ -20,7 +20,8 @@ def test_calc_window_returns_multiple_window_sizes():
     )
     expected1 = pd.DataFrame(
         {
-            "window_dates": [["day1", "day2"], ["day2", "day3"]],
+            "start_date": ["day1", "day2"],
+            "end_date": ["day2", "day3"],
             "portfolio1_returns": [2.0, 2.0],
         }
     )
@@ -34,7 +35,8 @@ def test_calc_window_returns_multiple_window_sizes():
     )
     expected2 = pd.DataFrame(
         {
-            "window_dates": [["day1", "day3"]],
+            "start_date": ["day1"],
+            "end_date": ["day3"],
             "portfolio1_returns": [4.0],
         }
     )
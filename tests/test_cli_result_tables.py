@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+from argparse import Namespace
+
+from portfolio.cli import main
+
+
+def test_one_row_per_window_with_repeated_labels(tmp_path):
+    # labels repeat, so rows must be keyed by window position, not by label
+    df = pd.DataFrame(
+        {
+            "date": ["FY24", "FY24", "FY24", "FY25", "FY25"],
+            "price": [100.0, 102.0, 99.0, 105.0, 107.0],
+        }
+    )
+    csv = tmp_path / "prices.csv"
+    df.to_csv(csv, index=False)
+
+    args = Namespace(
+        csv=str(csv),
+        window=1,
+        leverage=[1.0, 2.0],
+        datecol="date",
+        pricecol="price",
+        out=str(tmp_path),
+        freq="year",
+        underlying=True,
+    )
+
+    returns_df, ann_df, _, _ = main(args)
+
+    assert len(returns_df) == len(ann_df) == 4
+    assert returns_df["start_date"].tolist() == ["FY24", "FY24", "FY24", "FY25"]
+    assert returns_df["end_date"].tolist() == ["FY24", "FY24", "FY25", "FY25"]
+    for col in ["portfolio_1.0x", "portfolio_2.0x", "underlying"]:
+        assert returns_df[col].dtype == np.float64
+        assert ann_df[col].dtype == np.float64
+
+    prices = df["price"].to_numpy()
+    np.testing.assert_allclose(
+        returns_df["portfolio_2.0x"], 2 * (prices[1:] / prices[:-1] - 1)
+    )
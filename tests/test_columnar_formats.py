@@ -0,0 +1,75 @@
+from argparse import Namespace
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from portfolio.cli import main
+from portfolio.formats import detect_format, read_table
+
+pytest.importorskip("pyarrow")
+
+
+def _frame(n=30):
+    rng = np.random.default_rng(4)
+    return pd.DataFrame(
+        {
+            "date": pd.date_range("2010-01-01", periods=n, freq="MS"),
+            "price": 100 * np.cumprod(1 + rng.normal(0.01, 0.03, n)),
+            "div": 0.5,
+            "unused": "x",
+        }
+    )
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".feather"])
+def test_read_projects_columns_and_keeps_dtypes(tmp_path, suffix):
+    path = tmp_path / f"prices{suffix}"
+    df = _frame()
+    if suffix == ".parquet":
+        df.to_parquet(path)
+    else:
+        df.to_feather(path)
+    data = read_table(str(path), ["date", "price"])
+    assert list(data.columns) == ["date", "price"]
+    assert data["date"].dtype.kind == "M"
+    assert data["price"].dtype == np.float64
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "feather"])
+def test_cli_round_trip_matches_csv(tmp_path, fmt):
+    df = _frame()
+    parquet = tmp_path / "prices.parquet"
+    df.to_parquet(parquet)
+    csv = tmp_path / "prices.csv"
+    df.assign(date=df["date"].dt.strftime("%Y-%m-%d")).to_csv(csv, index=False)
+
+    def args(path, out, **kwargs):
+        out.mkdir()
+        return Namespace(
+            csv=str(path),
+            window=12,
+            leverage=[1.0, 2.0],
+            datecol="date",
+            pricecol="price",
+            dividendcol="div",
+            out=str(out),
+            freq="month",
+            **kwargs,
+        )
+
+    typed = main(args(parquet, tmp_path / "typed", format=fmt))
+    text = main(args(csv, tmp_path / "text"))
+    assert typed[0]["start_date"].dtype.kind == "M"
+    pdt.assert_frame_equal(
+        typed[0].drop(columns=["start_date", "end_date"]),
+        text[0].drop(columns=["start_date", "end_date"]),
+    )
+
+    (returns_file,) = (tmp_path / "typed").glob(f"returns_*.{fmt}")
+    assert detect_format(returns_file) == fmt
+    written = read_table(str(returns_file), list(typed[0].columns))
+    pdt.assert_frame_equal(written, typed[0], check_dtype=False)
+    assert written["start_date"].dtype.kind == "M"
+    assert written["portfolio_2.0x"].dtype == np.float64
@@ -27,7 +27,8 @@ def test_calc_window_returns_doctest_example():
     )
     expected = pd.DataFrame(
         {
-            "window_dates": [["day1", "day2"], ["day2", "day3"]],
+            "start_date": ["day1", "day2"],
+            "end_date": ["day2", "day3"],
             "portfolio1_returns": [2.0, 10.0],
             "portfolio2_returns": [0.5, 0.1],
         }
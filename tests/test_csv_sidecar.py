@@ -0,0 +1,85 @@
+import os
+from argparse import Namespace
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+import portfolio.sidecar as sidecar
+from portfolio.cli import main
+from portfolio.sidecar import read_csv_cached, sidecar_dir
+
+
+@pytest.fixture
+def csv(tmp_path):
+    path = tmp_path / "prices.csv"
+    pd.DataFrame(
+        {
+            "date": ["1990-01", "1990-02", "1990-03", None],
+            "price": [100.0, 101.5, 99.0, 104.0],
+            "div": [0.1, 0.1, 0.2, 0.2],
+            "other": ["a", "b", "c", "d"],
+        }
+    ).to_csv(path, index=False)
+    return str(path)
+
+
+def _no_parse(*args, **kwargs):
+    raise AssertionError("CSV was parsed again")
+
+
+def test_sidecar_hit_skips_parsing(csv, monkeypatch):
+    cols = ["date", "price", "div"]
+    first = read_csv_cached(csv, cols, {"price": "float64", "div": "float64"})
+    assert os.path.exists(os.path.join(sidecar_dir(csv), "meta.json"))
+    expected = pd.read_csv(csv, usecols=cols)
+    pdt.assert_frame_equal(first, expected)
+
+    monkeypatch.setattr(sidecar.pd, "read_csv", _no_parse)
+    again = read_csv_cached(csv, cols, {"price": "float64", "div": "float64"})
+    pdt.assert_frame_equal(again, expected)
+
+    # a touched but unchanged file is recognised by its hash
+    os.utime(csv, ns=(1, 1))
+    pdt.assert_frame_equal(read_csv_cached(csv, cols, {"price": "float64", "div": "float64"}), expected)
+
+
+def test_changed_file_or_columns_reparse(csv):
+    read_csv_cached(csv, ["date", "price"])
+    df = pd.read_csv(csv)
+    df.loc[0, "price"] = 1.0
+    df.to_csv(csv, index=False)
+    assert read_csv_cached(csv, ["date", "price"])["price"].iloc[0] == 1.0
+    assert list(read_csv_cached(csv, ["price", "div"]).columns) == ["price", "div"]
+
+
+def test_cli_with_sidecar_matches_plain_read(tmp_path):
+    rng = np.random.default_rng(8)
+    path = tmp_path / "series.csv"
+    pd.DataFrame(
+        {
+            "date": pd.date_range("2000-01-01", periods=40, freq="MS").strftime("%Y-%m"),
+            "price": 100 * np.cumprod(1 + rng.normal(0.01, 0.04, 40)),
+        }
+    ).to_csv(path, index=False)
+
+    def run(**kwargs):
+        return main(
+            Namespace(
+                csv=str(path),
+                window=12,
+                leverage=[1.0, 3.0],
+                datecol="date",
+                pricecol="price",
+                out=str(tmp_path),
+                freq="month",
+                **kwargs,
+            )
+        )
+
+    plain = run()
+    run(sidecar=True)
+    cached = run(sidecar=True)
+    for a, b in zip(plain, cached):
+        pdt.assert_frame_equal(a, b)
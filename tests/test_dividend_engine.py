@@ -0,0 +1,130 @@
+from argparse import Namespace
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from portfolio.cli import main
+from portfolio.core import batched_leveraged_returns, total_return_prices
+from portfolio.jit import dividend_window_growth
+from portfolio.parallel import simulate_grid
+
+
+def _series(n=240, seed=5):
+    rng = np.random.default_rng(seed)
+    prices = 100 * np.cumprod(1 + rng.normal(0.004, 0.06, n))
+    return prices, rng.uniform(0.1, 0.4, n)
+
+
+def _naive_leveraged(prices, dividends, leverage, window):
+    """Window returns of a daily-rebalanced leveraged total-return position."""
+    out = []
+    for s in range(len(prices) - window):
+        value = 1.0
+        for i in range(s, s + window):
+            value *= 1 + leverage * ((prices[i + 1] + dividends[i + 1]) / prices[i] - 1)
+            if value <= 0:
+                value = 1.0
+                break
+        out.append(value - 1)
+    return np.array(out)
+
+
+def test_total_return_prefix_matches_window_loop():
+    prices, divs = _series()
+    total, _, _ = batched_leveraged_returns(total_return_prices(prices, divs), [1.0], 36)
+    np.testing.assert_allclose(
+        total[0] + 1, dividend_window_growth(prices, divs, 36), rtol=1e-12
+    )
+
+
+@pytest.mark.parametrize("leverage", [1.0, 2.5, -1.0])
+def test_leveraged_total_return_windows(leverage):
+    prices, divs = _series(120)
+    total, _, _ = batched_leveraged_returns(total_return_prices(prices, divs), [leverage], 24)
+    np.testing.assert_allclose(
+        total[0], _naive_leveraged(prices, divs, leverage, 24), rtol=1e-10, atol=1e-12
+    )
+
+
+def test_busted_total_return_windows_report_zero():
+    prices, divs = _series(120)
+    grid = simulate_grid(total_return_prices(prices, divs), [12.0], 24)
+    assert grid["bust"].any()
+    assert (grid["total_return"][grid["bust"]] == 0).all()
+    assert (grid["sharpe"][grid["bust"]] == 0).all()
+
+
+def _run(tmp_path, name, **kwargs):
+    prices, divs = _series(90)
+    csv = tmp_path / "prices.csv"
+    pd.DataFrame(
+        {
+            "date": pd.date_range("2000-01-01", periods=90, freq="MS").strftime("%Y-%m"),
+            "price": prices,
+            "div": divs,
+        }
+    ).to_csv(csv, index=False)
+    out = tmp_path / name
+    out.mkdir()
+    kwargs.setdefault("leverage", [1.0])
+    kwargs.setdefault("dividend_leverage", [1.0, 2.0])
+    args = Namespace(
+        csv=str(csv),
+        window=12,
+        datecol="date",
+        pricecol="price",
+        dividendcol="div",
+        out=str(out),
+        freq="month",
+        **kwargs,
+    )
+    return prices, divs, out, main(args)
+
+
+def test_cli_leveraged_dividend_columns(tmp_path):
+    prices, divs, _, (returns_df, _, _, stats_df) = _run(tmp_path, "full")
+    assert list(returns_df.columns[-2:]) == ["1x_dividend", "2x_dividend"]
+    np.testing.assert_allclose(
+        returns_df["1x_dividend"], dividend_window_growth(prices, divs, 12) - 1, rtol=1e-12
+    )
+    np.testing.assert_allclose(
+        returns_df["2x_dividend"], _naive_leveraged(prices, divs, 2.0, 12), rtol=1e-10
+    )
+    assert {"1x_dividend", "2x_dividend"} <= set(stats_df["portfolio"])
+
+
+def test_streamed_dividend_columns_match(tmp_path):
+    *_, full = _run(tmp_path, "full")
+    _, _, out, streamed = _run(tmp_path, "streamed", stream_chunk=7)
+    (path,) = out.glob("returns_lev_*.csv")
+    written = pd.read_csv(path)
+    for col in ("1x_dividend", "2x_dividend"):
+        np.testing.assert_allclose(written[col], full[0][col], rtol=1e-12)
+    pdt.assert_frame_equal(streamed[3], full[3], rtol=1e-9)
+
+
+@pytest.mark.parametrize("mode", [{}, {"stream_chunk": 7}, {"state": "state"}])
+def test_dividend_busts_are_counted_per_column(tmp_path, mode):
+    if "state" in mode:
+        mode = {"state": str(tmp_path / "state")}
+    kwargs = dict(leverage=[1.0, 2.0], dividend_leverage=[1.0, 12.0], **mode)
+    prices, divs, out, (_, _, summary_df, stats_df) = _run(tmp_path, "run", **kwargs)
+    grid = simulate_grid(total_return_prices(prices, divs), [12.0], 12)
+    expected = grid["bust"].mean()
+    assert expected > 0.5
+
+    assert summary_df["portfolio"].tolist() == [
+        "portfolio_1.0x",
+        "portfolio_2.0x",
+        "1x_dividend",
+        "12x_dividend",
+    ]
+    assert summary_df["leverage"].tolist() == [1.0, 2.0, 1.0, 12.0]
+    by_col = dict(zip(stats_df["portfolio"], stats_df["bust_ratio"]))
+    assert by_col["12x_dividend"] == pytest.approx(expected)
+    assert summary_df["bust_ratio"].iloc[3] == pytest.approx(expected)
+    assert by_col["portfolio_2.0x"] == by_col["1x_dividend"] == 0.0
+    (path,) = out.glob("bust_summary_lev_*.csv")
+    pdt.assert_frame_equal(pd.read_csv(path), summary_df)
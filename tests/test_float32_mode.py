@@ -0,0 +1,100 @@
+from argparse import Namespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from portfolio.cli import main
+from portfolio.core import (
+    FLOAT32_RTOL,
+    batched_leveraged_returns,
+    simulate_log_window,
+    simulate_window,
+)
+from portfolio.parallel import GRID_METRICS, simulate_grid
+
+LEVERAGES = [-1.0, 0.5, 1.0, 2.0, 3.0, 8.0]
+
+
+def _prices(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    return 100.0 * np.cumprod(1.0 + rng.normal(0.005, 0.04, n))
+
+
+def _within_bound(compact, full):
+    assert compact.dtype == np.float32
+    err = np.abs(compact.astype(np.float64) - full)
+    assert (err <= FLOAT32_RTOL * np.abs(full)).all()
+
+
+def test_batched_returns_float32_within_bound():
+    prices = _prices()
+    full = batched_leveraged_returns(prices, LEVERAGES, 240)
+    compact = batched_leveraged_returns(prices, LEVERAGES, 240, dtype=np.float32)
+    _within_bound(compact[0], full[0])
+    _within_bound(compact[1], full[1])
+    np.testing.assert_array_equal(compact[2], full[2])
+    assert full[2].any()
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_grid_float32_within_bound(jobs):
+    prices = _prices(600)
+    full = simulate_grid(prices, LEVERAGES, [12, 120])
+    compact = simulate_grid(prices, LEVERAGES, [12, 120], dtype=np.float32, jobs=jobs)
+    for w in (12, 120):
+        for name, kind in GRID_METRICS.items():
+            if kind == np.float64:
+                _within_bound(compact[w][name], full[w][name])
+            else:
+                np.testing.assert_array_equal(compact[w][name], full[w][name])
+
+
+def test_log_window_matches_linear_path():
+    prices = _prices(300)
+    linear = simulate_window(prices, 2.0, 1000)
+    np.testing.assert_allclose(simulate_log_window(prices, 2.0, 1000), np.log(linear), rtol=1e-12)
+
+
+def test_log_window_does_not_overflow():
+    # 10x on +50% per period grows by 6 ** 600, beyond float64 in linear space
+    prices = 100.0 * 1.5 ** np.arange(601)
+    with np.errstate(over="ignore"):
+        assert np.isinf(simulate_window(prices, 10.0)[-1])
+    log_path = simulate_log_window(prices, 10.0)
+    assert np.isfinite(log_path).all()
+    assert log_path[-1] == pytest.approx(np.log(1000) + 600 * np.log(6.0))
+
+
+def test_cli_float32_tables(tmp_path):
+    df = pd.DataFrame(
+        {
+            "date": pd.date_range("2000-01-01", periods=400, freq="D").strftime("%Y-%m-%d"),
+            "price": _prices(400, seed=1),
+        }
+    )
+    csv = tmp_path / "prices.csv"
+    df.to_csv(csv, index=False)
+
+    def run(dtype):
+        out = tmp_path / dtype
+        out.mkdir()
+        args = Namespace(
+            csv=str(csv),
+            window=36,
+            leverage=[1.0, 3.0],
+            datecol="date",
+            pricecol="price",
+            dividendcol=None,
+            underlying=True,
+            out=str(out),
+            freq="month",
+            dtype=dtype,
+        )
+        return main(args)
+
+    full = run("float64")
+    compact = run("float32")
+    for col in ("portfolio_1.0x", "portfolio_3.0x", "underlying"):
+        _within_bound(compact[0][col].to_numpy(), full[0][col].to_numpy())
+        _within_bound(compact[1][col].to_numpy(), full[1][col].to_numpy())
@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+
+import portfolio
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(portfolio.__file__)))
+
+
+def _fresh_modules(code):
+    """Module names loaded by running ``code`` in a fresh interpreter."""
+    env = dict(os.environ, PYTHONPATH=SRC, MPLBACKEND="Agg")
+    script = code + "\nimport sys\nprint('\\n'.join(sys.modules))"
+    out = subprocess.run(
+        [sys.executable, "-c", script],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return set(out.stdout.split())
+
+
+def test_package_import_loads_no_submodules():
+    loaded = _fresh_modules("import portfolio")
+    assert not any(name.startswith("portfolio.") for name in loaded)
+    assert "pandas" not in loaded
+
+
+def test_lazy_names_resolve_to_submodule_objects():
+    from portfolio import core, report
+
+    assert portfolio.simulate_portfolio is core.simulate_portfolio
+    assert portfolio.boxplot_returns is report.boxplot_returns
+    assert "rolling_moments" in dir(portfolio)
+
+
+def test_cli_run_without_plot_skips_matplotlib_and_numba(tmp_path):
+    code = f"""
+from argparse import Namespace
+import numpy as np, pandas as pd
+from portfolio.cli import main
+csv = {str(tmp_path / "prices.csv")!r}
+pd.DataFrame({{"date": [str(i) for i in range(30)],
+               "price": 100 * np.cumprod(np.full(30, 1.01))}}).to_csv(csv, index=False)
+main(Namespace(csv=csv, window=12, leverage=[1.0, 2.0], datecol="date",
+               pricecol="price", out={str(tmp_path)!r}, freq="month"))
+"""
+    loaded = _fresh_modules(code)
+    assert "portfolio.cli" in loaded
+    assert "matplotlib" not in loaded
+    assert "numba" not in loaded
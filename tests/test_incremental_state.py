@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+from argparse import Namespace
+
+import portfolio.cli as cli
+from portfolio.cli import main
+
+
+def _frame(n_rows, seed=11):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "date": pd.date_range("1990-01-01", periods=n_rows, freq="MS").strftime("%Y-%m"),
+            "price": 100 * np.cumprod(1 + rng.normal(0.004, 0.06, n_rows)),
+            "div": rng.uniform(0.1, 0.4, n_rows),
+        }
+    )
+
+
+def _args(csv, out, state, window):
+    return Namespace(
+        csv=str(csv),
+        window=window,
+        leverage=[1.0, 2.5, 12.0],
+        datecol="date",
+        pricecol="price",
+        dividendcol="div",
+        underlying=True,
+        out=str(out),
+        freq="month",
+        state=str(state),
+    )
+
+
+@pytest.mark.parametrize("window", [12, ["6", "24"]])
+def test_append_matches_full_run(tmp_path, monkeypatch, window):
+    full = _frame(90)
+    csv = tmp_path / "prices.csv"
+    state = tmp_path / "state"
+    full.iloc[:60].to_csv(csv, index=False)
+    main(_args(csv, tmp_path, state, window))
+
+    full.to_csv(csv, index=False)
+
+    def no_full_run(*args, **kwargs):
+        raise AssertionError("appended rows should not rerun the whole grid")
+
+    with monkeypatch.context() as m:
+        m.setattr(cli, "simulate_grid", no_full_run)
+        appended = main(_args(csv, tmp_path, state, window))
+
+    fresh = main(_args(csv, tmp_path, tmp_path / "fresh", window))
+    returns_inc, ann_inc, summary_inc, stats_inc = appended
+    returns_new, ann_new, summary_new, stats_new = fresh
+    pdt.assert_frame_equal(returns_inc, returns_new, rtol=1e-12)
+    pdt.assert_frame_equal(ann_inc, ann_new, rtol=1e-12)
+    pdt.assert_frame_equal(summary_inc, summary_new)
+    pdt.assert_frame_equal(stats_inc, stats_new, rtol=1e-9)
+
+
+def test_unchanged_input_reuses_state(tmp_path, monkeypatch):
+    csv = tmp_path / "prices.csv"
+    _frame(50).to_csv(csv, index=False)
+    first = main(_args(csv, tmp_path, tmp_path / "state", 12))
+
+    monkeypatch.setattr(cli, "simulate_grid", None)
+    again = main(_args(csv, tmp_path, tmp_path / "state", 12))
+    for a, b in zip(first, again):
+        pdt.assert_frame_equal(a, b, rtol=1e-12)
+
+
+def test_rewritten_history_recomputes(tmp_path):
+    csv = tmp_path / "prices.csv"
+    state = tmp_path / "state"
+    _frame(50).to_csv(csv, index=False)
+    main(_args(csv, tmp_path, state, 12))
+
+    other = _frame(60, seed=3)
+    other.to_csv(csv, index=False)
+    rerun = main(_args(csv, tmp_path, state, 12))
+    fresh = main(_args(csv, tmp_path, tmp_path / "fresh", 12))
+    for a, b in zip(rerun, fresh):
+        pdt.assert_frame_equal(a, b)
+
+
+def test_changed_parameters_ignore_state(tmp_path):
+    csv = tmp_path / "prices.csv"
+    state = tmp_path / "state"
+    _frame(50).to_csv(csv, index=False)
+    main(_args(csv, tmp_path, state, 12))
+    returns_df = main(_args(csv, tmp_path, state, 24))[0]
+    assert len(returns_df) == 50 - 24
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import portfolio.jit as jit
+from portfolio.core import simulate_window_dividend
+from portfolio.jit import get_kernels
+
+
+PRICES = np.array([100.0, 104.0, 97.0, 110.0, 108.0, 115.0])
+DIVS = np.array([0.0, 0.5, 0.5, 0.6, 0.6, 0.7])
+
+
+def test_dividend_window_growth_matches_paths():
+    kernels = get_kernels("numpy")
+    growth = kernels.dividend_window_growth(PRICES, DIVS, 3)
+    expected = [
+        simulate_window_dividend(pd.Series(PRICES[s : s + 4]), pd.Series(DIVS[s : s + 4]))[-1]
+        for s in range(len(PRICES) - 3)
+    ]
+    np.testing.assert_array_equal(growth, expected)
+
+
+def test_numba_falls_back_without_numba(monkeypatch):
+    monkeypatch.setattr(jit, "numba", None)
+    get_kernels.cache_clear()
+    try:
+        with pytest.warns(RuntimeWarning):
+            kernels = get_kernels("numba")
+        assert kernels.rebalance_path is jit.rebalance_path
+    finally:
+        get_kernels.cache_clear()
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        get_kernels("fortran")
+
+
+def test_numba_kernels_match_numpy():
+    pytest.importorskip("numba")
+    fast, ref = get_kernels("numba"), get_kernels("numpy")
+    np.testing.assert_allclose(
+        fast.leveraged_path(PRICES, 2.5, 1000.0), ref.leveraged_path(PRICES, 2.5, 1000.0)
+    )
+    np.testing.assert_allclose(
+        fast.rebalance_path(PRICES, 2.0, 2), ref.rebalance_path(PRICES, 2.0, 2)
+    )
+    np.testing.assert_allclose(
+        fast.dividend_window_growth(PRICES, DIVS, 2),
+        ref.dividend_window_growth(PRICES, DIVS, 2),
+    )
@@ -80,7 +80,11 @@ def build_expected_frames(df_prices, window_size, leverage, datecol, pricecol, f
     returns_df = pd.DataFrame(returns_rows)
     annual_df = pd.DataFrame(ann_rows)
     summary_df = pd.DataFrame(
-        {"leverage": [leverage], "bust_ratio": [busts / len(windows)]}
+        {
+            "portfolio": [f"portfolio_{leverage}x"],
+            "leverage": [leverage],
+            "bust_ratio": [busts / len(windows)],
+        }
     )
     # ensure identical column order
     ordered_cols = [start_col, end_col, f"portfolio_{leverage}x"]
@@ -44,6 +44,7 @@ def test_manual_returns_single_window(tmp_path):
 
     expected_summary = pd.DataFrame(
         {
+            "portfolio": ["portfolio_1x", "portfolio_2x", "portfolio_10x"],
             "leverage": [1, 2, 10],
             "bust_ratio": [0.0, 0.0, 1.0],
         }
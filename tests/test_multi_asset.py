@@ -0,0 +1,106 @@
+from argparse import Namespace
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+import portfolio.parallel as parallel
+from portfolio.cli import main
+from portfolio.parallel import simulate_grid
+
+ASSETS = ["stocks", "bonds", "intl"]
+
+
+@pytest.fixture
+def csv(tmp_path):
+    rng = np.random.default_rng(8)
+    n = 80
+    frame = {"date": pd.date_range("2001-01-01", periods=n, freq="MS").strftime("%Y-%m")}
+    for vol, col in zip((0.05, 0.01, 0.07), ASSETS):
+        frame[col] = 100 * np.cumprod(1 + rng.normal(0.004, vol, n))
+    path = tmp_path / "prices.csv"
+    pd.DataFrame(frame).to_csv(path, index=False)
+    return path
+
+
+def _args(csv, out, pricecol, **kwargs):
+    out.mkdir()
+    return Namespace(
+        csv=str(csv),
+        window=["12", "24"],
+        leverage=[1.0, 3.0],
+        datecol="date",
+        pricecol=pricecol,
+        underlying=True,
+        out=str(out),
+        freq="month",
+        **kwargs,
+    )
+
+
+def test_stacked_grid_matches_each_asset():
+    rng = np.random.default_rng(3)
+    prices = 100 * np.cumprod(1 + rng.normal(0.003, 0.05, (3, 90)), axis=1)
+    stacked = simulate_grid(prices, [0.5, 2.0, 6.0], [6, 24])
+    for a, row in enumerate(prices):
+        single = simulate_grid(row, [0.5, 2.0, 6.0], [6, 24])
+        for w in (6, 24):
+            for name, arr in single[w].items():
+                np.testing.assert_array_equal(stacked[w][name][a], arr)
+
+
+def test_pooled_assets_share_one_pool(monkeypatch):
+    rng = np.random.default_rng(4)
+    prices = 100 * np.cumprod(1 + rng.normal(0.003, 0.05, (3, 90)), axis=1)
+    serial = simulate_grid(prices, [0.5, 2.0, 6.0], [6, 24])
+
+    pools = []
+    real_pool = parallel.ProcessPoolExecutor
+
+    def counting_pool(*args, **kwargs):
+        pools.append(kwargs["max_workers"])
+        return real_pool(*args, **kwargs)
+
+    monkeypatch.setattr(parallel, "ProcessPoolExecutor", counting_pool)
+    pooled = simulate_grid(prices, [0.5, 2.0, 6.0], [6, 24], jobs=2)
+    assert pools == [2]
+    for w in (6, 24):
+        assert pooled[w]["total_return"].shape == (3, 3, 90 - w)
+        for name, arr in serial[w].items():
+            np.testing.assert_array_equal(pooled[w][name], arr)
+
+
+def test_multi_asset_run_matches_single_runs(tmp_path, csv):
+    returns, annualised, summary_df, stats_df = main(_args(csv, tmp_path / "all", ASSETS))
+    assert list(summary_df["asset"].unique()) == ASSETS
+    assert list(stats_df["asset"].unique()) == ASSETS
+
+    for col in ASSETS:
+        single = main(_args(csv, tmp_path / col, col))
+        pdt.assert_frame_equal(returns[col], single[0])
+        pdt.assert_frame_equal(annualised[col], single[1])
+        for combined, part in ((summary_df, single[2]), (stats_df, single[3])):
+            rows = combined[combined["asset"] == col].drop(columns="asset")
+            pdt.assert_frame_equal(rows.reset_index(drop=True), part)
+
+
+def test_multi_asset_output_files(tmp_path, csv):
+    out = tmp_path / "out"
+    main(_args(csv, out, ASSETS))
+    names = {path.name.split("_lev_")[0] for path in out.glob("*.csv")}
+    for col in ASSETS:
+        assert {f"{col}_returns", f"{col}_ann_returns", f"{col}_summary_statistics"} <= names
+    assert {"bust_summary", "summary_statistics"} <= names
+
+
+def test_streamed_multi_asset_summary_matches(tmp_path, csv):
+    full = main(_args(csv, tmp_path / "full", ASSETS))
+    streamed = main(_args(csv, tmp_path / "streamed", ASSETS, stream_chunk=9))
+    pdt.assert_frame_equal(streamed[2], full[2])
+    pdt.assert_frame_equal(streamed[3], full[3], rtol=1e-9)
+
+
+def test_dividends_need_one_price_column(tmp_path, csv):
+    with pytest.raises(ValueError, match="single --pricecol"):
+        main(_args(csv, tmp_path / "out", ASSETS, dividendcol="bonds"))
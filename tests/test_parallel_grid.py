@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+from argparse import Namespace
+
+from portfolio.cli import main
+from portfolio.parallel import (
+    GRID_METRICS,
+    _leverage_chunks,
+    leveraged_block,
+    simulate_grid,
+)
+
+
+def _prices(n=300, seed=3):
+    rng = np.random.default_rng(seed)
+    return 100 * np.cumprod(1 + rng.normal(0.003, 0.04, n))
+
+
+def test_window_ranges_are_bit_identical():
+    prices = _prices()
+    leverages = [0.5, 1.0, 2.5, 6.0]
+    whole = leveraged_block(prices, leverages, 40, 12)
+    first = leveraged_block(prices, leverages, 40, 12, 0, 97)
+    second = leveraged_block(prices, leverages, 40, 12, 97, None)
+    for name in GRID_METRICS:
+        np.testing.assert_array_equal(
+            whole[name], np.concatenate([first[name], second[name]], axis=1)
+        )
+
+
+def test_process_pool_matches_serial():
+    prices = _prices()
+    leverages = np.linspace(0.5, 4.0, 7)
+    serial = simulate_grid(prices, leverages, 24, 12)
+    pooled = simulate_grid(prices, leverages, 24, 12, jobs=3)
+    assert serial.keys() == pooled.keys()
+    for name in serial:
+        np.testing.assert_array_equal(serial[name], pooled[name])
+
+
+def test_cli_jobs_output_identical(tmp_path):
+    df = pd.DataFrame(
+        {
+            "date": pd.date_range("2000-01-01", periods=150, freq="MS").strftime("%Y-%m"),
+            "price": _prices(150),
+            "div": 0.1,
+        }
+    )
+    csv = tmp_path / "prices.csv"
+    df.to_csv(csv, index=False)
+
+    def run(jobs):
+        args = Namespace(
+            csv=str(csv),
+            window=36,
+            leverage=[1.0, 2.0, 3.0],
+            datecol="date",
+            pricecol="price",
+            dividendcol="div",
+            underlying=True,
+            out=str(tmp_path),
+            freq="month",
+            jobs=jobs,
+        )
+        return main(args)
+
+    for serial, pooled in zip(run(1), run(2)):
+        pdt.assert_frame_equal(serial, pooled, check_exact=True)
+
+
+def test_pooled_chunks_share_prefixes_and_budget():
+    prices = _prices()
+    leverages = np.linspace(0.5, 4.0, 9)
+    max_bytes = 8 * (4 * len(prices) + 4 * len(prices)) * 2
+    chunks = _leverage_chunks(len(prices), len(leverages), len(prices), max_bytes, jobs=2)
+    assert chunks[0] == (0, 2) and chunks[-1][1] == len(leverages)
+    assert _leverage_chunks(len(prices), 4, 10, 2**30, jobs=2) == [(0, 2), (2, 4)]
+
+    serial = simulate_grid(prices, leverages, [12, 24, 60], 12, max_bytes=max_bytes)
+    pooled = simulate_grid(prices, leverages, [12, 24, 60], 12, jobs=2, max_bytes=max_bytes)
+    for w in serial:
+        for name in GRID_METRICS:
+            np.testing.assert_array_equal(serial[w][name], pooled[w][name])
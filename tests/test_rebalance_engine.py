@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from portfolio.core import batched_leveraged_returns
+from portfolio.jit import dividend_window_growth
+from portfolio.rebalance import rolling_rebalanced_returns
+
+RNG = np.random.default_rng(7)
+PRICES = 100 * np.cumprod(1 + RNG.normal(0.005, 0.08, 120))
+DIVIDENDS = RNG.uniform(0.0, 0.5, 120)
+
+
+def manual_window(prices, dividends, leverage, period, start, window_size):
+    """Rebalance to ``leverage`` every ``period`` rows, holding shares in between."""
+    value = 1.0
+    bust = False
+    for i in range(start, start + window_size):
+        if (i - start) % period == 0:
+            shares = leverage * value / prices[i]
+            debt = (leverage - 1) * value
+        shares *= (prices[i + 1] + dividends[i + 1]) / prices[i + 1]
+        value = shares * prices[i + 1] - debt
+        bust |= value <= 0
+    return (0.0 if bust else value - 1.0), bust
+
+
+@pytest.mark.parametrize("period", [1, 3, 5, 12, 30])
+def test_matches_row_by_row_simulation(period):
+    leverages = [-1.0, 0.5, 1.0, 2.0, 4.0]
+    window_size = 24
+    total, cagr, bust = rolling_rebalanced_returns(
+        PRICES, leverages, period, window_size, dividends=DIVIDENDS
+    )
+
+    for row, lev in enumerate(leverages):
+        for start in range(len(PRICES) - window_size):
+            expected, expected_bust = manual_window(
+                PRICES, DIVIDENDS, lev, period, start, window_size
+            )
+            assert bust[row, start] == expected_bust
+            assert total[row, start] == pytest.approx(expected, rel=1e-9, abs=1e-12)
+    assert np.allclose(
+        cagr[~bust], ((1 + total) ** (12 / window_size) - 1)[~bust], rtol=1e-9
+    )
+
+
+def test_intra_segment_bust_is_detected():
+    # the price crashes and recovers inside one holding period: the window
+    # ends above water but the equity went negative on the way
+    prices = [100.0, 40.0, 100.0, 100.0]
+    total, cagr, bust = rolling_rebalanced_returns(prices, [2.0], 3, 3)
+    assert bust.tolist() == [[True]]
+    assert total.tolist() == cagr.tolist() == [[0.0]]
+
+
+def test_daily_period_matches_daily_rebalanced_engine():
+    leverages = [0.5, 1.0, 3.0, 12.0]
+    for got, expected in zip(
+        rolling_rebalanced_returns(PRICES, leverages, 1, 36),
+        batched_leveraged_returns(PRICES, leverages, 36),
+    ):
+        np.testing.assert_allclose(got, expected, rtol=1e-9, atol=1e-12)
+
+
+def test_unleveraged_matches_dividend_kernel_for_any_period():
+    out = rolling_rebalanced_returns(PRICES, [1.0], [1, 6, 12], 24, dividends=DIVIDENDS)
+    expected = dividend_window_growth(PRICES, DIVIDENDS, 24) - 1
+    for total, _, _ in out.values():
+        np.testing.assert_allclose(total[0], expected, rtol=1e-9)
+
+
+def test_several_periods_match_separate_calls_and_chunking():
+    leverages = np.linspace(0.5, 3.0, 7)
+    together = rolling_rebalanced_returns(
+        PRICES, leverages, [2, 12], 30, max_bytes=1, start=5, stop=40
+    )
+    for period in (2, 12):
+        alone = rolling_rebalanced_returns(PRICES, leverages, period, 30)
+        for got, expected in zip(together[period], alone):
+            np.testing.assert_array_equal(got, expected[:, 5:40])
+
+
+def test_rejects_non_positive_period():
+    with pytest.raises(ValueError):
+        rolling_rebalanced_returns(PRICES, [1.0], [0, 12], 24)
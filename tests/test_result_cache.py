@@ -0,0 +1,118 @@
+import os
+from argparse import Namespace
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+
+import portfolio.cache as cache_mod
+from portfolio.cache import ResultCache, cached_simulate_grid
+from portfolio.cli import main
+from portfolio.parallel import simulate_grid
+
+
+def _prices(n=60, seed=2):
+    rng = np.random.default_rng(seed)
+    return 100 * np.cumprod(1 + rng.normal(0.005, 0.05, n))
+
+
+def test_cached_grid_matches_and_skips_simulation(tmp_path, monkeypatch):
+    prices = _prices()
+    cache = ResultCache(str(tmp_path))
+    first = cached_simulate_grid(cache, prices, [1.0, 3.0], [6, 12], 12)
+    expected = simulate_grid(prices, [1.0, 3.0], [6, 12], 12)
+
+    calls = []
+    monkeypatch.setattr(cache_mod, "simulate_grid", lambda *a, **k: calls.append(a))
+    second = cached_simulate_grid(cache, prices, [1.0, 3.0], [6, 12], 12)
+    assert calls == []
+    for grids in (first, second):
+        for w in (6, 12):
+            for name, arr in expected[w].items():
+                np.testing.assert_array_equal(grids[w][name], arr)
+
+
+def test_only_missing_window_sizes_are_simulated(tmp_path, monkeypatch):
+    prices = _prices()
+    cache = ResultCache(str(tmp_path))
+    cached_simulate_grid(cache, prices, [1.0, 2.0], [12])
+    assert len(os.listdir(tmp_path)) == 1
+
+    simulated = []
+
+    def spy(prices, leverages, window_sizes, *args, **kwargs):
+        simulated.append((list(leverages), list(window_sizes)))
+        return simulate_grid(prices, leverages, window_sizes, *args, **kwargs)
+
+    monkeypatch.setattr(cache_mod, "simulate_grid", spy)
+    grids = cached_simulate_grid(cache, prices, [1.0, 2.0], [12, 24])
+    assert simulated == [([1.0, 2.0], [24])]
+    expected = simulate_grid(prices, [1.0, 2.0], [12, 24])
+    for w in (12, 24):
+        np.testing.assert_array_equal(grids[w]["total_return"], expected[w]["total_return"])
+
+    # a different leverage grid or different data is a different key
+    cached_simulate_grid(cache, prices, [2.0, 4.0], [12])
+    assert simulated[-1] == ([2.0, 4.0], [12])
+    cached_simulate_grid(cache, prices * 1.01, [1.0, 2.0], [12])
+    assert simulated[-1] == ([1.0, 2.0], [12])
+
+
+def test_put_defers_eviction_to_the_end_of_a_run(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path), max_bytes=1)
+    evictions = []
+    real_evict = cache.evict
+    monkeypatch.setattr(cache, "evict", lambda: evictions.append(1) or real_evict())
+    cached_simulate_grid(cache, _prices(), [1.0, 2.0], [6, 12, 24])
+    assert evictions == [1]
+    assert os.listdir(tmp_path) == []
+
+
+def test_shared_directory_tolerates_concurrent_eviction(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path), max_bytes=0)
+    cache.put("k0", {"a": np.zeros(10)})
+    real_listdir = os.listdir
+    # another run evicted "gone" between our listdir and stat
+    monkeypatch.setattr(os, "listdir", lambda path: real_listdir(path) + ["gone.npz"])
+    cache.evict()
+    assert real_listdir(tmp_path) == []
+    assert cache.get("gone") is None
+    ResultCache(str(tmp_path / "missing")).evict()
+
+
+def test_lru_eviction_under_size_cap(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=10**9)
+    for i in range(4):
+        cache.put(f"k{i}", {"a": np.zeros(1000)})
+        os.utime(cache._file(f"k{i}"), ns=(i * 10**9, i * 10**9))
+    assert cache.get("k0") is not None  # refreshes k0
+    entry_size = os.path.getsize(cache._file("k0"))
+    cache.max_bytes = 2 * entry_size
+    cache.evict()
+    assert sorted(os.listdir(tmp_path)) == ["k0.npz", "k3.npz"]
+
+
+def test_cli_cache_round_trip(tmp_path, monkeypatch):
+    df = pd.DataFrame(
+        {
+            "date": pd.date_range("2001-01-01", periods=40, freq="MS").strftime("%Y-%m"),
+            "price": _prices(40),
+        }
+    )
+    csv = tmp_path / "prices.csv"
+    df.to_csv(csv, index=False)
+    args = Namespace(
+        csv=str(csv),
+        window=12,
+        leverage=[1.0, 2.0],
+        datecol="date",
+        pricecol="price",
+        out=str(tmp_path),
+        freq="month",
+        cache_dir=str(tmp_path / "cache"),
+    )
+    first = main(args)
+    monkeypatch.setattr(cache_mod, "simulate_grid", None)
+    second = main(args)
+    for a, b in zip(first, second):
+        pdt.assert_frame_equal(a, b)
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from portfolio.core import (
+    detect_bust,
+    identify_windows,
+    leveraged_log_prefix,
+    rolling_leveraged_returns,
+    simulate_window,
+)
+
+
+def loop_reference(prices, leverage, window_size, periods_per_year):
+    """Per-window results from ``simulate_window`` as the CLI used to compute them."""
+    totals, cagrs, busts = [], [], []
+    for start, end in identify_windows(prices.to_frame(), window_size):
+        V = simulate_window(prices.iloc[start : end + 1], leverage=leverage)
+        busted = detect_bust(V)
+        busts.append(busted)
+        if busted:
+            totals.append(0.0)
+            cagrs.append(0.0)
+        else:
+            totals.append(V[-1] / V[0] - 1.0)
+            cagrs.append((V[-1] / V[0]) ** (periods_per_year / window_size) - 1.0)
+    return np.array(totals), np.array(cagrs), np.array(busts)
+
+
+@pytest.mark.parametrize("leverage", [0.5, 1.0, 2.0, 3.0, 8.0])
+@pytest.mark.parametrize("window_size", [1, 5, 24])
+def test_matches_simulate_window(leverage, window_size):
+    rng = np.random.default_rng(0)
+    prices = pd.Series(100 * np.cumprod(1 + rng.normal(0.005, 0.05, 60)))
+
+    total, cagr, bust = rolling_leveraged_returns(
+        prices.to_numpy(), leverage, window_size, periods_per_year=12
+    )
+    exp_total, exp_cagr, exp_bust = loop_reference(prices, leverage, window_size, 12)
+
+    np.testing.assert_array_equal(bust, exp_bust)
+    np.testing.assert_allclose(total, exp_total, rtol=1e-10, atol=1e-12)
+    np.testing.assert_allclose(cagr, exp_cagr, rtol=1e-10, atol=1e-12)
+
+
+def test_bust_prefix_counts_non_positive_factors():
+    # 10x leverage: +4%, -6%, -12%  ->  factors 1.4, 0.4, -0.2
+    log_prefix, bust_prefix = leveraged_log_prefix([100.0, 104.0, 97.76, 86.0288], 10)
+    assert bust_prefix.tolist() == [0, 0, 0, 1]
+    assert log_prefix[-1] == pytest.approx(np.log(1.4 * 0.4))
+
+
+def test_window_larger_than_series_gives_no_windows():
+    total, cagr, bust = rolling_leveraged_returns([100.0, 101.0], 1.0, 5)
+    assert len(total) == len(cagr) == len(bust) == 0
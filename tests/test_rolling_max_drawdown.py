@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+from argparse import Namespace
+
+from portfolio.cli import main
+from portfolio.core import simulate_window
+from portfolio.drawdown import leveraged_drawdowns, rolling_max_drawdown
+
+
+def brute_force(log_equity, window_size):
+    mdd, duration = [], []
+    for s in range(len(log_equity) - window_size):
+        x = log_equity[s : s + window_size + 1]
+        peak = np.maximum.accumulate(x)
+        mdd.append(-np.expm1(-(peak - x).max()))
+        longest = run = 0
+        for under in x < peak:
+            run = run + 1 if under else 0
+            longest = max(longest, run)
+        duration.append(longest)
+    return np.array(mdd), np.array(duration)
+
+
+@pytest.mark.parametrize("window_size", [1, 2, 3, 7, 8, 16, 45])
+def test_matches_brute_force(window_size):
+    rng = np.random.default_rng(window_size)
+    log_equity = np.cumsum(rng.normal(0.0, 1.0, 120))
+    log_equity[[10, 50, 90]] = log_equity[0]  # exact recoveries
+
+    mdd, duration = rolling_max_drawdown(log_equity, window_size)
+    exp_mdd, exp_duration = brute_force(log_equity, window_size)
+
+    np.testing.assert_allclose(mdd, exp_mdd, rtol=1e-12)
+    np.testing.assert_array_equal(duration, exp_duration)
+
+
+def test_leveraged_matches_equity_paths():
+    rng = np.random.default_rng(7)
+    prices = 100 * np.cumprod(1 + rng.normal(0.002, 0.05, 80))
+
+    mdd, duration = leveraged_drawdowns(prices, [1.0, 3.0], 20)
+    for row, lev in enumerate([1.0, 3.0]):
+        for s in range(len(prices) - 20):
+            V = simulate_window(pd.Series(prices[s : s + 21]), leverage=lev)
+            peak = np.maximum.accumulate(V)
+            assert mdd[row, s] == pytest.approx(((peak - V) / peak).max())
+
+
+def test_busted_windows_are_total_losses():
+    mdd, duration = leveraged_drawdowns([100.0, 104.0, 97.76, 86.0288], 10, 3)
+    assert mdd.tolist() == [1.0]
+    assert duration.tolist() == [3]
+
+
+def test_cli_reports_drawdowns(tmp_path):
+    df = pd.DataFrame(
+        {
+            "date": pd.date_range("2024-01-01", periods=5, freq="D"),
+            "price": [100.0, 120.0, 90.0, 95.0, 130.0],
+        }
+    )
+    csv = tmp_path / "prices.csv"
+    df.to_csv(csv, index=False)
+    args = Namespace(
+        csv=str(csv),
+        window=3,
+        leverage=[1.0],
+        datecol="date",
+        pricecol="price",
+        out=str(tmp_path),
+        freq="day",
+    )
+
+    _, _, _, stats_df = main(args)
+
+    assert stats_df.loc[0, "worst_max_drawdown"] == pytest.approx(0.25)
+    assert stats_df.loc[0, "max_drawdown_duration"] == 2
+    assert len(list(tmp_path.glob("drawdowns_*.csv"))) == 1
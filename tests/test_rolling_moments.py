@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from portfolio.core import identify_windows, simulate_window
+from portfolio.moments import rolling_moments, rolling_risk_metrics
+from portfolio.report import summary_statistics
+
+
+@pytest.fixture
+def prices():
+    rng = np.random.default_rng(2)
+    return 100 * np.cumprod(1 + rng.normal(0.003, 0.03, 120))
+
+
+@pytest.mark.parametrize("leverage", [0.5, 1.0, 3.0, -1.0])
+def test_matches_per_window_paths(prices, leverage):
+    window_size = 24
+    sharpe, vol, sortino = rolling_risk_metrics(
+        np.diff(prices) / prices[:-1], window_size, 12, leverage=leverage
+    )
+
+    for w, (start, end) in enumerate(identify_windows(pd.DataFrame(prices), window_size)):
+        V = simulate_window(pd.Series(prices[start : end + 1]), leverage=leverage)
+        period_returns = np.diff(V) / V[:-1]
+        std = period_returns.std(ddof=1)
+        downside = np.sqrt(np.mean(np.minimum(period_returns, 0.0) ** 2))
+        assert sharpe[w] == pytest.approx(period_returns.mean() / std * np.sqrt(12))
+        assert vol[w] == pytest.approx(std * np.sqrt(12))
+        assert sortino[w] == pytest.approx(period_returns.mean() / downside * np.sqrt(12))
+
+
+def test_leverage_grid_shape(prices):
+    sharpe, vol, sortino = rolling_risk_metrics(
+        np.diff(prices) / prices[:-1], 12, 12, leverage=[1.0, 2.0, 3.0]
+    )
+    assert sharpe.shape == vol.shape == sortino.shape == (3, len(prices) - 12)
+    np.testing.assert_allclose(vol[2], 3 * vol[0])
+
+
+def test_constant_and_single_return_windows_are_zero():
+    _, std, _, _ = rolling_moments([0.01, 0.01, 0.01, 0.02], 3)
+    assert std[0] == 0.0
+    sharpe, vol, sortino = rolling_risk_metrics([0.01, 0.01, 0.01, 0.02], 3)
+    assert sharpe[0] == 0.0 and sortino[0] == 0.0
+    sharpe, vol, sortino = rolling_risk_metrics([0.01, -0.02], 1)
+    assert sharpe.tolist() == [0.0, 0.0]
+    assert vol.tolist() == [0.0, 0.0]
+
+
+def test_summary_statistics_adds_risk_columns():
+    returns_df = pd.DataFrame(
+        {"start": ["s1", "s2"], "end": ["e1", "e2"], "portfolio_1x": [0.1, 0.2]}
+    )
+    bust_df = pd.DataFrame({"leverage": [1], "bust_ratio": [0.0]})
+    out = summary_statistics(
+        returns_df,
+        returns_df,
+        bust_df,
+        {"portfolio_1x": [1.0, 2.0]},
+        volatility_dict={"portfolio_1x": [0.1, 0.3]},
+        sortino_dict={"portfolio_1x": [2.0, 4.0]},
+    )
+    assert out.loc[0, "avg_volatility"] == pytest.approx(0.2)
+    assert out.loc[0, "avg_sortino"] == pytest.approx(3.0)
@@ -60,7 +60,8 @@ def test_simulate_and_window_returns_price_path_1_2_1():
 
     expected = pd.DataFrame(
         {
-            "window_dates": [["day1", "day2"], ["day2", "day3"]],
+            "start_date": ["day1", "day2"],
+            "end_date": ["day2", "day3"],
             "portfolio_1x_returns": [2.0, 0.5],
         }
     )
@@ -0,0 +1,86 @@
+import json
+from argparse import Namespace
+
+import numpy as np
+import pandas as pd
+
+from portfolio.cli import main
+from portfolio.profiling import PROFILE_ENV, StageProfiler, profiling_requested
+
+
+def _run(tmp_path, **kwargs):
+    rng = np.random.default_rng(3)
+    csv = tmp_path / "prices.csv"
+    pd.DataFrame(
+        {
+            "date": pd.date_range("2000-01-01", periods=48, freq="MS").strftime("%Y-%m"),
+            "price": 100 * np.cumprod(1 + rng.normal(0.01, 0.08, 48)),
+        }
+    ).to_csv(csv, index=False)
+    args = Namespace(
+        csv=str(csv),
+        window=12,
+        leverage=[1.0, 15.0],
+        datecol="date",
+        pricecol="price",
+        out=str(tmp_path),
+        freq="month",
+        **kwargs,
+    )
+    return main(args)
+
+
+def test_profile_json_written_next_to_outputs(tmp_path):
+    _, _, summary_df, _ = _run(tmp_path, profile=True)
+    (path,) = tmp_path.glob("profile_lev_*.json")
+    report = json.loads(path.read_text())
+
+    assert {"load", "simulate", "assemble", "summary_statistics", "write"} <= set(
+        report["stages"]
+    )
+    for record in report["stages"].values():
+        assert record["calls"] >= 1
+        assert record["wall_s"] >= 0 and record["cpu_s"] >= 0
+        assert record["peak_bytes"] >= 0
+    counters = report["counters"]
+    assert counters["rows_loaded"] == 48
+    assert counters["windows_evaluated"] == 2 * 36
+    assert counters["busts_detected"] == round(summary_df["bust_ratio"].sum() * 36)
+    assert report["total"]["wall_s"] >= report["stages"]["simulate"]["wall_s"]
+    assert report["args"]["window"] == 12
+
+
+def test_no_profile_by_default(tmp_path, monkeypatch):
+    monkeypatch.delenv(PROFILE_ENV, raising=False)
+    _run(tmp_path)
+    assert not list(tmp_path.glob("profile_*.json"))
+
+
+def test_env_var_enables_profile(tmp_path, monkeypatch):
+    monkeypatch.setenv(PROFILE_ENV, "1")
+    assert profiling_requested()
+    _run(tmp_path)
+    assert len(list(tmp_path.glob("profile_*.json"))) == 1
+
+
+def test_nested_and_repeated_stages():
+    profiler = StageProfiler()
+    try:
+        for _ in range(3):
+            with profiler.stage("outer"):
+                with profiler.stage("inner"):
+                    block = np.ones(200_000)
+                del block
+        report = profiler.report()
+    finally:
+        profiler.close()
+    assert report["stages"]["outer"]["calls"] == 3
+    assert report["stages"]["inner"]["peak_bytes"] >= 200_000 * 8
+    assert report["stages"]["outer"]["peak_bytes"] >= report["stages"]["inner"]["peak_bytes"]
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = StageProfiler(enabled=False)
+    with profiler.stage("x"):
+        profiler.count("events")
+    assert profiler.report() == {}
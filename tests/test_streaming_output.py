@@ -0,0 +1,101 @@
+from argparse import Namespace
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from portfolio.cli import main
+
+
+def _args(csv, out, window, **kwargs):
+    out.mkdir()
+    return Namespace(
+        csv=str(csv),
+        window=window,
+        leverage=[1.0, 2.0, 9.0],
+        datecol="date",
+        pricecol="price",
+        dividendcol="div",
+        underlying=True,
+        out=str(out),
+        freq="month",
+        **kwargs,
+    )
+
+
+def _read(out, name, fmt="csv"):
+    (path,) = out.glob(f"{name}_lev_*.{fmt}")
+    if fmt == "parquet":
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+@pytest.fixture
+def csv(tmp_path):
+    rng = np.random.default_rng(21)
+    n = 75
+    path = tmp_path / "prices.csv"
+    pd.DataFrame(
+        {
+            "date": pd.date_range("1995-01-01", periods=n, freq="MS").strftime("%Y-%m"),
+            "price": 100 * np.cumprod(1 + rng.normal(0.004, 0.07, n)),
+            "div": rng.uniform(0.1, 0.3, n),
+        }
+    ).to_csv(path, index=False)
+    return path
+
+
+@pytest.mark.parametrize("window", [12, ["6", "18"]])
+def test_streamed_files_match_in_memory_run(tmp_path, csv, window):
+    full = main(_args(csv, tmp_path / "full", window))
+    streamed = main(_args(csv, tmp_path / "stream", window, stream_chunk=7))
+
+    assert streamed[0] is None and streamed[1] is None
+    pdt.assert_frame_equal(streamed[2], full[2])
+    pdt.assert_frame_equal(streamed[3], full[3], rtol=1e-12)
+    for name in ("returns", "ann_returns", "drawdowns", "bust_summary"):
+        pdt.assert_frame_equal(
+            _read(tmp_path / "stream", name), _read(tmp_path / "full", name)
+        )
+
+
+def test_streamed_parquet_row_groups(tmp_path, csv):
+    pq = pytest.importorskip("pyarrow.parquet")
+    main(_args(csv, tmp_path / "full", 12, format="parquet"))
+    main(_args(csv, tmp_path / "stream", 12, format="parquet", stream_chunk=10))
+    (path,) = (tmp_path / "stream").glob("returns_lev_*.parquet")
+    assert pq.ParquetFile(path).num_row_groups == 7
+    pdt.assert_frame_equal(
+        _read(tmp_path / "stream", "returns", "parquet"),
+        _read(tmp_path / "full", "returns", "parquet"),
+    )
+
+
+def test_stream_rejects_plot(tmp_path, csv):
+    with pytest.raises(ValueError):
+        main(_args(csv, tmp_path / "x", 12, stream_chunk=5, plot=True))
+
+
+def test_streamed_iqr_comes_from_the_chunked_sketch(tmp_path):
+    rng = np.random.default_rng(4)
+    n = 2700
+    csv = tmp_path / "long.csv"
+    pd.DataFrame(
+        {
+            "date": np.arange(n),
+            "price": 100 * np.cumprod(1 + rng.normal(0.0003, 0.01, n)),
+            "div": 0.01,
+        }
+    ).to_csv(csv, index=False)
+    full = main(_args(csv, tmp_path / "full", 60))
+    streamed = main(_args(csv, tmp_path / "stream", 60, stream_chunk=500))
+
+    cols = ["portfolio", "mean_total_return", "bust_ratio", "max_total_return"]
+    pdt.assert_frame_equal(streamed[3][cols], full[3][cols], rtol=1e-12)
+    # more windows than the sketch retains: the IQR is within its rank error
+    returns = full[0].drop(columns=["start_date", "end_date"])
+    for col, iqr in zip(full[3]["portfolio"], streamed[3]["iqr_total_return"]):
+        lo, hi = np.quantile(returns[col], [0.25 - 0.01, 0.75 + 0.01])
+        mid_lo, mid_hi = np.quantile(returns[col], [0.25 + 0.01, 0.75 - 0.01])
+        assert mid_hi - mid_lo <= iqr <= hi - lo
@@ -1,5 +1,6 @@
 import pandas as pd
 import pandas.testing as pdt
+import pytest
 
 from portfolio.report import summary_statistics
 
@@ -35,3 +36,42 @@ def test_summary_statistics_basic():
     })
 
     pdt.assert_frame_equal(out.round(6), expected.round(6))
+
+
+def test_bust_ratios_join_on_leverage_value():
+    cols = ["portfolio_1.0x", "portfolio_1.25x", "portfolio_3x", "underlying"]
+    returns_df = pd.DataFrame({"start": [0, 1], "end": [1, 2], **{c: [0.1, 0.2] for c in cols}})
+    bust_df = pd.DataFrame({"leverage": [1.0, 1.25, 3.0], "bust_ratio": [0.1, 0.2, 0.3]})
+
+    out = summary_statistics(returns_df, returns_df, bust_df, {})
+
+    assert out["bust_ratio"].tolist() == [0.1, 0.2, 0.3, 0.0]
+    assert out["avg_sharpe"].tolist() == [0.0] * 4
+
+
+def test_missing_and_non_numeric_values_are_skipped():
+    returns_df = pd.DataFrame({
+        "start": ["s1", "s2", "s3", "s4"],
+        "end": ["e1", "e2", "e3", "e4"],
+        "portfolio_1x": [0.1, None, 0.3, 0.5],
+        "portfolio_2x": ["0.2", "bad", "0.6", "1.0"],
+        "portfolio_3x": [None, None, None, None],
+    })
+    bust_df = pd.DataFrame({"leverage": [1, 2, 3], "bust_ratio": [0.0, 0.0, 1.0]})
+    drawdowns = {"portfolio_1x": [0.1, float("nan"), 0.3], "portfolio_2x": []}
+
+    out = summary_statistics(
+        returns_df, returns_df, bust_df, {}, drawdown_dict=drawdowns
+    ).set_index("portfolio")
+
+    for col, scale in (("portfolio_1x", 1), ("portfolio_2x", 2)):
+        values = pd.Series([0.1, 0.3, 0.5]) * scale
+        assert out.loc[col, "mean_total_return"] == pytest.approx(values.mean())
+        assert out.loc[col, "iqr_total_return"] == pytest.approx(
+            values.quantile(0.75) - values.quantile(0.25)
+        )
+        assert out.loc[col, "std_cagr"] == pytest.approx(values.std())
+        assert out.loc[col, "max_total_return"] == pytest.approx(values.max())
+    assert out.loc["portfolio_1x", "mean_max_drawdown"] == pytest.approx(0.2)
+    assert out.loc["portfolio_2x", "worst_max_drawdown"] == 0.0
+    assert out.loc["portfolio_3x"][["mean_total_return", "min_total_return"]].isna().all()
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+from argparse import Namespace
+
+from portfolio.cli import main, parse_window_sizes
+
+
+@pytest.mark.parametrize(
+    "window, expected",
+    [
+        (12, [12]),
+        ("24", [24]),
+        (["12", "60"], [12, 60]),
+        (["12:36:12"], [12, 24, 36]),
+        (["3:5", "4", "10"], [3, 4, 5, 10]),
+        ("60:12:-12", [60, 48, 36, 24, 12]),
+        ("5:3:-1", [5, 4, 3]),
+    ],
+)
+def test_parse_window_sizes(window, expected):
+    assert parse_window_sizes(window) == expected
+
+
+@pytest.mark.parametrize(
+    "window, message",
+    [
+        ("60:12", "is empty"),
+        ("0", "at least 1"),
+        (["12", "-3:2"], "at least 1"),
+        ("12:24:0", "step of zero"),
+        ([], "no window sizes"),
+        ("12:x", "invalid --window value '12:x'"),
+        ("1y", "invalid --window value '1y'"),
+        ("1:2:3:4", "invalid --window value"),
+    ],
+)
+def test_parse_window_sizes_rejects_invalid(window, message):
+    with pytest.raises(ValueError, match=message):
+        parse_window_sizes(window)
+
+
+def test_sweep_matches_separate_runs(tmp_path):
+    rng = np.random.default_rng(5)
+    df = pd.DataFrame(
+        {
+            "date": pd.date_range("2000-01-01", periods=80, freq="MS").strftime("%Y-%m"),
+            "price": 100 * np.cumprod(1 + rng.normal(0.005, 0.04, 80)),
+            "div": 0.2,
+        }
+    )
+    csv = tmp_path / "prices.csv"
+    df.to_csv(csv, index=False)
+
+    def args(window):
+        return Namespace(
+            csv=str(csv),
+            window=window,
+            leverage=[1.0, 2.5],
+            datecol="date",
+            pricecol="price",
+            dividendcol="div",
+            underlying=True,
+            out=str(tmp_path),
+            freq="month",
+        )
+
+    swept = main(args(["12", "24:36:12"]))
+    for w in (12, 24, 36):
+        single = main(args(w))
+        for long_df, single_df in zip(swept, single):
+            part = long_df[long_df["window"] == w].drop(columns="window")
+            pdt.assert_frame_equal(part.reset_index(drop=True), single_df)